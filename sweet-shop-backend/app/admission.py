@@ -0,0 +1,227 @@
+"""
+Admission control: bounded concurrency per route class, with load shedding.
+
+Each route class (catalog reads, purchases, other catalog/inventory
+writes, auth) admits at most ``limit`` requests at a time; the rest wait
+in a FIFO queue. How long a request may wait follows CoDel's idea of
+judging a queue by its standing delay rather than its length: while the
+queue keeps draining, a request may wait up to ``interval``; once it has
+not been empty for a whole ``interval`` it is a standing queue, and a
+request waiting longer than ``target`` is rejected with 503 and
+Retry-After. Overload then costs a client one fast refusal instead of a
+slow timeout, and the thread pool is left to the requests that can
+still finish.
+
+Purchases and checkouts have a class of their own, as large as catalog
+browsing's and with a target twenty times longer, so browsing is shed
+first, and catalog imports or admin edits (the writes class) cannot
+crowd purchases out. /health, /metrics, the event stream, admin
+diagnostics and OPTIONS requests (CORS preflights) bypass admission.
+"""
+import asyncio
+import math
+import re
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from app.config import Settings, settings
+from app.metrics import LATENCY_BUCKETS, Counter, Gauge, Histogram, registry
+
+READS = "reads"
+PURCHASES = "purchases"
+WRITES = "writes"
+AUTH = "auth"
+
+SAFE_METHODS = frozenset({"GET", "HEAD"})
+# Long-lived streams would hold a slot for their whole life
+UNLIMITED_PATHS = frozenset({"/health", "/metrics", "/inventory/events"})
+PURCHASE_PATH = re.compile(r"/inventory/(?:\d+/purchase|checkout)")
+
+queue_wait = registry.register(Histogram(
+    "admission_queue_wait_seconds", "Time requests waited for admission.",
+    LATENCY_BUCKETS, ("route_class",)
+))
+rejected = registry.register(Counter(
+    "admission_rejected_total", "Requests shed with 503.", ("route_class", "reason")
+))
+in_flight = registry.register(Gauge(
+    "admission_in_flight", "Admitted requests being handled.", ("route_class",)
+))
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """
+    Classify a request for admission.
+
+    Args:
+        method: HTTP method
+        path: Request path
+
+    Returns:
+        READS, PURCHASES, WRITES or AUTH, or None if the request bypasses
+        admission
+    """
+    # CORS preflights are answered without touching the app
+    if method == "OPTIONS" or path in UNLIMITED_PATHS:
+        return None
+    if path.startswith("/auth/"):
+        return AUTH
+    if path.startswith(("/inventory", "/sweets")):
+        if method in SAFE_METHODS:
+            return READS
+        return PURCHASES if method == "POST" and PURCHASE_PATH.fullmatch(path) else WRITES
+    return None
+
+
+class AdmissionQueue:
+    """
+    Concurrency limit and CoDel-style waiting queue of one route class.
+
+    Used from the event loop only, so it needs no lock.
+    """
+
+    def __init__(self, name: str, limit: int, target: float, interval: float, max_queue: int):
+        self.name = name
+        self.limit = limit
+        self.target = target
+        self.interval = interval
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._labels = (name,)
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_empty = monotonic()
+
+    @property
+    def waiting(self) -> int:
+        """Requests queued for a slot."""
+        return len(self._waiters)
+
+    def max_wait(self, now: float) -> float:
+        """How long a request arriving now may wait before it is shed."""
+        standing = now - self._last_empty > self.interval
+        return self.target if standing else self.interval
+
+    async def acquire(self) -> bool:
+        """
+        Wait for a slot.
+
+        Returns:
+            True once admitted (call release when done), False if shed
+        """
+        arrived = monotonic()
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self._last_empty = arrived
+            in_flight.inc(self._labels)
+            self._admit(0.0)
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+            return False
+
+        slot = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        try:
+            await asyncio.wait_for(slot, self.max_wait(arrived))
+        except asyncio.TimeoutError:
+            if slot in self._waiters:
+                self._waiters.remove(slot)
+            self._reject("queue_delay")
+            return False
+        except BaseException:
+            # Client went away: give back a slot handed over meanwhile
+            if slot.done() and not slot.cancelled():
+                self.release()
+            elif slot in self._waiters:
+                self._waiters.remove(slot)
+            raise
+        self._admit(monotonic() - arrived)
+        return True
+
+    def release(self) -> None:
+        """Hand the slot to the oldest waiter, or free it."""
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                if not self._waiters:
+                    self._last_empty = monotonic()
+                return
+        self._last_empty = monotonic()
+        self.in_flight -= 1
+        in_flight.dec(self._labels)
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        queue_wait.observe(waited, self._labels)
+
+    def _reject(self, reason: str) -> None:
+        self.rejected += 1
+        rejected.inc((self.name, reason))
+
+
+class AdmissionControl:
+    """
+    The admission queues of every route class.
+    """
+
+    def __init__(self, config: Settings = settings):
+        interval = config.admission_interval_ms / 1000
+        self.retry_after = str(max(1, math.ceil(interval)))
+        self.queues: Dict[str, AdmissionQueue] = {
+            READS: AdmissionQueue(
+                READS, config.admission_read_limit,
+                config.admission_read_target_ms / 1000, interval, config.admission_max_queue
+            ),
+            PURCHASES: AdmissionQueue(
+                PURCHASES, config.admission_purchase_limit,
+                config.admission_purchase_target_ms / 1000, interval, config.admission_max_queue
+            ),
+            WRITES: AdmissionQueue(
+                WRITES, config.admission_write_limit,
+                config.admission_write_target_ms / 1000, interval, config.admission_max_queue
+            ),
+            AUTH: AdmissionQueue(
+                AUTH, config.admission_auth_limit,
+                config.admission_auth_target_ms / 1000, interval, config.admission_max_queue
+            ),
+        }
+
+    def queue_for(self, scope) -> Optional[AdmissionQueue]:
+        """Admission queue of a request, or None if it bypasses admission."""
+        name = route_class(scope["method"], scope["path"])
+        return self.queues[name] if name is not None else None
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting requests through their class's queue.
+    """
+
+    def __init__(self, app, control: Optional[AdmissionControl] = None):
+        self.app = app
+        self.control = control or AdmissionControl()
+
+    async def __call__(self, scope, receive, send):
+        queue = self.control.queue_for(scope) if scope["type"] == "http" else None
+        if queue is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await queue.acquire():
+            response = JSONResponse(
+                {"detail": "Server is overloaded, try again shortly"},
+                status_code=503,
+                headers={"Retry-After": self.control.retry_after},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            queue.release()
@@ -2,16 +2,23 @@
 Authentication and authorization logic using JWT and OAuth2.
 """
 from datetime import datetime, timedelta
-from typing import Optional
-import hashlib
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models import User, UserRole
 from app.schemas import TokenData
-from app.database import get_db
+from app.database import get_async_db, get_db
+from app.passwords import (
+    PasswordHashingBusy,
+    hash_password,
+    needs_rehash,
+    password_hasher,
+    verify_password
+)
 
 # Configuration
 SECRET_KEY = "your-secret-key-change-this-in-production"  # Should be in environment variables
@@ -21,32 +28,9 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-
-def hash_password(password: str) -> str:
-    """
-    Hash a password using SHA256.
-    
-    Args:
-        password: Plain text password
-        
-    Returns:
-        Hashed password
-    """
-    return hashlib.sha256(password.encode()).hexdigest()
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """
-    Verify a password against its hash.
-    
-    Args:
-        plain_password: Plain text password
-        hashed_password: Hashed password from database
-        
-    Returns:
-        True if password matches, False otherwise
-    """
-    return hashlib.sha256(plain_password.encode()).hexdigest() == hashed_password
+# Checked against when a login names no existing user; hashed on the first
+# such login rather than at import, which every worker and tool pays for
+_unknown_user_hash: Optional[str] = None
 
 
 def create_access_token(
@@ -74,12 +58,80 @@ def create_access_token(
     return encoded_jwt
 
 
+def create_user_access_token(
+    user: User,
+    expires_delta: Optional[timedelta] = None
+) -> str:
+    """
+    Create a JWT access token carrying the user's identity and role.
+    
+    The id, role and token version claims let get_current_principal
+    authorize requests without a database lookup.
+    
+    Args:
+        user: Authenticated user
+        expires_delta: Token expiration time delta
+        
+    Returns:
+        Encoded JWT token
+    """
+    return create_access_token(
+        data={
+            "sub": user.username,
+            "uid": user.id,
+            "role": user.role.value,
+            "ver": user.token_version,
+        },
+        expires_delta=expires_delta
+    )
+
+
+def _credentials_exception() -> HTTPException:
+    """Build the 401 raised for any unusable token."""
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_access_token(token: str) -> TokenData:
+    """
+    Decode and validate a JWT access token.
+    
+    Args:
+        token: Encoded JWT token
+        
+    Returns:
+        Claims from the token
+        
+    Raises:
+        HTTPException: If the token is invalid or has no subject
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            raise _credentials_exception()
+        return TokenData(
+            username=username,
+            user_id=payload.get("uid"),
+            role=payload.get("role"),
+            token_version=payload.get("ver"),
+        )
+    except (JWTError, ValueError):
+        raise _credentials_exception()
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
     """
-    Get current user from JWT token.
+    Get current user from JWT token, checked against the database.
+    
+    Use this for sensitive operations: it rejects tokens issued before
+    the user's last role change.
     
     Args:
         token: JWT token from request
@@ -89,28 +141,134 @@ def get_current_user(
         User object
         
     Raises:
-        HTTPException: If token is invalid or user not found
+        HTTPException: If token is invalid, stale or user not found
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
+    token_data = decode_access_token(token)
     
     user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    # Tokens without a version claim predate versioning and count as version 0
+    if (token_data.token_version or 0) != user.token_version:
+        raise _credentials_exception()
     return user
 
 
+def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> TokenData:
+    """
+    Get the caller's identity and role from the JWT claims alone.
+    
+    No database query is made for tokens issued by login; role changes
+    take effect for these requests when the token expires. Tokens that
+    lack the id/role claims are resolved through the database.
+    
+    Args:
+        token: JWT token from request
+        db: Database session, only used for tokens without claims
+        
+    Returns:
+        Token data with username, user_id and role
+        
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
+    token_data = decode_access_token(token)
+    if token_data.user_id is not None and token_data.role is not None:
+        return token_data
+    
+    user = get_current_user(token, db)
+    return TokenData(
+        username=user.username,
+        user_id=user.id,
+        role=user.role,
+        token_version=user.token_version,
+    )
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Async variant of get_current_user for the async data path.
+    
+    Args:
+        token: JWT token from request
+        db: Async database session
+        
+    Returns:
+        User object
+    """
+    return await db.run_sync(lambda session: get_current_user(token, session))
+
+
+async def get_current_principal_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> TokenData:
+    """
+    Async variant of get_current_principal for the async data path.
+    
+    Args:
+        token: JWT token from request
+        db: Async database session, only used for tokens without claims
+        
+    Returns:
+        Token data with username, user_id and role
+    """
+    token_data = decode_access_token(token)
+    if token_data.user_id is not None and token_data.role is not None:
+        return token_data
+    return await db.run_sync(lambda session: get_current_principal(token, session))
+
+
+async def verify_user_password(user: Optional[User], password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a login password in the password hashing pool.
+    
+    Unknown users still cost one hash check, so response times do not
+    reveal which usernames exist.
+    
+    Args:
+        user: User looked up by username, or None if there is none
+        password: Plain text password
+        
+    Returns:
+        Whether the password matches, and a replacement hash if the stored
+        one is legacy SHA256 or uses another bcrypt cost
+        
+    Raises:
+        HTTPException: 503 if too many password checks are already pending
+    """
+    try:
+        if user is None:
+            await password_hasher.verify(password, await _get_unknown_user_hash())
+            return False, None
+        if not await password_hasher.verify(password, user.hashed_password):
+            return False, None
+        if needs_rehash(user.hashed_password):
+            return True, await password_hasher.hash(password)
+        return True, None
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def _get_unknown_user_hash() -> str:
+    """Hash to check unknown-user logins against, made in the hashing pool once."""
+    global _unknown_user_hash
+    if _unknown_user_hash is None:
+        # Concurrent first logins may both hash; either result will do
+        _unknown_user_hash = await password_hasher.hash("unknown-user")
+    return _unknown_user_hash
+
+
 def get_current_admin(
     current_user: User = Depends(get_current_user)
 ) -> User:
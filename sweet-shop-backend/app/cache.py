@@ -0,0 +1,155 @@
+"""
+In-process cache of serialized catalog responses.
+
+Catalog reads (sweet details, inventory pages, search results) are
+cached as ready-to-send JSON bytes. Every catalog write bumps a global
+version, which drops all cached entries; a response computed while a
+write was in flight is never stored. When several workers share the
+database, writes made by other processes are noticed through
+``shared_version`` (see app.coherence) before each lookup.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Response
+
+from app.config import settings
+
+# A cached entry: serialized body and extra response headers
+CachedBody = Tuple[bytes, Dict[str, str]]
+
+
+class CatalogCache:
+    """
+    Bounded LRU cache of JSON response bodies keyed by catalog version.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        enabled: bool = True,
+        shared_version: Optional[Callable[[], Hashable]] = None
+    ):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        # Version of the catalog as seen by every process, if known
+        self.shared_version = shared_version
+        self._seen_shared_version: Hashable = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        """
+        Look up a cached body, marking it as recently used.
+
+        Args:
+            key: Cache key for the request
+
+        Returns:
+            Cached (body, headers), or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedBody, version: int) -> None:
+        """
+        Store a body computed at the given catalog version.
+
+        The entry is discarded if the catalog changed since ``version``.
+
+        Args:
+            key: Cache key for the request
+            entry: Serialized (body, headers)
+            version: Catalog version read before computing the entry
+        """
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Bump the catalog version and drop every cached entry."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def sync(self) -> None:
+        """Drop every cached entry if another process changed the catalog."""
+        if self.shared_version is None:
+            return
+        current = self.shared_version()
+        with self._lock:
+            if current == self._seen_shared_version:
+                return
+            self._seen_shared_version = current
+            self.version += 1
+            self._entries.clear()
+
+    def clear(self) -> None:
+        """Drop every cached entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with version, size, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "version": self.version,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def respond(self, key: Hashable, build: Callable[[], CachedBody]) -> Response:
+        """
+        Serve a JSON response from the cache, building it on a miss.
+
+        Args:
+            key: Cache key for the request
+            build: Callable returning the serialized (body, headers)
+
+        Returns:
+            JSON response with the cached or freshly built body
+        """
+        if not self.enabled:
+            body, headers = build()
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        self.sync()
+        entry = self.get(key)
+        if entry is None:
+            version = self.version
+            entry = build()
+            self.put(key, entry, version)
+
+        body, headers = entry
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache(
+    max_entries=settings.response_cache_max_entries,
+    enabled=settings.response_cache_enabled
+)
@@ -0,0 +1,105 @@
+"""
+Price/stock filters and sort orders for the catalog list endpoints.
+
+Every sort order is by (column, id) and is backed by an index that
+already yields rows in that order, so pages are read straight off the
+index with no sort step (see the sweets indexes in app.models). The
+"in stock, cheapest first" query has a partial index of its own.
+
+Filters and sorts apply to the stored stock; for a sweet in flash-sale
+mode that lags the live counter by up to one flush interval.
+"""
+from typing import Any, Dict, Literal, NamedTuple, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import tuple_
+
+from app.models import IN_STOCK, Sweet
+
+SORT_COLUMNS = {"price": Sweet.price, "stock": Sweet.stock, "name": Sweet.name}
+SORT_TYPES = {"price": (int, float), "stock": (int,), "name": (str,)}
+
+SortField = Literal["price", "stock", "name"]
+
+
+class CatalogFilter(NamedTuple):
+    """Filter and sort parameters of one list request."""
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+    sort: Optional[str] = None
+
+
+def catalog_filter(
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = Query(None, description="true: stock > 0, false: sold out"),
+    sort: Optional[SortField] = Query(None, description="Sort by this field, then by ID")
+) -> CatalogFilter:
+    """Dependency collecting the filter and sort query parameters."""
+    return CatalogFilter(min_price, max_price, in_stock, sort)
+
+
+def apply_filter(query, catalog: CatalogFilter):
+    """
+    Restrict a select() of Sweet columns to the requested price and stock.
+
+    Args:
+        query: ORM query or select() of Sweet columns
+        catalog: Filter parameters
+
+    Returns:
+        Filtered query
+    """
+    if catalog.min_price is not None:
+        query = query.filter(Sweet.price >= catalog.min_price)
+    if catalog.max_price is not None:
+        query = query.filter(Sweet.price <= catalog.max_price)
+    if catalog.in_stock is True:
+        query = query.filter(IN_STOCK)
+    elif catalog.in_stock is False:
+        query = query.filter(Sweet.stock == 0)
+    return query
+
+
+def sort_order(catalog: CatalogFilter) -> tuple:
+    """ORDER BY columns for the requested sort: the sort column, then ID."""
+    if catalog.sort is None:
+        return (Sweet.id,)
+    return (SORT_COLUMNS[catalog.sort], Sweet.id)
+
+
+def after_position(query, catalog: CatalogFilter, position: Dict[str, Any]):
+    """
+    Keep only rows after a keyset position in the requested sort order.
+
+    Args:
+        query: ORM query or select() of Sweet columns
+        catalog: Filter parameters with the sort order
+        position: Decoded cursor
+
+    Returns:
+        Filtered query
+
+    Raises:
+        HTTPException: If the cursor belongs to another sort order
+    """
+    if catalog.sort is None:
+        return query.filter(Sweet.id > position["id"])
+
+    value = position.get(catalog.sort)
+    if not isinstance(value, SORT_TYPES[catalog.sort]) or isinstance(value, bool):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    # A row-value comparison, which SQLite turns into an index range
+    return query.filter(tuple_(SORT_COLUMNS[catalog.sort], Sweet.id) > (value, position["id"]))
+
+
+def cursor_position(row, catalog: CatalogFilter) -> Dict[str, Any]:
+    """Keyset position of a result row, for encode_cursor."""
+    position = {"id": row.id}
+    if catalog.sort is not None:
+        position[catalog.sort] = getattr(row, catalog.sort)
+    return position
@@ -0,0 +1,250 @@
+"""
+Streaming bulk import of the sweets catalog from CSV or NDJSON.
+
+Rows are parsed one at a time, validated against SweetCreate and
+written in fixed-size batches, each batch in its own transaction with
+executemany-style INSERT/UPDATE statements. Memory use is bounded by the
+batch size and the capped error report, not by the size of the file.
+
+Usage:
+    python -m app.catalog_import catalog.csv [--format csv|ndjson] [--no-upsert]
+"""
+import argparse
+import csv
+import io
+import json
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, init_db
+from app.flash_sale import flash_sale
+from app.models import Sweet
+from app.schemas import ImportReport, ImportRowError, SweetCreate
+
+FORMATS = ("csv", "ndjson")
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+sweets_table = Sweet.__table__
+
+
+class ImportAborted(Exception):
+    """
+    The stream could not be read to the end (bad encoding or CSV syntax).
+
+    Rows read before the failure have been imported; ``report`` counts them.
+    """
+
+    def __init__(self, row_number: int, reason: str, report: ImportReport):
+        super().__init__(f"Unreadable input after row {row_number}: {reason}")
+        self.row_number = row_number
+        self.report = report
+
+
+# Rows are matched by name, then updated by ID: names are not unique
+_update_by_id = (
+    update(sweets_table)
+    .where(sweets_table.c.id == bindparam("b_id"))
+    .values(
+        description=bindparam("b_description"),
+        price=bindparam("b_price"),
+        # NULL keeps the stored stock (sweets in flash-sale mode)
+        stock=func.coalesce(bindparam("b_stock"), sweets_table.c.stock),
+    )
+)
+HOT_STOCK_ERROR = "stock: Sweet is in flash-sale mode; restock it instead of setting its stock"
+AMBIGUOUS_NAME_ERROR = "name: Several sweets have this name; edit them by ID instead"
+
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield raw records from a binary stream, one at a time.
+
+    Args:
+        stream: Binary file-like object
+        fmt: "csv" (with a header row) or "ndjson"
+
+    Yields:
+        (row number, record) pairs; the record is a dict, or a
+        ValueError if the line could not be parsed
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            # Empty cells mean "use the default" rather than ""
+            yield row_number, {k: v for k, v in row.items() if k and v not in ("", None)}
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as exc:
+            yield row_number, exc
+
+
+def import_catalog(
+    db: Session,
+    stream: IO[bytes],
+    fmt: str = "csv",
+    upsert: bool = True,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> ImportReport:
+    """
+    Import sweets from a CSV or NDJSON stream.
+
+    Args:
+        db: Database session
+        stream: Binary file-like object with the catalog
+        fmt: "csv" or "ndjson"
+        upsert: Update existing sweets with the same name instead of
+            inserting duplicates
+        batch_size: Rows validated and written per transaction
+
+    Returns:
+        Counts of inserted, updated and failed rows plus per-row errors
+
+    Raises:
+        ImportAborted: If the stream stops being readable as UTF-8 text or
+            CSV partway; the rows before that point are still written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    report = ImportReport()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    row_number = 0
+    try:
+        for row_number, record in iter_records(stream, fmt):
+            sweet = _validate(row_number, record, report)
+            if sweet is not None:
+                batch.append((row_number, sweet))
+            if len(batch) >= batch_size:
+                _write_batch(db, batch, upsert, report)
+                batch = []
+    except (UnicodeDecodeError, csv.Error) as exc:
+        if batch:
+            _write_batch(db, batch, upsert, report)
+        raise ImportAborted(row_number, str(exc), report) from exc
+
+    if batch:
+        _write_batch(db, batch, upsert, report)
+
+    return report
+
+
+def _validate(row_number: int, record: Any, report: ImportReport):
+    """Validate one record, recording an error on failure."""
+    if isinstance(record, Exception):
+        _record_error(report, row_number, [f"Invalid JSON: {record}"])
+        return None
+    if not isinstance(record, dict):
+        _record_error(report, row_number, ["Expected an object"])
+        return None
+
+    try:
+        return SweetCreate.model_validate(record).model_dump()
+    except ValidationError as exc:
+        _record_error(report, row_number, [
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        ])
+        return None
+
+
+def _record_error(report: ImportReport, row_number: int, messages: List[str]) -> None:
+    """Count a failed row and keep its messages while under the cap."""
+    report.failed += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(ImportRowError(row=row_number, errors=messages))
+    else:
+        report.errors_truncated = True
+
+
+def _write_batch(
+    db: Session,
+    batch: List[Tuple[int, Dict[str, Any]]],
+    upsert: bool,
+    report: ImportReport
+) -> None:
+    """
+    Write one batch of validated (row number, row) pairs in a single transaction.
+
+    The stock of a sweet in flash-sale mode belongs to its in-memory
+    counter: a row for it may repeat the live stock but not change it,
+    as with PUT /sweets/{id}. A row whose name is shared by several
+    sweets is reported rather than applied to all of them.
+    """
+    to_insert = [row for _, row in batch]
+    to_update: List[Dict[str, Any]] = []
+
+    if upsert:
+        # Last row wins when a name repeats within the batch
+        by_name = {row["name"]: (row_number, row) for row_number, row in batch}
+        existing: Dict[str, List[int]] = {}
+        for name, sweet_id in db.execute(
+            select(Sweet.name, Sweet.id).where(Sweet.name.in_(list(by_name)))
+        ):
+            existing.setdefault(name, []).append(sweet_id)
+        to_insert = [row for name, (_, row) in by_name.items() if name not in existing]
+        for name, (row_number, row) in by_name.items():
+            if name not in existing:
+                continue
+            if len(existing[name]) > 1:
+                _record_error(report, row_number, [AMBIGUOUS_NAME_ERROR])
+                continue
+            sweet_id = existing[name][0]
+            live_stock = flash_sale.stock(sweet_id)
+            if live_stock is not None:
+                if row["stock"] != live_stock:
+                    _record_error(report, row_number, [HOT_STOCK_ERROR])
+                    continue
+                row = {**row, "stock": None}
+            to_update.append({"b_id": sweet_id, **{f"b_{key}": value for key, value in row.items()}})
+
+    try:
+        if to_insert:
+            db.execute(insert(Sweet), to_insert)
+        if to_update:
+            db.execute(_update_by_id, to_update)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    report.inserted += len(to_insert)
+    report.updated += len(to_update)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import sweets into the catalog.")
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    parser.add_argument("--no-upsert", action="store_true", help="always insert new rows")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    init_db()
+    with SessionLocal() as db, open(args.path, "rb") as stream:
+        try:
+            report = import_catalog(
+                db, stream, fmt, upsert=not args.no_upsert, batch_size=args.batch_size
+            )
+        except ImportAborted as exc:
+            print(exc.report.model_dump_json(indent=2))
+            raise SystemExit(str(exc))
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
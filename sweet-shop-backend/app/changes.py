@@ -0,0 +1,139 @@
+"""
+Row versions and tombstones for delta sync of the catalog.
+
+Every insert, delete and content update of a sweet takes the next value
+of a single ``catalog_version`` counter. Triggers on ``sweets`` do this
+in the same transaction as the write, so every write path is covered
+without application code: ORM writes, the stock UPDATEs, the write
+combiner, flash-sale write-back and bulk import. The new value is
+stored in the row's ``row_version``, or for a delete in a
+``sweet_tombstones`` row. ``changes_since`` then reads everything after
+a client's last seen version with two index range scans.
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import CatalogVersion, Sweet, SweetTombstone
+
+VERSION_ROW_ID = 1
+
+_NEXT_VERSION_SQL = f"UPDATE catalog_version SET version = version + 1 WHERE id = {VERSION_ROW_ID};"
+_CURRENT_VERSION_SQL = f"(SELECT version FROM catalog_version WHERE id = {VERSION_ROW_ID})"
+
+_CREATE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS sweets_version_ai AFTER INSERT ON sweets BEGIN
+        {_NEXT_VERSION_SQL}
+        UPDATE sweets SET row_version = {_CURRENT_VERSION_SQL} WHERE id = new.id;
+        DELETE FROM sweet_tombstones WHERE sweet_id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS sweets_version_au
+    AFTER UPDATE OF name, description, price, stock ON sweets
+    WHEN old.name IS NOT new.name OR old.description IS NOT new.description
+        OR old.price IS NOT new.price OR old.stock IS NOT new.stock
+    BEGIN
+        {_NEXT_VERSION_SQL}
+        UPDATE sweets SET row_version = {_CURRENT_VERSION_SQL} WHERE id = new.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS sweets_version_ad AFTER DELETE ON sweets BEGIN
+        {_NEXT_VERSION_SQL}
+        INSERT OR REPLACE INTO sweet_tombstones (sweet_id, row_version)
+        VALUES (old.id, {_CURRENT_VERSION_SQL});
+    END
+    """,
+]
+
+
+def ensure_versions(connection: Connection) -> bool:
+    """
+    Create the version counter, tombstone table and triggers if missing.
+
+    Rows that predate versioning are numbered by ID the first time.
+
+    Args:
+        connection: Connection to the database holding the sweets table
+
+    Returns:
+        True if row versions are maintained
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+
+    SweetTombstone.__table__.create(connection, checkfirst=True)
+    CatalogVersion.__table__.create(connection, checkfirst=True)
+    for statement in _CREATE_TRIGGERS_SQL:
+        connection.exec_driver_sql(statement)
+    if current_version(connection) is None:
+        sweets = Sweet.__table__
+        connection.execute(sweets.update().where(sweets.c.row_version == 0).values(row_version=sweets.c.id))
+        start = connection.execute(select(Sweet.row_version).order_by(Sweet.row_version.desc())).scalar()
+        connection.execute(
+            CatalogVersion.__table__.insert().values(id=VERSION_ROW_ID, version=start or 0)
+        )
+    return True
+
+
+def current_version(connection: Connection):
+    """The latest catalog version, or None before versioning is installed."""
+    return connection.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == VERSION_ROW_ID)
+    ).scalar()
+
+
+def changes_since(db: Session, since: int, limit: int) -> Dict[str, Any]:
+    """
+    Read the catalog changes after a version, oldest first.
+
+    Args:
+        db: Database session
+        since: Last version the client has applied (0 for everything)
+        limit: Maximum number of changes and deletions together
+
+    Returns:
+        Dictionary with ``changes`` (sweet rows with their row_version),
+        ``deleted`` (sweet_id and row_version), ``version`` (pass as
+        ``since`` next time) and ``more`` (whether to ask again now)
+    """
+    connection = db.connection()
+    columns = [Sweet.id, Sweet.name, Sweet.description, Sweet.price, Sweet.stock, Sweet.row_version]
+    rows = connection.execute(
+        select(*columns).where(Sweet.row_version > since).order_by(Sweet.row_version).limit(limit + 1)
+    ).all()
+    tombstones = connection.execute(
+        select(SweetTombstone.sweet_id, SweetTombstone.row_version)
+        .where(SweetTombstone.row_version > since)
+        .order_by(SweetTombstone.row_version)
+        .limit(limit + 1)
+    ).all()
+
+    merged = sorted(
+        [(row.row_version, False, row) for row in rows]
+        + [(row.row_version, True, row) for row in tombstones],
+        key=lambda item: item[0]
+    )
+    page = merged[:limit]
+
+    changes: List[Dict[str, Any]] = []
+    deleted: List[Dict[str, Any]] = []
+    for _, is_tombstone, row in page:
+        (deleted if is_tombstone else changes).append(dict(row._mapping))
+    return {
+        "changes": changes,
+        "deleted": deleted,
+        "version": page[-1][0] if page else since,
+        "more": len(merged) > limit,
+    }
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_versions_with_tables(target, connection, **kw):
+    ensure_versions(connection)
+
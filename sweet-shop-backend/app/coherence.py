@@ -0,0 +1,122 @@
+"""
+Keeping per-process state in step with writes made by other processes.
+
+With several workers, each process has its own catalog response cache
+and its own event subscribers, but writes land in the shared database.
+``CatalogVersionWatcher`` notices them cheaply: ``PRAGMA data_version``
+on a private connection changes only when another connection committed,
+and only then is the catalog version (bumped by the row-version triggers
+on every sweets write) read again. The response cache drops its entries
+when that version moves, and ``run_change_relay`` forwards the changes
+made through other workers to this worker's event subscribers.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+from typing import Optional
+
+from app.changes import VERSION_ROW_ID, changes_since
+from app.database import SessionLocal
+from app.events import stock_events
+
+logger = logging.getLogger(__name__)
+
+# Most changes relayed at once; a longer backlog makes subscribers resync
+RELAY_BATCH = 500
+
+_VERSION_SQL = f"SELECT version FROM catalog_version WHERE id = {VERSION_ROW_ID}"
+
+
+class CatalogVersionWatcher:
+    """
+    Catalog version of a SQLite database file, re-read only after a commit.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._data_version: Optional[int] = None
+        self._version: Optional[int] = None
+
+    def version(self) -> Optional[int]:
+        """
+        Get the current catalog version.
+
+        Costs one PRAGMA when nothing was committed since the last call.
+
+        Returns:
+            Catalog version, or None before row versioning is installed
+        """
+        with self._lock:
+            try:
+                if self._connection is None:
+                    self._connection = sqlite3.connect(
+                        self.path, check_same_thread=False, isolation_level=None
+                    )
+                data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+                if data_version != self._data_version:
+                    row = self._connection.execute(_VERSION_SQL).fetchone()
+                    self._version = row[0] if row else None
+                    self._data_version = data_version
+            except sqlite3.Error:
+                # Not initialized yet; look again next time
+                self._data_version = self._version = None
+            return self._version
+
+    def close(self) -> None:
+        """Close the private connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+def relay_changes(watcher: CatalogVersionWatcher, since: Optional[int]) -> Optional[int]:
+    """
+    Publish the catalog changes after ``since`` to this process's subscribers.
+
+    Changes made through this worker were published already and are
+    sent again with the same values, which subscribers coalesce.
+
+    Args:
+        watcher: Watcher of the shared database
+        since: Catalog version relayed so far, None to start from now
+
+    Returns:
+        Catalog version relayed up to
+    """
+    version = watcher.version()
+    if since is None or version is None or version <= since:
+        return version if since is None else since
+    if not stock_events.subscribers:
+        return version
+
+    with SessionLocal() as db:
+        body = changes_since(db, since, RELAY_BATCH)
+    if body["more"]:
+        stock_events.publish_resync()
+        return version
+    for change in body["changes"]:
+        stock_events.publish(change["id"], stock=change["stock"], price=change["price"])
+    for tombstone in body["deleted"]:
+        stock_events.publish_delete(tombstone["sweet_id"])
+    return body["version"]
+
+
+async def run_change_relay(watcher: CatalogVersionWatcher, interval: float) -> None:
+    """
+    Relay other workers' catalog changes every ``interval`` seconds until cancelled.
+
+    Args:
+        watcher: Watcher of the shared database
+        interval: Seconds between checks
+    """
+    since = await asyncio.to_thread(watcher.version)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            since = await asyncio.to_thread(relay_changes, watcher, since)
+        except Exception:
+            logger.exception("Relaying catalog changes failed")
@@ -0,0 +1,127 @@
+"""
+Application settings loaded from environment variables.
+
+Every setting can be overridden with an environment variable of the same
+name prefixed with SWEET_SHOP_, e.g. SWEET_SHOP_RESPONSE_CACHE_ENABLED=false.
+"""
+from typing import List
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Tunable runtime settings."""
+
+    model_config = SettingsConfigDict(env_prefix="SWEET_SHOP_", env_file=".env", extra="ignore")
+
+    # Serve routes from the async (aiosqlite) data path instead of the
+    # sync engine and Starlette's thread pool
+    database_async: bool = False
+
+    # Connection pool of each engine: connections kept open, extra ones
+    # allowed under load, seconds a checkout waits before failing, whether
+    # to test connections on checkout, and seconds after which a connection
+    # is replaced (-1 never). Size and overflow apply to file databases.
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30.0
+    database_pool_pre_ping: bool = False
+    database_pool_recycle: int = -1
+
+    # SQLite connection profile: "performance" applies the PRAGMAs below,
+    # "default" leaves SQLite's own defaults (rollback journal, synchronous=FULL)
+    sqlite_profile: str = "performance"
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64000  # negative means KiB, i.e. 64 MB
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_busy_timeout_ms: int = 5000
+    # Seconds between PASSIVE WAL checkpoints; 0 disables the background task
+    sqlite_wal_checkpoint_interval: float = 60.0
+
+    # Group commit for purchases and restocks, and seconds a request waits
+    # for its batch before giving up with 503
+    write_combiner_enabled: bool = False
+    write_combiner_window_ms: float = 2.0
+    write_combiner_max_batch: int = 64
+    write_combiner_timeout: float = 30.0
+
+    # Flash-sale mode: hot sweets sell from in-memory counters that are
+    # journaled on every change and flushed to the database periodically
+    flash_sale_sweet_ids: List[int] = []
+    flash_sale_journal_path: str = "flash_sale.journal"
+    flash_sale_flush_interval: float = 1.0
+    # fsync every journal append; survives power loss, not just a crash
+    flash_sale_journal_fsync: bool = False
+
+    # Password hashing: bcrypt cost, worker processes (0 means one per
+    # CPU), how many checks may wait before logins get 503, and the nice
+    # level of the workers so a login storm yields the CPU to other requests
+    password_bcrypt_rounds: int = 12
+    password_hash_processes: int = 0
+    password_hash_max_pending: int = 64
+    password_hash_niceness: int = 10
+
+    # Per-request profiling for admins sending X-Profile, and how many
+    # profiles /admin/profiles keeps
+    profiling_enabled: bool = True
+    profile_buffer_size: int = 50
+
+    # GET /inventory/events: sweets a client may lag behind on before it
+    # is told to resync, and seconds between keepalive comments
+    events_max_pending: int = 1000
+    events_keepalive_interval: float = 15.0
+
+    # Read replicas for the catalog lists and sweet details: SQLAlchemy
+    # URLs, seconds a user's reads stay on the primary after a write, and
+    # seconds between refreshes of SQLite file replicas from the primary
+    # (0 when something else keeps the replicas up to date)
+    read_replica_urls: List[str] = []
+    read_your_writes_seconds: float = 2.0
+    read_replica_refresh_interval: float = 1.0
+
+    # Admission control: requests handled at once per route class (catalog
+    # reads, purchases and checkouts, other catalog/inventory writes, auth;
+    # together the size of the thread pool), how long a request may wait
+    # in a standing queue before it gets 503, how long a queue must stay
+    # non-empty to count as standing, and waiting requests per class
+    admission_enabled: bool = True
+    admission_read_limit: int = 16
+    admission_purchase_limit: int = 16
+    admission_write_limit: int = 4
+    admission_auth_limit: int = 4
+    admission_read_target_ms: float = 5.0
+    admission_purchase_target_ms: float = 100.0
+    admission_write_target_ms: float = 50.0
+    admission_auth_target_ms: float = 20.0
+    admission_interval_ms: float = 100.0
+    admission_max_queue: int = 256
+
+    # Idempotency-Key on purchases and checkouts: seconds a response is
+    # replayed to retries, responses kept in memory (older ones are read
+    # back from the database), and seconds between purges of expired keys
+    idempotency_ttl_seconds: float = 86400.0
+    idempotency_max_entries: int = 10000
+    idempotency_purge_interval: float = 3600.0
+
+    # Production server (python -m app.serve): worker processes (0 means
+    # one per CPU), listen backlog, seconds an idle keep-alive connection
+    # stays open, seconds to finish in-flight requests on shutdown, and
+    # the access log (one line per request, off for throughput)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 1
+    server_backlog: int = 2048
+    server_keepalive: int = 5
+    server_graceful_timeout: float = 30.0
+    server_access_log: bool = False
+    # Seconds between relays of other workers' changes to event streams
+    server_change_relay_interval: float = 0.5
+
+    # Catalog response cache
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 1024
+
+
+settings = Settings()
@@ -1,27 +1,84 @@
 """
 Database configuration and session management.
 """
+import asyncio
+import logging
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from sqlalchemy.pool import StaticPool
-from typing import Generator
+from typing import AsyncGenerator, Callable, Generator, List, Optional, Tuple, TypeVar
+
+from app.config import Settings, settings
+from app.pool import create_pooled_engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def sqlite_pragmas(config: Settings = settings) -> List[Tuple[str, object]]:
+    """
+    Get the PRAGMAs applied to each new connection by the SQLite profile.
+    
+    Args:
+        config: Application settings
+        
+    Returns:
+        (name, value) pairs; empty for the "default" profile
+    """
+    if config.sqlite_profile != "performance":
+        return []
+    return [
+        ("journal_mode", config.sqlite_journal_mode),
+        ("synchronous", config.sqlite_synchronous),
+        ("busy_timeout", config.sqlite_busy_timeout_ms),
+        ("mmap_size", config.sqlite_mmap_size),
+        ("cache_size", config.sqlite_cache_size),
+        ("temp_store", config.sqlite_temp_store),
+    ]
+
+
+def configure_sqlite(target: Engine, config: Settings = settings) -> None:
+    """
+    Apply the SQLite performance profile to every connection of an engine.
+    
+    Args:
+        target: Engine for a file-backed SQLite database
+        config: Application settings
+    """
+    pragmas = sqlite_pragmas(config)
+    if not pragmas:
+        return
+    
+    @event.listens_for(target, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
 
 # SQLite database URL - use test database if running tests
 if os.getenv("TESTING"):
     DATABASE_URL = "sqlite:///:memory:"
     # Use StaticPool to ensure all connections share the same in-memory database
-    engine = create_engine(
+    engine = create_pooled_engine(
         DATABASE_URL,
+        "primary",
         poolclass=StaticPool,
         connect_args={"check_same_thread": False}
     )
 else:
     DATABASE_URL = "sqlite:///./sweet_shop.db"
-    engine = create_engine(
+    engine = create_pooled_engine(
         DATABASE_URL,
+        "primary",
         connect_args={"check_same_thread": False}
     )
+    configure_sqlite(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(
@@ -30,6 +87,11 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Same database through the aiosqlite driver, for the async data path
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
 # Base class for models
 Base = declarative_base()
 
@@ -45,8 +107,126 @@ def get_db() -> Generator:
         db.close()
 
 
+def get_async_engine() -> AsyncEngine:
+    """
+    Get the async engine, creating it on first use.
+    
+    Creation is deferred so that aiosqlite is only required when the
+    async data path is enabled.
+    
+    Returns:
+        AsyncEngine for ASYNC_DATABASE_URL
+    """
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        if os.getenv("TESTING"):
+            _async_engine = create_pooled_engine(
+                ASYNC_DATABASE_URL, "async", poolclass=StaticPool, create=create_async_engine
+            )
+        else:
+            _async_engine = create_pooled_engine(ASYNC_DATABASE_URL, "async", create=create_async_engine)
+            configure_sqlite(_async_engine.sync_engine)
+        _async_session_factory = async_sessionmaker(
+            _async_engine,
+            autoflush=False,
+            expire_on_commit=False
+        )
+    return _async_engine
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session.
+    """
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
+# SQLite admits one writer at a time. Queueing async writers here is
+# cheaper than having them spin in SQLite's busy handler, and keeps a
+# writer that holds the lock from waiting behind an overloaded event loop.
+_async_write_lock = asyncio.Lock()
+
+
+async def run_write(db: AsyncSession, fn: Callable[[Session], T]) -> T:
+    """
+    Run a sync write function on an async session, one writer at a time.
+    
+    Args:
+        db: Async database session
+        fn: Function taking the sync Session
+        
+    Returns:
+        Whatever fn returns
+    """
+    async with _async_write_lock:
+        return await db.run_sync(fn)
+
+
 def init_db():
     """
-    Initialize the database by creating all tables.
+    Initialize the database: tables, the search index, inventory stats
+    and row versioning.
     """
+    # Imported here to avoid a circular import through app.models
+    from app.changes import ensure_versions
+    from app.search import ensure_search_index
+    from app.stats import ensure_stats
+    
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        ensure_search_index(connection)
+        ensure_stats(connection)
+        ensure_versions(connection)
+
+
+def checkpoint_wal(target: Optional[Engine] = None, mode: str = "PASSIVE"):
+    """
+    Copy committed WAL frames back into the database file.
+    
+    Args:
+        target: Engine to checkpoint (default: the application engine)
+        mode: PASSIVE, FULL, RESTART or TRUNCATE
+        
+    Returns:
+        (busy, log frames, checkpointed frames) as reported by SQLite
+    """
+    with (target or engine).connect() as connection:
+        return tuple(connection.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").first())
+
+
+async def run_wal_checkpoints(interval: float) -> None:
+    """
+    Checkpoint the WAL every ``interval`` seconds until cancelled.
+    
+    Keeps the WAL file from growing without bound when readers are
+    always active and SQLite's automatic checkpoints cannot complete.
+    
+    Args:
+        interval: Seconds between checkpoints
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(checkpoint_wal)
+        except Exception:
+            logger.exception("WAL checkpoint failed")
+
+
+def wal_checkpoints_enabled(config: Settings = settings) -> bool:
+    """
+    Check whether the periodic WAL checkpoint task should run.
+    
+    Args:
+        config: Application settings
+        
+    Returns:
+        True for a file database in WAL mode with a positive interval
+    """
+    return (
+        not os.getenv("TESTING")
+        and config.sqlite_profile == "performance"
+        and config.sqlite_journal_mode.upper() == "WAL"
+        and config.sqlite_wal_checkpoint_interval > 0
+    )
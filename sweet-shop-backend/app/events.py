@@ -0,0 +1,165 @@
+"""
+In-process pub/sub of catalog changes, streamed as Server-Sent Events.
+
+Routers publish after their transaction commits; GET /inventory/events
+streams the changes to each connected client. Publishing never blocks on
+a client: every subscription keeps at most one pending change per sweet,
+merged with the newest values, so a slow client receives the latest
+state of each sweet rather than every intermediate step. A client that
+falls behind on more sweets than ``max_pending`` has its backlog dropped
+and is told to resync, i.e. re-fetch the list.
+
+Publishing is safe from any thread (sync endpoints, the write combiner).
+Subscribers are per process; with several workers, changes made through
+the other workers are relayed from the shared database by
+app.coherence.run_change_relay.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+
+Change = Dict[str, Any]
+
+
+class Subscription:
+    """
+    One client's pending changes, consumed on its event loop.
+    """
+
+    def __init__(self, broker: "StockEvents", max_pending: int):
+        self._broker = broker
+        self._max_pending = max_pending
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._notified = False
+        self._pending: "OrderedDict[int, Change]" = OrderedDict()
+        self._resync = False
+        self.dropped = 0
+
+    def _offer(self, change: Change) -> None:
+        # Caller holds the broker lock
+        sweet_id = change["sweet_id"]
+        pending = self._pending.get(sweet_id)
+        if pending is None or change.get("deleted") or pending.get("deleted"):
+            self._pending[sweet_id] = change
+        else:
+            pending.update((key, value) for key, value in change.items() if value is not None)
+        if len(self._pending) > self._max_pending:
+            self.dropped += len(self._pending)
+            self._pending.clear()
+            self._resync = True
+        self._notify()
+
+    def _offer_resync(self) -> None:
+        # Caller holds the broker lock
+        self._pending.clear()
+        self._resync = True
+        self._notify()
+
+    def _notify(self) -> None:
+        # Caller holds the broker lock; wake the consumer once per batch
+        if self._notified:
+            return
+        self._notified = True
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # The subscriber's loop has closed
+            pass
+
+    async def next_batch(self, timeout: float) -> Tuple[List[Change], bool]:
+        """
+        Wait for changes and take everything pending.
+
+        Args:
+            timeout: Seconds to wait before returning an empty batch
+
+        Returns:
+            Pending changes, oldest first, and whether the client must resync
+        """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._broker._lock:
+            self._wakeup.clear()
+            self._notified = False
+            changes = list(self._pending.values())
+            self._pending.clear()
+            resync, self._resync = self._resync, False
+        return changes, resync
+
+    def close(self) -> None:
+        """Stop receiving changes."""
+        self._broker.unsubscribe(self)
+
+
+class StockEvents:
+    """
+    Fan-out of catalog changes to subscriptions.
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._subscriptions: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def subscribers(self) -> int:
+        """Number of connected subscriptions."""
+        return len(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        """
+        Start receiving changes; must be called on the consumer's event loop.
+
+        Returns:
+            Subscription to read batches from
+        """
+        subscription = Subscription(self, self.max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering changes to a subscription."""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, sweet_id: int, stock: Optional[int] = None, price: Optional[float] = None) -> None:
+        """
+        Announce a committed change to a sweet.
+
+        Values left as None are looked up when the change is sent.
+
+        Args:
+            sweet_id: Sweet ID
+            stock: New stock level, if known
+            price: New price, if known
+        """
+        self._offer({"sweet_id": sweet_id, "stock": stock, "price": price})
+
+    def publish_delete(self, sweet_id: int) -> None:
+        """Announce that a sweet was deleted."""
+        self._offer({"sweet_id": sweet_id, "deleted": True})
+
+    def publish_resync(self) -> None:
+        """Tell every subscriber to re-fetch, e.g. after a bulk import."""
+        if not self._subscriptions:
+            return
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription._offer_resync()
+
+    def _offer(self, change: Change) -> None:
+        if not self._subscriptions:
+            return
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription._offer(dict(change))
+
+
+stock_events = StockEvents(settings.events_max_pending)
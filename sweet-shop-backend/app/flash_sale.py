@@ -0,0 +1,397 @@
+"""
+Flash-sale mode: in-memory stock counters for a few very hot sweets.
+
+However the SQL is written, every purchase of one sweet updates the same
+``sweets`` row, and under a flash sale that row becomes the bottleneck.
+A sweet in hot mode sells from an in-process counter seeded from the
+database instead. Every change is appended to a journal file before it
+is acknowledged, and the accumulated deltas are written back to the
+database periodically, when a sweet leaves hot mode and at shutdown.
+
+The database keeps the sequence number of the last journal entry it has
+absorbed, so after a crash ``recover`` replays exactly the entries that
+were acknowledged but never flushed.
+
+Counters live in one process: run a single worker while any sweet is hot,
+and enable sweets before the sale starts. Catalog edits and imports
+through the API refuse to change the stock of a hot sweet; the
+command-line import runs in another process and cannot tell, so leave it
+until after the sale.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import FlashSaleCheckpoint, Sweet
+from app.stock import PURCHASE, StockChange, get_stock
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ROW_ID = 1
+
+
+class HotCounter:
+    """Live stock of one hot sweet and the change not yet in the database."""
+    __slots__ = ("stock", "unflushed")
+
+    def __init__(self, stock: int):
+        self.stock = stock
+        self.unflushed = 0
+
+
+class FlashSale:
+    """
+    Journaled in-memory stock counters with periodic write-back.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        journal_path: str,
+        fsync: bool = False
+    ):
+        self.session_factory = session_factory
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self._counters: Dict[int, HotCounter] = {}
+        self._lock = threading.Lock()
+        # Serializes write-backs; taken before _lock, never while holding it
+        self._flush_lock = threading.Lock()
+        self._journal = None
+        self._seq = 0
+        self._recovered = False
+
+    @property
+    def flushing_path(self) -> str:
+        """Journal segment being written back to the database."""
+        return self.journal_path + ".flushing"
+
+    def is_hot(self, sweet_id: int) -> bool:
+        """Check whether a sweet sells from its in-memory counter."""
+        return sweet_id in self._counters
+
+    def stock(self, sweet_id: int) -> Optional[int]:
+        """
+        Get the live stock of a hot sweet.
+
+        Args:
+            sweet_id: Sweet ID
+
+        Returns:
+            Stock level, or None if the sweet is not hot
+        """
+        counter = self._counters.get(sweet_id)
+        return None if counter is None else counter.stock
+
+    def items(self) -> List[Dict[str, int]]:
+        """
+        List the hot sweets.
+
+        Returns:
+            Sweet ID, live stock and unflushed change for each hot sweet
+        """
+        with self._lock:
+            return [
+                {"sweet_id": sweet_id, "stock": counter.stock, "unflushed": counter.unflushed}
+                for sweet_id, counter in sorted(self._counters.items())
+            ]
+
+    def start(self, sweet_ids: List[int]) -> None:
+        """
+        Recover a leftover journal and put the configured sweets in hot mode.
+
+        Args:
+            sweet_ids: Sweets to sell from in-memory counters
+        """
+        if sweet_ids or os.path.exists(self.journal_path) or os.path.exists(self.flushing_path):
+            self.recover()
+        for sweet_id in sweet_ids:
+            if self.enable(sweet_id) is None:
+                logger.warning("Flash-sale sweet %d does not exist", sweet_id)
+
+    def recover(self) -> int:
+        """
+        Write back journal entries left over from a previous run.
+
+        Runs once, before any sweet is made hot; later calls do nothing.
+
+        Returns:
+            Number of journal entries applied to the database
+        """
+        with self._flush_lock, self._lock:
+            return self._recover_locked()
+
+    def enable(self, sweet_id: int) -> Optional[int]:
+        """
+        Put a sweet in hot mode, seeding its counter from the database.
+
+        Args:
+            sweet_id: Sweet ID
+
+        Returns:
+            Live stock, or None if the sweet does not exist
+        """
+        with self._flush_lock, self._lock:
+            self._recover_locked()
+            if sweet_id in self._counters:
+                return self._counters[sweet_id].stock
+            with self.session_factory() as db:
+                stock = get_stock(db, sweet_id)
+            if stock is not None:
+                self._counters[sweet_id] = HotCounter(stock)
+            return stock
+
+    def disable(self, sweet_id: int) -> Optional[int]:
+        """
+        Flush a hot sweet and return it to database-backed stock.
+
+        Args:
+            sweet_id: Sweet ID
+
+        Returns:
+            Final stock, or None if the sweet was not hot
+        """
+        with self._flush_lock, self._lock:
+            counter = self._counters.get(sweet_id)
+            if counter is None:
+                return None
+            self._flush_locked()
+            del self._counters[sweet_id]
+            return counter.stock
+
+    def discard(self, sweet_id: int) -> None:
+        """
+        Forget the counter of a sweet that was deleted.
+
+        Args:
+            sweet_id: Sweet ID
+        """
+        with self._flush_lock, self._lock:
+            self._counters.pop(sweet_id, None)
+
+    def apply(self, kind: str, sweet_id: int, quantity: int) -> Optional[StockChange]:
+        """
+        Apply a purchase or restock to a hot sweet's counter.
+
+        Args:
+            kind: PURCHASE or RESTOCK
+            sweet_id: Sweet ID
+            quantity: Units to purchase or add
+
+        Returns:
+            The outcome, or None if the sweet is not hot
+        """
+        delta = -quantity if kind == PURCHASE else quantity
+        with self._lock:
+            counter = self._counters.get(sweet_id)
+            if counter is None:
+                return None
+            if kind == PURCHASE and counter.stock < quantity:
+                return StockChange(new_stock=None, available=counter.stock)
+            self._append({sweet_id: delta})
+            counter.stock += delta
+            counter.unflushed += delta
+            return StockChange(new_stock=counter.stock, available=counter.stock)
+
+    def adjust_many(self, deltas: Dict[int, int]) -> Optional[Dict[int, int]]:
+        """
+        Apply changes to several hot sweets, all or nothing.
+
+        Args:
+            deltas: Mapping of hot sweet ID to units to add (negative to remove)
+
+        Returns:
+            Mapping of sweet ID to new stock, or None if any sweet is no
+            longer hot or would go below zero
+        """
+        with self._lock:
+            counters = {sweet_id: self._counters.get(sweet_id) for sweet_id in deltas}
+            if any(
+                counter is None or counter.stock + deltas[sweet_id] < 0
+                for sweet_id, counter in counters.items()
+            ):
+                return None
+            self._append(deltas)
+            for sweet_id, counter in counters.items():
+                counter.stock += deltas[sweet_id]
+                counter.unflushed += deltas[sweet_id]
+            return {sweet_id: counter.stock for sweet_id, counter in counters.items()}
+
+    def flush(self) -> int:
+        """
+        Write accumulated counter changes back to the database.
+
+        The counters stay usable while the database is written: only
+        taking the deltas and rotating the journal hold the counter lock.
+
+        Returns:
+            Number of sweets whose stock was written
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = self._begin_flush_locked()
+            if pending is None:
+                return 0
+            self._write_flush(*pending)
+            with self._lock:
+                self._end_flush_locked(pending[0])
+            return len(pending[0])
+
+    def close(self) -> None:
+        """Flush every counter and close the journal."""
+        with self._flush_lock, self._lock:
+            self._flush_locked()
+            self._close_journal()
+
+    def _append(self, deltas: Dict[int, int]) -> None:
+        """Journal changes before they are applied to the counters."""
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        lines = []
+        for sweet_id, delta in deltas.items():
+            self._seq += 1
+            lines.append(json.dumps({"seq": self._seq, "sweet_id": sweet_id, "delta": delta}) + "\n")
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _close_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _rotate(self) -> None:
+        """Move the live journal into the segment being flushed."""
+        self._close_journal()
+        if not os.path.exists(self.journal_path):
+            return
+        if not os.path.exists(self.flushing_path):
+            os.replace(self.journal_path, self.flushing_path)
+            return
+        # A previous flush failed; its segment is still pending
+        with open(self.journal_path, "rb") as src, open(self.flushing_path, "ab") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(self.journal_path)
+
+    def _flush_locked(self) -> int:
+        """Flush with both locks held, so no change slips in meanwhile."""
+        pending = self._begin_flush_locked()
+        if pending is None:
+            return 0
+        self._write_flush(*pending)
+        self._end_flush_locked(pending[0])
+        return len(pending[0])
+
+    def _begin_flush_locked(self) -> Optional[Tuple[Dict[int, int], int]]:
+        """Take the deltas to write back and rotate the journal they are in."""
+        deltas = {
+            sweet_id: counter.unflushed
+            for sweet_id, counter in self._counters.items() if counter.unflushed
+        }
+        last_seq = self._seq
+        self._rotate()
+        if not os.path.exists(self.flushing_path):
+            return None
+        return deltas, last_seq
+
+    def _write_flush(self, deltas: Dict[int, int], last_seq: int) -> None:
+        """Write a rotated journal segment back; it stays pending on failure."""
+        with self.session_factory() as db:
+            self._write_back(db, deltas, last_seq)
+        os.remove(self.flushing_path)
+
+    def _end_flush_locked(self, deltas: Dict[int, int]) -> None:
+        """Take written deltas off the counters, keeping changes made since."""
+        for sweet_id, delta in deltas.items():
+            counter = self._counters.get(sweet_id)
+            if counter is not None:
+                counter.unflushed -= delta
+
+    def _recover_locked(self) -> int:
+        if self._recovered:
+            return 0
+
+        entries: Dict[int, Dict[str, int]] = {}
+        for path in (self.flushing_path, self.journal_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                        entries[int(entry["seq"])] = entry
+                    except (ValueError, KeyError, TypeError):
+                        # A torn final line was never acknowledged
+                        continue
+
+        with self.session_factory() as db:
+            checkpoint = db.get(FlashSaleCheckpoint, CHECKPOINT_ROW_ID)
+            last_seq = checkpoint.last_seq if checkpoint else 0
+            pending = {seq: entry for seq, entry in entries.items() if seq > last_seq}
+
+            deltas: Dict[int, int] = {}
+            for entry in pending.values():
+                deltas[entry["sweet_id"]] = deltas.get(entry["sweet_id"], 0) + entry["delta"]
+            if pending:
+                self._write_back(db, deltas, max(pending))
+                logger.info("Recovered %d flash-sale journal entries", len(pending))
+
+        for path in (self.flushing_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        self._seq = max([last_seq, *entries])
+        self._recovered = True
+        return len(pending)
+
+    def _write_back(self, db: Session, deltas: Dict[int, int], last_seq: int) -> None:
+        """Add deltas to stock and record the journal position in one transaction."""
+        try:
+            for sweet_id, delta in deltas.items():
+                db.execute(
+                    update(Sweet)
+                    .where(Sweet.id == sweet_id)
+                    .values(stock=Sweet.stock + delta)
+                    .execution_options(synchronize_session=False)
+                )
+            checkpoint = db.get(FlashSaleCheckpoint, CHECKPOINT_ROW_ID)
+            if checkpoint is None:
+                db.add(FlashSaleCheckpoint(id=CHECKPOINT_ROW_ID, last_seq=last_seq))
+            else:
+                checkpoint.last_seq = last_seq
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+
+async def run_flushes(interval: float) -> None:
+    """
+    Flush the flash-sale counters every ``interval`` seconds until cancelled.
+
+    Args:
+        interval: Seconds between flushes
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(flash_sale.flush)
+        except Exception:
+            logger.exception("Flash-sale flush failed")
+
+
+flash_sale = FlashSale(
+    SessionLocal,
+    journal_path=settings.flash_sale_journal_path,
+    fsync=settings.flash_sale_journal_fsync
+)
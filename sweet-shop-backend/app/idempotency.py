@@ -0,0 +1,455 @@
+"""
+Idempotency keys for purchases and checkouts.
+
+Clients that retry ``POST /inventory/{id}/purchase`` or
+``POST /inventory/checkout`` after a timeout send the same
+``Idempotency-Key`` header with each attempt. The first request with a
+key is handled normally and its response is stored; retries get that
+response back, marked ``Idempotent-Replayed: true``, without auth or
+any query on sweets. Keys are scoped to the caller and the route and
+bound to the request body: reusing a key with another body gets 422,
+and a retry arriving while the first attempt is still being handled
+gets 409.
+
+Responses are kept in an in-memory LRU, so most replays make no query
+at all, and in the ``idempotency_keys`` table, so they survive restarts
+and are shared by workers. Two middlewares share the work:
+IdempotencyMiddleware, ahead of admission, answers from memory only;
+IdempotencyReservationMiddleware, behind admission, writes a row
+before the first attempt runs (the reservation is how a duplicate on
+another worker knows to wait), so requests shed under load cost no
+database write. Both expire after ``idempotency_ttl_seconds``; expired
+rows are purged by a background task. Outcomes a retry could change
+(5xx, 401, 409, 429, ...) are not kept.
+
+The stock change and the stored response are separate transactions. A
+reservation still pending after ``PENDING_TIMEOUT`` belongs to an
+attempt whose process died, possibly after its purchase committed, so
+retries get 409 "outcome unknown" until the key expires rather than
+being run again.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.responses import JSONResponse, Response
+
+from app.auth import decode_access_token
+from app.config import settings
+from app.database import SessionLocal
+from app.metrics import Counter, registry
+from app.models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+# Requests whose retries are answered from the store
+IDEMPOTENT_PATH = re.compile(r"/inventory/(?:\d+/purchase|checkout)")
+# Outcomes a retry may change, never stored: auth failures, conflicts, throttling
+RETRYABLE_STATUSES = frozenset({401, 403, 408, 409, 425, 429})
+# A reservation this old (seconds) belongs to an attempt that died with its
+# process; its outcome is unknown
+PENDING_TIMEOUT = 60.0
+# ASGI scope entry handing (scoped key, fingerprint) to the reservation middleware
+SCOPE_KEY = "idempotency"
+
+idempotent_requests = registry.register(Counter(
+    "idempotent_requests_total", "Requests carrying an Idempotency-Key, by outcome.", ("outcome",)
+))
+
+
+class StoredResponse(NamedTuple):
+    """What is known about a key."""
+    fingerprint: str
+    status_code: Optional[int]  # None while the first attempt is being handled
+    body: bytes
+    expires_at: float
+    # The first attempt died with its process; whether it took effect is unknown
+    abandoned: bool = False
+
+
+def scoped_key(caller: str, method: str, path: str, key: str) -> str:
+    """
+    Build the store key of a client's Idempotency-Key.
+
+    Args:
+        caller: Username from the bearer token
+        method: HTTP method
+        path: Request path
+        key: Idempotency-Key header value
+
+    Returns:
+        Key unique to the caller, route and client key
+    """
+    return f"{caller}:{method} {path}:{key}"
+
+
+def request_fingerprint(body: bytes) -> str:
+    """Hash of a request body, to tell a retry from a reused key."""
+    return hashlib.sha256(body).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    In-memory LRU of stored responses backed by the idempotency_keys table.
+
+    The in-memory side is used from the event loop only, so it needs no
+    lock; database calls run in worker threads.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.session_factory = session_factory
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        # Keys reserved by attempts in flight in this process, and their fingerprints
+        self._pending: Dict[str, str] = {}
+
+    def cached(self, key: str, now: float) -> Optional[StoredResponse]:
+        """
+        Look up a response kept in memory, marking it as recently used.
+
+        Args:
+            key: Scoped key
+            now: Current time (time.time())
+
+        Returns:
+            The stored response, or None if not in memory or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def known(self, key: str, now: float) -> Optional[StoredResponse]:
+        """
+        Find what this process knows about a key, without any query.
+
+        Args:
+            key: Scoped key
+            now: Current time (time.time())
+
+        Returns:
+            The stored response, a response with status_code None if an
+            attempt in this process holds the key, or None
+        """
+        entry = self.cached(key, now)
+        if entry is None and key in self._pending:
+            return StoredResponse(self._pending[key], None, b"", now)
+        return entry
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Reserve a key for a first attempt, or find what is known about it.
+
+        Args:
+            key: Scoped key
+            fingerprint: Request fingerprint
+
+        Returns:
+            None if the key was reserved (call finish once handled), else
+            the stored response; its status_code is None while another
+            attempt holds the key or if that attempt was abandoned
+        """
+        now = time.time()
+        entry = self.known(key, now)
+        if entry is not None:
+            return entry
+
+        self._pending[key] = fingerprint
+        try:
+            entry = await asyncio.to_thread(self._reserve, key, fingerprint, now)
+        except BaseException:
+            del self._pending[key]
+            raise
+        if entry is not None:
+            del self._pending[key]
+            if entry.status_code is not None:
+                self._remember(key, entry)
+        return entry
+
+    async def finish(self, key: str, status_code: int, body: bytes) -> None:
+        """
+        Store the response to a reserved key, or give the key up if a
+        retry could get a different outcome.
+
+        Args:
+            key: Scoped key returned as reserved by begin
+            status_code: Response status
+            body: Response body
+        """
+        try:
+            if status_code < 500 and status_code not in RETRYABLE_STATUSES:
+                entry = StoredResponse(self._pending[key], status_code, body, time.time() + self.ttl)
+                self._remember(key, entry)
+                await asyncio.to_thread(self._store, key, entry)
+            else:
+                await asyncio.to_thread(self._release, key)
+        finally:
+            self._pending.pop(key, None)
+
+    def clear(self) -> None:
+        """Forget the responses kept in memory."""
+        self._entries.clear()
+
+    def purge_expired(self) -> int:
+        """
+        Delete the rows of expired keys.
+
+        Returns:
+            Number of rows deleted
+        """
+        with self.session_factory() as db:
+            deleted = db.execute(
+                delete(IdempotencyRecord)
+                .where(IdempotencyRecord.created_at <= time.time() - self.ttl)
+            ).rowcount
+            db.commit()
+        return deleted
+
+    def _remember(self, key: str, entry: StoredResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _reserve(self, key: str, fingerprint: str, now: float) -> Optional[StoredResponse]:
+        """Insert the reservation row, or read the row already there."""
+        with self.session_factory() as db:
+            db.add(IdempotencyRecord(key=key, fingerprint=fingerprint, created_at=now))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            # Take over an expired row not purged yet
+            taken = db.execute(
+                update(IdempotencyRecord)
+                .where(IdempotencyRecord.key == key, IdempotencyRecord.created_at <= now - self.ttl)
+                .values(fingerprint=fingerprint, status_code=None, body=None, created_at=now)
+            ).rowcount
+            db.commit()
+            if taken:
+                return None
+
+            record = db.get(IdempotencyRecord, key)
+            if record is None:
+                # Deleted since the insert failed; let the client retry
+                return StoredResponse(fingerprint, None, b"", now)
+            return StoredResponse(
+                record.fingerprint, record.status_code, record.body or b"",
+                record.created_at + self.ttl,
+                abandoned=record.status_code is None and record.created_at <= now - PENDING_TIMEOUT
+            )
+
+    def _store(self, key: str, entry: StoredResponse) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                update(IdempotencyRecord)
+                .where(IdempotencyRecord.key == key)
+                .values(status_code=entry.status_code, body=entry.body)
+            )
+            db.commit()
+
+    def _release(self, key: str) -> None:
+        with self.session_factory() as db:
+            db.execute(
+                delete(IdempotencyRecord)
+                .where(IdempotencyRecord.key == key, IdempotencyRecord.status_code.is_(None))
+            )
+            db.commit()
+
+
+idempotency_store = IdempotencyStore(settings.idempotency_ttl_seconds, settings.idempotency_max_entries)
+
+
+def _caller(authorization: Optional[str]) -> Optional[str]:
+    """Subject of a bearer token, or None for anonymous or invalid tokens."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).username
+    except HTTPException:
+        return None
+
+
+async def _read_body(receive) -> bytes:
+    """Read a whole request body from an ASGI receive callable."""
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware answering retried purchases and checkouts from memory.
+
+    Runs ahead of admission; requests it cannot answer go on with their
+    scoped key in the scope, for IdempotencyReservationMiddleware.
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http" or scope["method"] != "POST"
+            or not IDEMPOTENT_PATH.fullmatch(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        client_key = headers.get(b"idempotency-key")
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        client_key = client_key.decode("latin-1").strip()
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"{IDEMPOTENCY_KEY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"},
+                status_code=400
+            )
+            await response(scope, receive, send)
+            return
+        caller = _caller(headers.get(b"authorization", b"").decode("latin-1"))
+        if caller is None:
+            # Not scoped to anyone; the endpoint rejects the credentials
+            await self.app(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        key = scoped_key(caller, scope["method"], scope["path"], client_key)
+        fingerprint = request_fingerprint(body)
+        stored = self.store.known(key, time.time())
+        if stored is not None:
+            await _answer(stored, fingerprint, scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_body():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        # The same scope dict goes on, so outer middleware sees scope["route"]
+        scope[SCOPE_KEY] = (key, fingerprint)
+        await self.app(scope, replay_body, send)
+
+
+class IdempotencyReservationMiddleware:
+    """
+    ASGI middleware reserving an admitted request's key and storing its
+    response.
+    """
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or idempotency_store
+
+    async def __call__(self, scope, receive, send):
+        if SCOPE_KEY not in scope:
+            await self.app(scope, receive, send)
+            return
+        key, fingerprint = scope[SCOPE_KEY]
+        stored = await self.store.begin(key, fingerprint)
+        if stored is not None:
+            await _answer(stored, fingerprint, scope, receive, send)
+            return
+
+        status_code = 500
+        chunks: List[bytes] = []
+
+        async def capture(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await self.store.finish(key, 500, b"")
+            raise
+        idempotent_requests.inc(("handled",))
+        await self.store.finish(key, status_code, b"".join(chunks))
+
+
+async def _answer(stored: StoredResponse, fingerprint: str, scope, receive, send) -> None:
+    """Replay a stored response, or explain why the key cannot be used."""
+    if stored.fingerprint != fingerprint:
+        idempotent_requests.inc(("mismatch",))
+        response = JSONResponse(
+            {"detail": f"{IDEMPOTENCY_KEY_HEADER} was already used with a different request"},
+            status_code=422
+        )
+    elif stored.abandoned:
+        idempotent_requests.inc(("abandoned",))
+        response = JSONResponse(
+            {"detail": f"The outcome of the request with this {IDEMPOTENCY_KEY_HEADER} is unknown; "
+                       "check your orders before retrying with a new key"},
+            status_code=409
+        )
+    elif stored.status_code is None:
+        idempotent_requests.inc(("in_progress",))
+        response = JSONResponse(
+            {"detail": f"A request with this {IDEMPOTENCY_KEY_HEADER} is still being processed"},
+            status_code=409,
+            headers={"Retry-After": "1"}
+        )
+    else:
+        idempotent_requests.inc(("replayed",))
+        response = Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"}
+        )
+    await response(scope, receive, send)
+
+
+async def run_idempotency_purges(interval: float) -> None:
+    """
+    Delete expired idempotency keys every ``interval`` seconds until cancelled.
+
+    Args:
+        interval: Seconds between purges
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(idempotency_store.purge_expired)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
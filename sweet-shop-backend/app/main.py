@@ -1,30 +1,133 @@
 """
 FastAPI application factory and main entry point.
 """
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, sweets, inventory
+from app.routers import admin, auth, sweets, inventory
+from app.pagination import NEXT_CURSOR_HEADER
+from app.config import settings
+from app.database import engine, run_wal_checkpoints, wal_checkpoints_enabled
+from app.cache import catalog_cache
+from app.coherence import CatalogVersionWatcher, run_change_relay
+from app.write_combiner import write_combiner
+from app.flash_sale import flash_sale, run_flushes
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, instrument_threadpool, registry
+from app import profiling
+from app.admission import AdmissionMiddleware
+from app.idempotency import (
+    REPLAYED_HEADER,
+    IdempotencyMiddleware,
+    IdempotencyReservationMiddleware,
+    run_idempotency_purges,
+)
+from app.replicas import ReadYourWritesMiddleware, read_replicas, run_replica_refreshes
+
+# With several workers, writes by the others (and by other processes, e.g.
+# imports) reach this worker's response cache through the shared catalog
+# version. A single worker sees all API writes itself and keeps cache hits
+# free of database calls.
+catalog_watcher: Optional[CatalogVersionWatcher] = None
+if settings.server_workers > 1 and engine.url.database not in (None, "", ":memory:"):
+    catalog_watcher = CatalogVersionWatcher(engine.url.database)
+    catalog_cache.shared_version = catalog_watcher.version
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background maintenance tasks."""
+    tasks = []
+    if wal_checkpoints_enabled():
+        tasks.append(asyncio.create_task(
+            run_wal_checkpoints(settings.sqlite_wal_checkpoint_interval)
+        ))
+    if settings.write_combiner_enabled:
+        write_combiner.start()
+    await asyncio.to_thread(flash_sale.start, settings.flash_sale_sweet_ids)
+    if catalog_watcher is not None:
+        tasks.append(asyncio.create_task(
+            run_change_relay(catalog_watcher, settings.server_change_relay_interval)
+        ))
+    if read_replicas.enabled and settings.read_replica_refresh_interval > 0:
+        tasks.append(asyncio.create_task(
+            run_replica_refreshes(settings.read_replica_refresh_interval)
+        ))
+    if settings.flash_sale_flush_interval > 0:
+        tasks.append(asyncio.create_task(run_flushes(settings.flash_sale_flush_interval)))
+    if settings.idempotency_purge_interval > 0:
+        tasks.append(asyncio.create_task(run_idempotency_purges(settings.idempotency_purge_interval)))
+    
+    yield
+    
+    # Drain queued purchases before shutting down
+    await asyncio.to_thread(write_combiner.stop)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Write hot counters back once no more purchases can arrive
+    await asyncio.to_thread(flash_sale.close)
+    if catalog_watcher is not None:
+        catalog_watcher.close()
+
 
 # Create FastAPI app
 app = FastAPI(
     title="Sweet Shop Management System",
     description="A comprehensive backend for managing a sweet shop",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Add CORS middleware
+# Keep users who just wrote on the primary (no-op without read replicas)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# On-demand profiling for admins sending X-Profile
+if settings.profiling_enabled:
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Idempotency-Key reservations, written only for admitted requests
+app.add_middleware(IdempotencyReservationMiddleware)
+
+# Bounded concurrency per route class; shed load with 503 before the
+# thread pool backs up
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
+# Retried purchases and checkouts carrying an Idempotency-Key get the
+# response kept in memory, ahead of admission and auth
+app.add_middleware(IdempotencyMiddleware)
+
+# Request metrics, around every other middleware but CORS
+app.add_middleware(MetricsMiddleware)
+
+# CORS outermost, so responses made by middleware (503 shed by admission,
+# replayed purchases) carry the CORS headers too and browsers can read them
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Retry-After", REPLAYED_HEADER],
 )
 
-# Include routers
-app.include_router(auth.router)
-app.include_router(sweets.router)
-app.include_router(inventory.router)
+instrument_threadpool()
+if settings.profiling_enabled:
+    profiling.instrument_threadpool()
+
+# Include routers, on the async or sync data path
+if settings.database_async:
+    app.include_router(auth.async_router)
+    app.include_router(sweets.async_router)
+    app.include_router(inventory.async_router)
+    app.include_router(admin.async_router)
+else:
+    app.include_router(auth.router)
+    app.include_router(sweets.router)
+    app.include_router(inventory.router)
+    app.include_router(admin.router)
 
 
 @app.get("/health")
@@ -33,6 +136,13 @@ async def health_check():
     return {"status": "ok", "message": "Sweet Shop API is running"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Request metrics in the Prometheus text format."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+# Development server with auto-reload; in production use python -m app.serve
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,8 +1,11 @@
 """
 SQLAlchemy ORM models for the Sweet Shop Management System.
 """
-from sqlalchemy import Column, Integer, String, Float, Enum as SQLEnum
+from sqlalchemy import (
+    Column, Index, Integer, LargeBinary, String, Float, Enum as SQLEnum, event, literal_column
+)
 from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import NEVER_SET, NO_VALUE
 from app.database import Base
 import enum
 
@@ -23,11 +26,21 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(SQLEnum(UserRole), default=UserRole.USER, nullable=False)
+    # Bumped whenever the role changes; tokens carry the version they were issued at
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
 
     def __repr__(self):
         return f"<User(id={self.id}, username={self.username}, role={self.role})>"
 
 
+@event.listens_for(User.role, "set", active_history=True)
+def _bump_token_version(target, value, oldvalue, initiator):
+    """Invalidate previously issued tokens when a user's role changes."""
+    if oldvalue in (NO_VALUE, NEVER_SET, None) or value == oldvalue:
+        return
+    target.token_version = User.token_version + 1
+
+
 class Sweet(Base):
     """
     Sweet model representing products in the shop.
@@ -39,9 +52,99 @@ class Sweet(Base):
     description = Column(String, nullable=False)
     price = Column(Float, nullable=False)
     stock = Column(Integer, default=0, nullable=False)
+    # Catalog version of the last change to this row, set by triggers (app.changes)
+    row_version = Column(Integer, default=0, server_default="0", nullable=False, index=True)
 
     def __repr__(self):
         return (
             f"<Sweet(id={self.id}, name={self.name}, description={self.description}, "
             f"price={self.price}, stock={self.stock})>"
         )
+
+
+# In-stock condition. The literal 0 (not a bound parameter) lets SQLite
+# match queries using it against the partial index below.
+IN_STOCK = Sweet.stock > literal_column("0")
+
+# Catalog filter and sort indexes, one per sort order: (column, id) rows
+# come out already in keyset order. Existing databases get them from the
+# Alembic migration 0001.
+Index("ix_sweets_price_id", Sweet.price, Sweet.id)
+Index("ix_sweets_stock_id", Sweet.stock, Sweet.id)
+Index("ix_sweets_in_stock_price_id", Sweet.price, Sweet.id, sqlite_where=IN_STOCK)
+
+
+class InventoryStats(Base):
+    """
+    Single-row summary of the inventory, maintained by triggers on sweets.
+    """
+    __tablename__ = "inventory_stats"
+
+    id = Column(Integer, primary_key=True)
+    total_products = Column(Integer, default=0, nullable=False)
+    total_stock = Column(Integer, default=0, nullable=False)
+    inventory_value = Column(Float, default=0.0, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<InventoryStats(total_products={self.total_products}, "
+            f"total_stock={self.total_stock}, inventory_value={self.inventory_value})>"
+        )
+
+
+class FlashSaleCheckpoint(Base):
+    """
+    Single-row record of the last flash-sale journal entry applied to sweets.
+    """
+    __tablename__ = "flash_sale_checkpoint"
+
+    id = Column(Integer, primary_key=True)
+    last_seq = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<FlashSaleCheckpoint(last_seq={self.last_seq})>"
+
+
+class SweetTombstone(Base):
+    """
+    Record of a deleted sweet, so change feeds can report the deletion.
+    """
+    __tablename__ = "sweet_tombstones"
+
+    sweet_id = Column(Integer, primary_key=True)
+    row_version = Column(Integer, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SweetTombstone(sweet_id={self.sweet_id}, row_version={self.row_version})>"
+
+
+class CatalogVersion(Base):
+    """
+    Single-row counter handing out row versions for catalog changes.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<CatalogVersion(version={self.version})>"
+
+
+class IdempotencyRecord(Base):
+    """
+    Response stored for an Idempotency-Key, replayed to retries (app.idempotency).
+    """
+    __tablename__ = "idempotency_keys"
+
+    # Caller, method, path and client key, see app.idempotency.scoped_key
+    key = Column(String, primary_key=True)
+    # Hash of the request body the key was first used with
+    fingerprint = Column(String, nullable=False)
+    # NULL while the first request is being handled
+    status_code = Column(Integer, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(Float, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyRecord(key={self.key}, status_code={self.status_code})>"
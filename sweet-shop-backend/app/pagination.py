@@ -0,0 +1,94 @@
+"""
+Cursor and projection helpers for keyset-paginated list endpoints.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Encode a keyset position as an opaque cursor string.
+
+    Args:
+        position: Sort key values of the last row on the page
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Opaque cursor string from a previous page
+
+    Returns:
+        Keyset position dictionary
+
+    Raises:
+        HTTPException: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        position = None
+
+    # bool is an int subclass, but true/false is no sweet ID
+    if (
+        not isinstance(position, dict)
+        or not isinstance(position.get("id"), int)
+        or isinstance(position["id"], bool)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return position
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """
+    Parse a comma-separated field projection.
+
+    The primary key is always included because it drives the cursor.
+
+    Args:
+        fields: Comma-separated field names, or None for all fields
+        allowed: Field names that may be projected
+
+    Returns:
+        Ordered list of field names to load
+
+    Raises:
+        HTTPException: If an unknown field is requested
+    """
+    if not fields:
+        return list(allowed)
+
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    selected = [name for name in allowed if name in requested]
+    if "id" not in selected:
+        selected.insert(0, "id")
+    return selected
@@ -0,0 +1,196 @@
+"""
+Password hashing with bcrypt, run off the request threads.
+
+A bcrypt check costs around 100 ms of CPU by design. Run inline, a burst
+of logins would occupy every thread in Starlette's pool and starve the
+catalog endpoints. Logins instead await a bounded process pool: excess
+requests are refused with PasswordHashingBusy rather than queued
+without limit.
+
+Hashes from before bcrypt (unsalted SHA256 hex digests) still verify,
+and ``needs_rehash`` flags them, along with bcrypt hashes at a different
+cost, so they can be replaced on the next successful login.
+"""
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+import bcrypt
+
+from app.config import settings
+
+T = TypeVar("T")
+
+# bcrypt only reads the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+class PasswordHashingBusy(RuntimeError):
+    """Raised when too many hash operations are already pending."""
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Hash a password with bcrypt.
+
+    Args:
+        password: Plain text password
+        rounds: bcrypt cost factor (default: the configured cost)
+
+    Returns:
+        bcrypt hash string
+    """
+    salt = bcrypt.gensalt(rounds or settings.password_bcrypt_rounds)
+    return bcrypt.hashpw(_password_bytes(password), salt).decode()
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password against a bcrypt or legacy SHA256 hash.
+
+    Args:
+        plain_password: Plain text password
+        hashed_password: Hashed password from database
+
+    Returns:
+        True if password matches, False otherwise
+    """
+    if is_legacy_hash(hashed_password):
+        digest = hashlib.sha256(plain_password.encode()).hexdigest()
+        return hmac.compare_digest(digest, hashed_password)
+    try:
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode())
+    except ValueError:
+        # Not a hash bcrypt understands
+        return False
+
+
+def is_legacy_hash(hashed_password: str) -> bool:
+    """Check for an unsalted SHA256 hex digest."""
+    return len(hashed_password) == 64 and not hashed_password.startswith(BCRYPT_PREFIXES)
+
+
+def needs_rehash(hashed_password: str, rounds: Optional[int] = None) -> bool:
+    """
+    Check whether a stored hash should be replaced after a successful login.
+
+    Args:
+        hashed_password: Hashed password from database
+        rounds: Wanted bcrypt cost factor (default: the configured cost)
+
+    Returns:
+        True for legacy hashes and bcrypt hashes at another cost
+    """
+    if not hashed_password.startswith(BCRYPT_PREFIXES):
+        return True
+    cost = int(hashed_password.split("$")[2])
+    return cost != (rounds or settings.password_bcrypt_rounds)
+
+
+def _password_bytes(password: str) -> bytes:
+    return password.encode()[:BCRYPT_MAX_BYTES]
+
+
+def _lower_priority(niceness: int) -> None:
+    """Worker initializer: let request handling win the CPU over hashing."""
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+class PasswordHasher:
+    """
+    Runs hashing and verification in a bounded pool of worker processes.
+    """
+
+    def __init__(
+        self,
+        processes: int = 0,
+        max_pending: int = 64,
+        rounds: Optional[int] = None,
+        niceness: int = 0
+    ):
+        self.processes = processes or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.niceness = niceness
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Operations queued or running in the pool."""
+        return self._pending
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password in the process pool.
+
+        Args:
+            plain_password: Plain text password
+            hashed_password: Hashed password from database
+
+        Returns:
+            True if password matches, False otherwise
+
+        Raises:
+            PasswordHashingBusy: If max_pending operations are already waiting
+        """
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password in the process pool.
+
+        Args:
+            password: Plain text password
+
+        Returns:
+            bcrypt hash string
+
+        Raises:
+            PasswordHashingBusy: If max_pending operations are already waiting
+        """
+        return await self._run(hash_password, password, self.rounds)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes; the pool restarts on next use."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHashingBusy("Too many password checks in progress")
+            self._pending += 1
+            if self._pool is None:
+                # Spawned workers import just this module and the settings,
+                # and are safe to start from a process that already runs threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_lower_priority,
+                    initargs=(self.niceness,)
+                )
+            pool = self._pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+password_hasher = PasswordHasher(
+    processes=settings.password_hash_processes,
+    max_pending=settings.password_hash_max_pending,
+    rounds=settings.password_bcrypt_rounds,
+    niceness=settings.password_hash_niceness
+)
@@ -0,0 +1,243 @@
+"""
+Connection pool settings and saturation telemetry.
+
+Engines are created with the pool size, overflow, timeout, pre-ping and
+recycle from the settings, and with a pool class that times how long
+each checkout waited for a usable connection. Pool event listeners count
+the connections in use, checkouts beyond ``pool_size`` (overflow), new
+and invalidated connections. GET /admin/pool serves the numbers and
+/metrics exports them per pool.
+"""
+import threading
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.config import Settings, settings
+from app.metrics import Counter, Gauge, Histogram, registry
+
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+checkout_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time a checkout waited for a usable connection.",
+    WAIT_BUCKETS, ("pool",)
+))
+connections_in_use = registry.register(Gauge(
+    "db_pool_connections_in_use", "Connections checked out of the pool.", ("pool",)
+))
+overflow_checkouts = registry.register(Counter(
+    "db_pool_overflow_checkouts_total", "Checkouts with more than pool_size connections in use.", ("pool",)
+))
+checkout_timeouts = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after pool_timeout.", ("pool",)
+))
+
+
+class PoolTelemetry:
+    """
+    Checkout, overflow and wait statistics of one engine's pool.
+    """
+
+    def __init__(self, name: str, pool_class: str, options: Dict[str, Any]):
+        self.name = name
+        self.pool_class = pool_class
+        self.options = options
+        self.engine: Optional[Engine] = None
+        self._labels = (name,)
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        """Record how long one checkout waited, and whether it timed out."""
+        checkout_wait.observe(seconds, self._labels)
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+        if timed_out:
+            checkout_timeouts.inc(self._labels)
+
+    def attach(self, target: Engine) -> None:
+        """
+        Listen to the pool events of an engine.
+
+        Args:
+            target: Engine whose pool uses an instrumented pool class
+        """
+        self.engine = target
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "checkin", self._on_checkin)
+        event.listen(target, "connect", self._on_connect)
+        event.listen(target, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        size = self.options.get("pool_size")
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            overflowed = size is not None and self.in_use > size
+            if overflowed:
+                self.overflow_checkouts += 1
+        connections_in_use.inc(self._labels)
+        if overflowed:
+            overflow_checkouts.inc(self._labels)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.in_use -= 1
+        connections_in_use.dec(self._labels)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the pool's configuration and counters.
+
+        Returns:
+            Dictionary matching the PoolStats schema
+        """
+        pool = self.engine.pool if self.engine is not None else None
+        idle = pool.checkedin() if isinstance(pool, QueuePool) else None
+        with self._lock:
+            return {
+                "name": self.name,
+                "pool_class": self.pool_class,
+                "pool_size": self.options.get("pool_size"),
+                "max_overflow": self.options.get("max_overflow"),
+                "timeout": self.options.get("pool_timeout"),
+                "pre_ping": self.options["pool_pre_ping"],
+                "recycle": self.options["pool_recycle"],
+                "in_use": self.in_use,
+                "idle": idle,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "mean_wait_ms": self.wait_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.wait_max * 1000,
+            }
+
+
+def instrumented_pool_class(base: Type[Pool], telemetry: PoolTelemetry) -> Type[Pool]:
+    """
+    Subclass a pool class so every checkout reports its wait.
+
+    Pool events fire only once a connection is handed out, so the wait
+    is timed around ``Pool.connect``; it includes pre-ping and opening
+    new connections. Pools recreated on dispose keep the subclass.
+
+    Args:
+        base: Pool class to instrument
+        telemetry: Where to record the waits
+
+    Returns:
+        Pool class for the engine
+    """
+    def connect(self):
+        started = perf_counter()
+        timed_out = False
+        try:
+            return base.connect(self)
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            telemetry.record_wait(perf_counter() - started, timed_out)
+
+    return type(f"Instrumented{base.__name__}", (base,), {"connect": connect})
+
+
+def pool_options(base: Type[Pool], config: Settings = settings) -> Dict[str, Any]:
+    """
+    Get the pool arguments for an engine from the settings.
+
+    Args:
+        base: Pool class; size, overflow and timeout only apply to queue pools
+        config: Application settings
+
+    Returns:
+        Keyword arguments for create_engine
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": config.database_pool_pre_ping,
+        "pool_recycle": config.database_pool_recycle,
+    }
+    if issubclass(base, QueuePool):
+        options.update(
+            pool_size=config.database_pool_size,
+            max_overflow=config.database_max_overflow,
+            pool_timeout=config.database_pool_timeout,
+        )
+    return options
+
+
+_pools: Dict[str, PoolTelemetry] = {}
+
+
+def create_pooled_engine(
+    url: str,
+    name: str,
+    poolclass: Optional[Type[Pool]] = None,
+    config: Settings = settings,
+    create: Callable[..., Any] = create_engine,
+    **kwargs
+):
+    """
+    Create an engine with the configured, instrumented pool.
+
+    Args:
+        url: Database URL
+        name: Pool name in diagnostics and metrics labels
+        poolclass: Pool class (default: SQLAlchemy's queue pool for the driver)
+        config: Application settings
+        create: create_engine or create_async_engine
+        **kwargs: Further create_engine arguments
+
+    Returns:
+        The engine, as returned by ``create``
+    """
+    if poolclass is None:
+        poolclass = QueuePool if create is create_engine else AsyncAdaptedQueuePool
+    options = pool_options(poolclass, config)
+    telemetry = PoolTelemetry(name, poolclass.__name__, options)
+
+    target = create(url, poolclass=instrumented_pool_class(poolclass, telemetry), **options, **kwargs)
+    telemetry.attach(getattr(target, "sync_engine", target))
+    _pools[name] = telemetry
+    return target
+
+
+def forget_pool(name: str) -> None:
+    """Stop reporting a pool whose engine was disposed."""
+    _pools.pop(name, None)
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """
+    Get the statistics of every pool created with create_pooled_engine.
+
+    Returns:
+        One dictionary per pool, in creation order
+    """
+    return [telemetry.stats() for telemetry in list(_pools.values())]
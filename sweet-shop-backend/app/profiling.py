@@ -0,0 +1,334 @@
+"""
+On-demand profiling of single requests.
+
+An admin sends ``X-Profile: 1`` with any request. That request then runs
+under cProfile, its SQL statements are timed, and the result is kept in
+a bounded ring buffer readable at /admin/profiles. The response carries
+an ``X-Profile-Id`` header and a ``Server-Timing`` header with the wall
+time spent per phase.
+
+Phases are derived from the profile itself: each function's own time is
+attributed by the module it lives in (JWT/auth, SQL, serialization,
+framework, application code), so the phases never double count and add
+up to the profiled time. Work in thread-pool workers is profiled too and
+merged in. The event loop is shared, so coroutines of other requests
+running at the same moment can show up in a profile.
+"""
+import cProfile
+import io
+import pstats
+import threading
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Deque, Dict, List, Optional
+
+import anyio.to_thread
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from app.auth import decode_access_token, get_current_principal
+from app.config import settings
+from app.database import SessionLocal
+from app.models import UserRole
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Where each function's own time goes, matched in order against the
+# function's file and name; anything else is "other"
+PHASES = [
+    ("auth", ("/jose/", "/cryptography/", "app/auth.py", "app/passwords.py")),
+    ("sql", ("/sqlalchemy/", "sqlite3", "/aiosqlite/")),
+    ("serialization", ("/pydantic/", "pydantic_core", "/fastapi/encoders.py", "/json/")),
+    ("framework", ("/starlette/", "/fastapi/", "/anyio/", "/uvicorn/", "/asyncio/")),
+    ("app", ("/app/",)),
+]
+
+MAX_STATEMENT_LENGTH = 2000
+TOP_FUNCTIONS = 30
+
+
+class RequestProfile:
+    """Everything recorded for one profiled request."""
+
+    def __init__(self, method: str, path: str):
+        self.id = 0
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.wall_ms = 0.0
+        self.threadpool_wait_ms = 0.0
+        self.sql: List[Dict[str, Any]] = []
+        self.phases_ms: Dict[str, float] = {}
+        self.functions: List[Dict[str, Any]] = []
+        self.call_tree = ""
+        self._profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add_profiler(self, profiler: cProfile.Profile) -> None:
+        """Include a profiler from another thread in the result."""
+        with self._lock:
+            self._profilers.append(profiler)
+
+    def add_statement(self, statement: str, duration: float) -> None:
+        """Record one SQL statement and how long it took."""
+        with self._lock:
+            self.sql.append({
+                "statement": statement[:MAX_STATEMENT_LENGTH],
+                "duration_ms": duration * 1000,
+            })
+
+    def add_threadpool_wait(self, wait: float) -> None:
+        with self._lock:
+            self.threadpool_wait_ms += wait * 1000
+
+    def finish(self, status: int, wall: float) -> None:
+        """Summarise the collected profiles once the response has started."""
+        self.status = status
+        self.wall_ms = wall * 1000
+        with self._lock:
+            profilers = list(self._profilers)
+
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+
+        phases = {name: 0.0 for name, _ in PHASES}
+        phases["other"] = 0.0
+        for (filename, _, name), (_, _, own, _, _) in stats.stats.items():
+            phases[_phase_of(filename, name)] += own * 1000
+        self.phases_ms = phases
+
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        self.functions = [
+            {
+                "function": pstats.func_std_string(function),
+                "calls": calls,
+                "own_ms": own * 1000,
+                "cumulative_ms": cumulative * 1000,
+            }
+            for function, (_, calls, own, cumulative, _) in ranked[:TOP_FUNCTIONS]
+        ]
+
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats("cumulative").print_callees(TOP_FUNCTIONS)
+        self.call_tree = output.getvalue()
+
+    def server_timing(self) -> str:
+        """Phases as a Server-Timing header value."""
+        entries = [f"total;dur={self.wall_ms:.2f}"]
+        entries.append(f"sql-statements;dur={sum(s['duration_ms'] for s in self.sql):.2f}")
+        entries.append(f"threadpool-wait;dur={self.threadpool_wait_ms:.2f}")
+        entries.extend(f"{name};dur={ms:.2f}" for name, ms in self.phases_ms.items())
+        return ", ".join(entries)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "created_at": self.created_at,
+            "wall_ms": self.wall_ms,
+            "sql_count": len(self.sql),
+        }
+
+    def detail(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "threadpool_wait_ms": self.threadpool_wait_ms,
+            "phases_ms": self.phases_ms,
+            "sql": self.sql,
+            "functions": self.functions,
+            "call_tree": self.call_tree,
+        }
+
+
+def _phase_of(filename: str, name: str) -> str:
+    location = f"{filename}:{name}"
+    for phase, markers in PHASES:
+        if any(marker in location for marker in markers):
+            return phase
+    return "other"
+
+
+class ProfileStore:
+    """
+    Ring buffer of the most recent request profiles.
+    """
+
+    def __init__(self, max_entries: int = 50):
+        self._profiles: Deque[RequestProfile] = deque(maxlen=max_entries)
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        """Store a profile, dropping the oldest when full."""
+        with self._lock:
+            profile.id = self._next_id
+            self._next_id += 1
+            self._profiles.append(profile)
+
+    def list(self) -> List[RequestProfile]:
+        """Stored profiles, newest first."""
+        with self._lock:
+            return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        """Look up a stored profile by ID."""
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._profiles.clear()
+
+
+profile_store = ProfileStore(settings.profile_buffer_size)
+
+_active: ContextVar[Optional[RequestProfile]] = ContextVar("active_profile", default=None)
+# Whether a request's profiler is hooked into the event loop thread
+_loop_profiled = False
+
+
+def _enable(profiler: cProfile.Profile) -> bool:
+    """Start a profiler; False if another profiling tool holds this thread."""
+    try:
+        profiler.enable()
+    except ValueError:
+        return False
+    return True
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _statement_started(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() is not None:
+        conn.info.setdefault("profile_started", []).append(perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _statement_finished(conn, cursor, statement, parameters, context, executemany):
+    profile = _active.get()
+    started = conn.info.get("profile_started")
+    if profile is not None and started:
+        profile.add_statement(statement, perf_counter() - started.pop())
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling requests that ask for it with X-Profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope) or not await _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        global _loop_profiled
+        profiler = cProfile.Profile()
+        if _loop_profiled or not _enable(profiler):
+            # One profiler at a time can hook the event loop thread (Python
+            # 3.12+ refuses a second); overlapping requests run unprofiled
+            await self.app(scope, receive, send)
+            return
+        _loop_profiled = True
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        profile.add_profiler(profiler)
+        token = _active.set(profile)
+        started = perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and profile.status is None:
+                profiler.disable()
+                profile.finish(message["status"], perf_counter() - started)
+                profile_store.add(profile)
+                headers = MutableHeaders(scope=message)
+                headers[PROFILE_ID_HEADER] = str(profile.id)
+                headers["Server-Timing"] = profile.server_timing()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            _loop_profiled = False
+            _active.reset(token)
+
+
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value not in (b"", b"0", b"false")
+    return False
+
+
+async def _is_admin(scope) -> bool:
+    """Check for an admin bearer token; claims first, the database for older tokens."""
+    authorization = next(
+        (value.decode() for name, value in scope["headers"] if name == b"authorization"), ""
+    )
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        principal = decode_access_token(token)
+        if principal.role is None:
+            principal = await run_in_threadpool(_principal_from_database, token)
+    except HTTPException:
+        return False
+    return principal.role == UserRole.ADMIN
+
+
+def _principal_from_database(token: str):
+    with SessionLocal() as db:
+        return get_current_principal(token, db)
+
+
+_run_sync = None
+
+
+async def _profiled_run_sync(func, *args, **kwargs):
+    """anyio.to_thread.run_sync that profiles func when its request is profiled."""
+    profile = _active.get()
+    if profile is None:
+        return await _run_sync(func, *args, **kwargs)
+
+    submitted = perf_counter()
+
+    def profiled(*call_args):
+        profile.add_threadpool_wait(perf_counter() - submitted)
+        profiler = cProfile.Profile()
+        if not _enable(profiler):
+            # Python 3.12+: one profiler per interpreter, already covering this thread
+            return func(*call_args)
+        try:
+            return func(*call_args)
+        finally:
+            profiler.disable()
+            profile.add_profiler(profiler)
+
+    return await _run_sync(profiled, *args, **kwargs)
+
+
+def instrument_threadpool() -> None:
+    """
+    Profile thread-pool work belonging to profiled requests.
+
+    Wraps whatever ``anyio.to_thread.run_sync`` currently is, so it
+    composes with the metrics wrapper.
+    """
+    global _run_sync
+    if _run_sync is None:
+        _run_sync = anyio.to_thread.run_sync
+        anyio.to_thread.run_sync = _profiled_run_sync
@@ -0,0 +1,254 @@
+"""
+Read replicas for catalog reads.
+
+Catalog reads (inventory pages, search, sweet details) take their session
+from ``get_read_db``, which hands out a read-only session on one of the
+replica engines in turn; every other query stays on the primary. A user
+who has just written reads from the primary for ``sticky_seconds`` so
+they see their own change before the replicas catch up.
+
+Replicas that are SQLite files are refreshed from the primary with the
+SQLite backup API whenever the catalog version moved. Each refresh drops
+the cached catalog responses, and responses read from a replica are
+cached apart from primary ones, so a stale replica page is never served
+to a user who is reading their own writes.
+"""
+import asyncio
+import itertools
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Generator, List, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.auth import decode_access_token
+from app.cache import catalog_cache
+from app.changes import current_version
+from app.config import settings
+from app.database import configure_sqlite, engine, get_db
+from app.pool import create_pooled_engine, forget_pool
+
+logger = logging.getLogger(__name__)
+
+# Methods that never write; any other successful request counts as a write
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Session.info key marking a session opened on a replica
+REPLICA_INFO_KEY = "replica"
+
+
+def create_replica_engine(url: str, name: str) -> Engine:
+    """
+    Create a read-only engine for a replica.
+
+    Args:
+        url: SQLAlchemy database URL of the replica
+        name: Pool name in diagnostics and metrics
+
+    Returns:
+        Engine whose SQLite connections refuse writes
+    """
+    if not url.startswith("sqlite"):
+        return create_pooled_engine(url, name)
+
+    replica = create_pooled_engine(url, name, connect_args={"check_same_thread": False})
+    configure_sqlite(replica)
+
+    @event.listens_for(replica, "connect")
+    def _read_only(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    return replica
+
+
+class ReadReplicas:
+    """
+    Replica engines, round-robin selection and read-your-writes stickiness.
+    """
+
+    def __init__(self, urls: Sequence[str] = (), sticky_seconds: float = 2.0):
+        self.sticky_seconds = sticky_seconds
+        self.engines: List[Engine] = []
+        self._factories: List[sessionmaker] = []
+        self._turn = itertools.count()
+        self._recent_writers: Dict[str, float] = {}
+        self._refreshed_version = None
+        self._refresh_lock = threading.Lock()
+        self.refreshes = 0
+        self.configure(urls)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any replica is configured."""
+        return bool(self._factories)
+
+    def configure(self, urls: Sequence[str]) -> None:
+        """
+        Replace the replica engines; an empty list sends all reads to the primary.
+
+        Args:
+            urls: SQLAlchemy database URLs of the replicas
+        """
+        for index, replica in enumerate(self.engines):
+            replica.dispose()
+            forget_pool(f"replica-{index}")
+        self.engines = [create_replica_engine(url, f"replica-{index}") for index, url in enumerate(urls)]
+        self._factories = [
+            sessionmaker(autocommit=False, autoflush=False, bind=replica) for replica in self.engines
+        ]
+        self._recent_writers.clear()
+        self._refreshed_version = None
+
+    def mark_write(self, username: str) -> None:
+        """Keep a user's reads on the primary for the next sticky_seconds."""
+        now = time.monotonic()
+        if len(self._recent_writers) > 10000:
+            self._recent_writers = {
+                name: until for name, until in self._recent_writers.items() if until > now
+            }
+        self._recent_writers[username] = now + self.sticky_seconds
+
+    def reads_primary(self, username: Optional[str]) -> bool:
+        """Whether a user wrote within the last sticky_seconds."""
+        until = self._recent_writers.get(username) if username else None
+        return until is not None and until > time.monotonic()
+
+    def session_factory(self, authorization: Optional[str]) -> Optional[sessionmaker]:
+        """
+        Pick the session factory for a read.
+
+        Args:
+            authorization: Authorization header of the request, if any
+
+        Returns:
+            Factory of the next replica, or None to read from the primary
+        """
+        if not self._factories:
+            return None
+        if self._recent_writers and self.reads_primary(_username(authorization)):
+            return None
+        return self._factories[next(self._turn) % len(self._factories)]
+
+    def refresh(self, source: Optional[Engine] = None, force: bool = False) -> bool:
+        """
+        Copy the primary into every SQLite file replica if the catalog changed.
+
+        Readers of a replica keep their snapshot while it is overwritten
+        (replicas of a WAL primary are in WAL mode too).
+
+        Args:
+            source: Primary engine (default: the application engine)
+            force: Copy even if the catalog version did not move
+
+        Returns:
+            True if the replicas were refreshed
+        """
+        files = [replica.url.database for replica in self.engines if replica.dialect.name == "sqlite"]
+        if not files:
+            return False
+
+        with self._refresh_lock, (source or engine).connect() as connection:
+            version = current_version(connection)
+            if not force and version is not None and version == self._refreshed_version:
+                return False
+            primary = connection.connection.driver_connection
+            for path in files:
+                replica = sqlite3.connect(path, timeout=settings.sqlite_busy_timeout_ms / 1000)
+                try:
+                    primary.backup(replica)
+                finally:
+                    replica.close()
+            self._refreshed_version = version
+            self.refreshes += 1
+
+        # Replica responses cached before the refresh describe the old copy
+        catalog_cache.invalidate()
+        return True
+
+
+def _username(authorization: Optional[str]) -> Optional[str]:
+    """Subject of a bearer token, or None for anonymous or invalid tokens."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_access_token(token).username
+    except HTTPException:
+        return None
+
+
+read_replicas = ReadReplicas(settings.read_replica_urls, settings.read_your_writes_seconds)
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)) -> Generator:
+    """
+    Dependency function to get a session for catalog reads.
+
+    Yields a read-only replica session, or the primary session when no
+    replica is configured or the caller wrote recently.
+    """
+    factory = read_replicas.session_factory(request.headers.get("authorization"))
+    if factory is None:
+        yield db
+        return
+
+    replica = factory()
+    replica.info[REPLICA_INFO_KEY] = True
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+
+def read_source(db: Session) -> str:
+    """Name of the database a session reads from, for cache keys."""
+    return "replica" if db.info.get(REPLICA_INFO_KEY) else "primary"
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware pinning users to the primary after a successful write.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not read_replicas.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                authorization = next(
+                    (value.decode() for name, value in scope["headers"] if name == b"authorization"), None
+                )
+                username = _username(authorization)
+                if username:
+                    read_replicas.mark_write(username)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+async def run_replica_refreshes(interval: float) -> None:
+    """
+    Refresh the SQLite file replicas every ``interval`` seconds until cancelled.
+
+    Args:
+        interval: Seconds between refreshes
+    """
+    while True:
+        try:
+            await asyncio.to_thread(read_replicas.refresh)
+        except Exception:
+            logger.exception("Read replica refresh failed")
+        await asyncio.sleep(interval)
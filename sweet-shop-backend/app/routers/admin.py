@@ -0,0 +1,118 @@
+"""
+Admin diagnostics endpoints.
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+
+from app.models import UserRole
+from app.schemas import PoolStats, ProfileDetail, ProfileSummary, TokenData
+from app.auth import get_current_principal, get_current_principal_async
+from app.pool import pool_stats
+from app.profiling import profile_store
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _require_admin(principal: TokenData, detail: str = "Only admins can view profiles") -> None:
+    if principal.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail
+        )
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+def list_profiles(principal: TokenData = Depends(get_current_principal)):
+    """
+    List the stored request profiles, newest first (admin only).
+
+    Requests are profiled when an admin sends them with ``X-Profile: 1``.
+
+    Args:
+        principal: Caller identity from the token
+
+    Returns:
+        Summary of each stored profile
+
+    Raises:
+        403: If user is not an admin
+    """
+    _require_admin(principal)
+
+    return [profile.summary() for profile in profile_store.list()]
+
+
+@router.get("/profiles/{profile_id}", response_model=ProfileDetail)
+def get_profile(profile_id: int, principal: TokenData = Depends(get_current_principal)):
+    """
+    Get one request profile with its call tree and SQL trace (admin only).
+
+    Args:
+        profile_id: Profile ID from the X-Profile-Id response header
+        principal: Caller identity from the token
+
+    Returns:
+        Phase timings, SQL statements, top functions and call tree
+
+    Raises:
+        403: If user is not an admin
+        404: If the profile is unknown or has left the buffer
+    """
+    _require_admin(principal)
+
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return profile.detail()
+
+
+@router.get("/pool", response_model=List[PoolStats])
+def get_pool_stats(principal: TokenData = Depends(get_current_principal)):
+    """
+    Get the connection pool settings and saturation counters (admin only).
+
+    ``in_use`` near ``pool_size + max_overflow``, rising overflow
+    checkouts and checkout waits well above zero mean requests are
+    queueing for a database connection.
+
+    Args:
+        principal: Caller identity from the token
+
+    Returns:
+        One entry per engine: primary, async and read replicas
+
+    Raises:
+        403: If user is not an admin
+    """
+    _require_admin(principal, "Only admins can view pool statistics")
+
+    return pool_stats()
+
+
+# Async data path: the handlers touch no database, so only the principal
+# dependency differs
+async_router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@async_router.get("/profiles", response_model=List[ProfileSummary])
+async def list_profiles_async(principal: TokenData = Depends(get_current_principal_async)):
+    """Async variant of list_profiles."""
+    return list_profiles(principal=principal)
+
+
+@async_router.get("/profiles/{profile_id}", response_model=ProfileDetail)
+async def get_profile_async(
+    profile_id: int,
+    principal: TokenData = Depends(get_current_principal_async)
+):
+    """Async variant of get_profile."""
+    return get_profile(profile_id=profile_id, principal=principal)
+
+
+@async_router.get("/pool", response_model=List[PoolStats])
+async def get_pool_stats_async(principal: TokenData = Depends(get_current_principal_async)):
+    """Async variant of get_pool_stats."""
+    return get_pool_stats(principal=principal)
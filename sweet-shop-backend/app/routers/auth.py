@@ -2,31 +2,39 @@
 Authentication router for user registration and login.
 """
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db, run_write
 from app.models import User, UserRole
 from app.schemas import UserCreate, UserLogin, UserResponse, Token
 from app.auth import (
-    hash_password,
-    authenticate_user,
-    create_access_token,
+    create_user_access_token,
     get_current_user,
+    get_current_user_async,
+    verify_user_password,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from app.passwords import PasswordHashingBusy, password_hasher
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
 @router.post("/register", response_model=UserResponse, status_code=201)
-def register(
+async def register(
     user_data: UserCreate,
     db: Session = Depends(get_db)
 ) -> UserResponse:
     """
     Register a new user.
     
+    The password is hashed in the password hashing pool, off the
+    request threads.
+    
     Args:
         user_data: User registration data
         db: Database session
@@ -37,9 +45,15 @@ def register(
     Raises:
         HTTPException: If username already exists
     """
+    hashed_password = await _hash_new_password(user_data.password)
+    return await run_in_threadpool(_create_user, db, user_data.username, hashed_password)
+
+
+def _create_user(db: Session, username: str, hashed_password: str) -> User:
+    """Insert a regular user unless the username is taken."""
     # Check if user already exists
     existing_user = db.query(User).filter(
-        User.username == user_data.username
+        User.username == username
     ).first()
     
     if existing_user:
@@ -49,9 +63,8 @@ def register(
         )
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
     new_user = User(
-        username=user_data.username,
+        username=username,
         hashed_password=hashed_password,
         role=UserRole.USER
     )
@@ -63,14 +76,29 @@ def register(
     return new_user
 
 
+async def _hash_new_password(password: str) -> str:
+    """Hash a password in the pool, turning a full pool into 503."""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many registrations in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     credentials: UserLogin,
     db: Session = Depends(get_db)
 ) -> Token:
     """
     Login user and return JWT access token.
     
+    The password is checked in the password hashing pool; a legacy or
+    outdated hash is replaced with one at the configured bcrypt cost.
+    
     Args:
         credentials: User login credentials
         db: Database session
@@ -79,22 +107,60 @@ def login(
         Access token
         
     Raises:
-        HTTPException: If credentials are invalid
+        HTTPException: If credentials are invalid, or 503 if too many
+            logins are already in progress
     """
-    # Authenticate user
-    user = authenticate_user(db, credentials.username, credentials.password)
+    user = await run_in_threadpool(_find_user, db, credentials.username)
+    valid, new_hash = await verify_user_password(user, credentials.password)
     
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    if not valid:
+        raise _invalid_credentials()
+    if new_hash:
+        await run_in_threadpool(_store_password_hash, db, user, new_hash)
     
-    # Create access token
+    return _login_token(user)
+
+
+def _find_user(db: Session, username: str) -> Optional[User]:
+    """
+    Load a detached copy of a user and end the read transaction.
+    
+    Otherwise every login waiting on the hashing pool would keep a pooled
+    connection checked out and starve the other endpoints of connections.
+    """
+    user = db.query(User).filter(User.username == username).first()
+    snapshot = None if user is None else User(
+        id=user.id,
+        username=user.username,
+        hashed_password=user.hashed_password,
+        role=user.role,
+        token_version=user.token_version
+    )
+    db.rollback()
+    return snapshot
+
+
+def _store_password_hash(db: Session, user: User, hashed_password: str) -> None:
+    """Replace a user's password hash after a successful login."""
+    db.execute(
+        update(User).where(User.id == user.id).values(hashed_password=hashed_password)
+    )
+    db.commit()
+
+
+def _invalid_credentials() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _login_token(user: User) -> dict:
+    """Issue the access token returned by login."""
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username},
+    access_token = create_user_access_token(
+        user,
         expires_delta=access_token_expires
     )
     
@@ -113,3 +179,46 @@ def get_me(current_user: User = Depends(get_current_user)) -> UserResponse:
         Current user information
     """
     return current_user
+
+
+# Async data path: the same endpoints, run on an AsyncSession.
+# Each handler reuses the sync implementation through AsyncSession.run_sync;
+# writes go through run_write so only one is in flight at a time.
+async_router = APIRouter(prefix="/auth", tags=["authentication"])
+
+
+@async_router.post("/register", response_model=UserResponse, status_code=201)
+async def register_async(
+    user_data: UserCreate,
+    db: AsyncSession = Depends(get_async_db)
+) -> UserResponse:
+    """Async variant of register."""
+    hashed_password = await _hash_new_password(user_data.password)
+    return await run_write(
+        db, lambda session: _create_user(session, user_data.username, hashed_password)
+    )
+
+
+@async_router.post("/login", response_model=Token)
+async def login_async(
+    credentials: UserLogin,
+    db: AsyncSession = Depends(get_async_db)
+) -> Token:
+    """Async variant of login."""
+    user = await db.run_sync(lambda session: _find_user(session, credentials.username))
+    valid, new_hash = await verify_user_password(user, credentials.password)
+    
+    if not valid:
+        raise _invalid_credentials()
+    if new_hash:
+        await run_write(db, lambda session: _store_password_hash(session, user, new_hash))
+    
+    return _login_token(user)
+
+
+@async_router.get("/me", response_model=UserResponse)
+async def get_me_async(
+    current_user: User = Depends(get_current_user_async)
+) -> UserResponse:
+    """Async variant of get_me."""
+    return current_user
@@ -1,14 +1,71 @@
 """
 Inventory management endpoints for tracking stock and purchases.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import concurrent.futures
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Union
 
-from app.database import get_db
+from app.config import settings
+from app.database import SessionLocal, get_async_db, get_db, run_write
 from app.models import Sweet, User, UserRole
-from app.schemas import SweetResponse
-from app.auth import get_current_user
+from app.schemas import (
+    ChangesResponse,
+    CheckoutRequest,
+    CheckoutResponse,
+    HotItemResponse,
+    InventoryStatsResponse,
+    PurchaseRequest,
+    RestockRequest,
+    StatsReconcileResponse,
+    SweetResponse,
+    TokenData,
+    WriteCombinerStats,
+    sweet_rows
+)
+from app.auth import (
+    get_current_principal,
+    get_current_principal_async,
+    get_current_user,
+    get_current_user_async
+)
+from app.catalog_filter import (
+    CatalogFilter,
+    after_position,
+    apply_filter,
+    catalog_filter,
+    cursor_position,
+    sort_order
+)
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    parse_fields
+)
+from app.stock import (
+    PURCHASE,
+    RESTOCK,
+    StockChange,
+    apply_change,
+    get_stocks,
+    purchase_many
+)
+from app.write_combiner import write_combiner
+from app.flash_sale import flash_sale
+from app.cache import CachedBody, catalog_cache
+from app.events import Change, stock_events
+from app.stats import get_stats, reconcile_stats
+from app.changes import changes_since
+from app.replicas import get_read_db, read_source
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
@@ -18,37 +75,341 @@ class InventoryResponse(SweetResponse):
     pass
 
 
-class RestockRequest:
-    """Request model for restocking."""
-    def __init__(self, quantity: int):
-        self.quantity = quantity
+@router.get("", response_model=List[SweetResponse])
+def get_inventory(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    catalog: CatalogFilter = Depends(catalog_filter),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get one page of the inventory, ordered by sweet ID or the sort field.
+    
+    Pages are keyset-paginated on (sort field, Sweet.id); when more rows
+    remain the cursor for the next page is returned in the X-Next-Cursor
+    header. A cursor is only valid with the filters and sort it came from.
+    
+    Args:
+        limit: Maximum number of sweets to return
+        cursor: Opaque cursor from a previous page
+        fields: Comma-separated list of fields to load (default: all)
+        catalog: Price/stock filters and sort order
+        db: Database session, on a read replica if configured
+        
+    Returns:
+        List of sweets with stock information
+        
+    Raises:
+        400: If the cursor or field list is invalid
+    """
+    return catalog_cache.respond(
+        ("inventory", read_source(db), limit, cursor, fields, catalog),
+        lambda: _inventory_page(db, limit, cursor, fields, catalog)
+    )
+
+
+def _inventory_page(
+    db: Session,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str],
+    catalog: CatalogFilter
+) -> CachedBody:
+    """Load and serialize one keyset page of the inventory."""
+    columns = parse_fields(fields, list(SweetResponse.model_fields))
+    # The sort field is needed for the cursor even when not projected;
+    # sweet_rows drops the extra trailing column
+    selected = columns if catalog.sort in (None, *columns) else [*columns, catalog.sort]
+    query = apply_filter(select(*(getattr(Sweet, name) for name in selected)), catalog)
+    
+    if cursor:
+        query = after_position(query, catalog, decode_cursor(cursor))
+    
+    query = query.order_by(*sort_order(catalog)).limit(limit + 1)
+    rows = db.connection().execute(query).all()
+    
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers[NEXT_CURSOR_HEADER] = encode_cursor(cursor_position(rows[-1], catalog))
+    
+    items = sweet_rows(rows, columns)
+    if "stock" in columns:
+        for item in items:
+            item["stock"] = _live_stock(item["id"], item["stock"])
+    return to_json(items), headers
 
 
-class PurchaseRequest:
-    """Request model for purchases."""
-    def __init__(self, quantity: int):
-        self.quantity = quantity
+def _live_stock(sweet_id: int, stored: int) -> int:
+    """Stock as sold so far: the flash-sale counter for hot sweets."""
+    live = flash_sale.stock(sweet_id)
+    return stored if live is None else live
 
 
-@router.get("", response_model=List[SweetResponse])
-def get_inventory(db: Session = Depends(get_db)):
+@router.get("/changes", response_model=ChangesResponse)
+def get_inventory_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
     """
-    Get complete inventory of all sweets.
+    Get the sweets created, changed or deleted after a catalog version.
+    
+    A client keeps the returned version and passes it as ``since`` on its
+    next poll, receiving only what changed in between; ``since=0`` returns
+    the whole catalog. While ``more`` is true, ask again straight away.
+    Stock of a flash-sale sweet is reported live, but it only gets a new
+    version when the counter is written back.
     
     Args:
+        since: Last version the client has applied
+        limit: Maximum number of changes and deletions to return
         db: Database session
         
     Returns:
-        List of all sweets with stock information
+        Changed sweets, tombstones of deleted sweets, the version reached
+        and whether more changes remain
+    """
+    body = changes_since(db, since, limit)
+    for change in body["changes"]:
+        change["stock"] = _live_stock(change["id"], change["stock"])
+    return Response(content=to_json(body), media_type="application/json")
+
+
+@router.get("/events")
+async def stream_inventory_events():
+    """
+    Stream stock and price changes as Server-Sent Events.
+    
+    Each ``stock`` event carries ``{sweet_id, stock, price}`` for a sweet
+    created or changed since the last event, and a ``delete`` event
+    carries ``{sweet_id}``. Changes to one sweet are coalesced while a
+    client is behind. A ``resync`` event means changes were dropped (the
+    client fell too far behind, or a bulk import ran) and the client
+    should re-fetch /inventory.
+    
+    Returns:
+        text/event-stream response that stays open
     """
-    sweets = db.query(Sweet).all()
-    return sweets
+    return StreamingResponse(
+        _event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _event_stream() -> AsyncIterator[str]:
+    """Serve one subscription until the client disconnects."""
+    subscription = stock_events.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            changes, resync = await subscription.next_batch(settings.events_keepalive_interval)
+            if not changes and not resync:
+                yield ": keepalive\n\n"
+                continue
+            
+            events = ["event: resync\ndata: {}\n\n"] if resync else []
+            if any(_incomplete(change) for change in changes):
+                changes = await run_in_threadpool(_complete_changes, changes)
+            for change in changes:
+                if change.get("deleted"):
+                    events.append(f"event: delete\ndata: {to_json({'sweet_id': change['sweet_id']}).decode()}\n\n")
+                else:
+                    events.append(f"event: stock\ndata: {to_json(change).decode()}\n\n")
+            yield "".join(events)
+    finally:
+        subscription.close()
+
+
+def _incomplete(change: Change) -> bool:
+    return not change.get("deleted") and (change["stock"] is None or change["price"] is None)
+
+
+def _complete_changes(changes: List[Change]) -> List[Change]:
+    """Fill in values a publisher did not know, in one query."""
+    missing = {change["sweet_id"] for change in changes if _incomplete(change)}
+    with SessionLocal() as db:
+        rows = {
+            row.id: row
+            for row in db.execute(
+                select(Sweet.id, Sweet.stock, Sweet.price).where(Sweet.id.in_(sorted(missing)))
+            )
+        }
+    
+    completed = []
+    for change in changes:
+        row = rows.get(change["sweet_id"])
+        if change["sweet_id"] in missing:
+            if row is None:
+                # Deleted since the change was published
+                change = {"sweet_id": change["sweet_id"], "deleted": True}
+            else:
+                if change["stock"] is None:
+                    change["stock"] = _live_stock(row.id, row.stock)
+                if change["price"] is None:
+                    change["price"] = row.price
+        completed.append(change)
+    return completed
+
+
+@router.get("/stats", response_model=InventoryStatsResponse)
+def get_inventory_stats(db: Session = Depends(get_db)):
+    """
+    Get total products, total stock and inventory value.
+    
+    Served from a summary row maintained on every write, so the cost
+    does not depend on the size of the catalog.
+    
+    Args:
+        db: Database session
+        
+    Returns:
+        Inventory statistics
+    """
+    return get_stats(db)
+
+
+@router.post("/stats/reconcile", response_model=StatsReconcileResponse)
+def reconcile_inventory_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Check the inventory statistics against a full scan (admin only).
+    
+    The summary row is rewritten from the scan if they disagree.
+    
+    Args:
+        db: Database session
+        current_user: Current authenticated user
+        
+    Returns:
+        Stored and actual statistics and whether they agreed
+        
+    Raises:
+        403: If user is not an admin
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can reconcile stats"
+        )
+    
+    result = reconcile_stats(db)
+    db.commit()
+    return result
+
+
+@router.post("/checkout", response_model=CheckoutResponse)
+def checkout(
+    cart: CheckoutRequest,
+    db: Session = Depends(get_db),
+    current_user: TokenData = Depends(get_current_principal)
+):
+    """
+    Purchase several sweets at once, all or nothing.
+    
+    All lines are decremented by a single UPDATE in one transaction;
+    lines for the same sweet are combined first.
+    
+    Args:
+        cart: Lines of sweet IDs and quantities
+        db: Database session
+        current_user: Current authenticated user
+        
+    Returns:
+        New stock level for each sweet in the cart
+        
+    Raises:
+        400: If any line is short on stock (detail lists the short lines)
+        404: If any sweet does not exist (detail lists the missing IDs)
+    """
+    quantities = {}
+    for item in cart.items:
+        quantities[item.sweet_id] = quantities.get(item.sweet_id, 0) + item.quantity
+    
+    # Hot sweets sell from their flash-sale counters, the rest in one UPDATE
+    hot = {
+        sweet_id: -quantity
+        for sweet_id, quantity in quantities.items() if flash_sale.is_hot(sweet_id)
+    }
+    cold = {
+        sweet_id: quantity
+        for sweet_id, quantity in quantities.items() if sweet_id not in hot
+    }
+    
+    hot_stocks = flash_sale.adjust_many(hot) if hot else {}
+    try:
+        new_stocks = purchase_many(db, cold) if cold and hot_stocks is not None else {}
+        if hot_stocks is not None and new_stocks is not None:
+            db.commit()
+    except Exception:
+        # The cold lines never committed; the hot units were not sold either
+        if hot_stocks:
+            _give_back_hot(hot)
+        db.rollback()
+        raise
+    
+    if hot_stocks is None or new_stocks is None:
+        if hot_stocks:
+            _give_back_hot(hot)
+        # Undo the lines the UPDATE did apply before reading what is available
+        db.rollback()
+        available = get_stocks(db, quantities)
+        available = {sweet_id: _live_stock(sweet_id, stock) for sweet_id, stock in available.items()}
+        db.rollback()
+        
+        missing = [sweet_id for sweet_id in quantities if sweet_id not in available]
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={"message": "Sweet not found", "missing": missing}
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "message": "Insufficient stock",
+                "shortages": [
+                    {
+                        "sweet_id": sweet_id,
+                        "requested": quantity,
+                        "available": available[sweet_id],
+                    }
+                    for sweet_id, quantity in quantities.items()
+                    if available[sweet_id] < quantity
+                ],
+            }
+        )
+    
+    catalog_cache.invalidate()
+    new_stocks.update(hot_stocks)
+    for sweet_id, stock in new_stocks.items():
+        stock_events.publish(sweet_id, stock=stock)
+    
+    return {
+        "items": [
+            {"sweet_id": sweet_id, "quantity": quantity, "new_stock": new_stocks[sweet_id]}
+            for sweet_id, quantity in quantities.items()
+        ],
+        "message": f"Successfully purchased {sum(quantities.values())} units"
+    }
+
+
+def _give_back_hot(hot: Dict[int, int]) -> None:
+    """
+    Return the hot units a failed checkout took from the counters; a
+    concurrent read may have cached the lowered live stock meanwhile.
+    """
+    flash_sale.adjust_many({sweet_id: -delta for sweet_id, delta in hot.items()})
+    catalog_cache.invalidate()
 
 
 @router.post("/{sweet_id}/restock")
 def restock_sweet(
     sweet_id: int,
-    quantity_data: dict,
+    quantity_data: RestockRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -57,7 +418,7 @@ def restock_sweet(
     
     Args:
         sweet_id: Sweet ID to restock
-        quantity_data: Dictionary with 'quantity' key
+        quantity_data: Units to add (at least 1)
         db: Database session
         current_user: Current authenticated user
         
@@ -74,39 +435,24 @@ def restock_sweet(
             detail="Only admins can restock items"
         )
     
-    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
-    
-    if not sweet:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Sweet not found"
-        )
-    
-    quantity = quantity_data.get("quantity", 0)
-    sweet.stock += quantity
-    db.commit()
-    db.refresh(sweet)
-    
-    return {
-        "sweet_id": sweet_id,
-        "new_stock": sweet.stock,
-        "message": f"Successfully restocked {quantity} units"
-    }
+    quantity = quantity_data.quantity
+    change = _apply_stock_change(db, RESTOCK, sweet_id, quantity)
+    return _stock_change_response(RESTOCK, sweet_id, quantity, change)
 
 
 @router.post("/{sweet_id}/purchase")
 def purchase_sweet(
     sweet_id: int,
-    quantity_data: dict,
+    quantity_data: PurchaseRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenData = Depends(get_current_principal)
 ):
     """
     Purchase a sweet (reduces stock).
     
     Args:
         sweet_id: Sweet ID to purchase
-        quantity_data: Dictionary with 'quantity' key
+        quantity_data: Units to buy (at least 1, default 1)
         db: Database session
         current_user: Current authenticated user
         
@@ -117,28 +463,309 @@ def purchase_sweet(
         400: If insufficient stock
         404: If sweet not found
     """
-    sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
+    quantity = quantity_data.quantity
+    change = _apply_stock_change(db, PURCHASE, sweet_id, quantity)
+    return _stock_change_response(PURCHASE, sweet_id, quantity, change)
+
+
+def _apply_stock_change(db: Session, kind: str, sweet_id: int, quantity: int) -> StockChange:
+    """Apply a purchase or restock to a hot counter, the write combiner or the database."""
+    change = flash_sale.apply(kind, sweet_id, quantity)
+    if change is not None:
+        return change
+    future = write_combiner.submit(kind, sweet_id, quantity)
+    if future is not None:
+        try:
+            return future.result(timeout=settings.write_combiner_timeout)
+        except concurrent.futures.TimeoutError:
+            # Give up only if the batch has not started; else its outcome is near
+            if future.cancel():
+                raise _combiner_timeout()
+            return future.result()
     
-    if not sweet:
+    change = apply_change(db, kind, sweet_id, quantity)
+    if change.new_stock is None:
+        db.rollback()
+    else:
+        db.commit()
+    return change
+
+
+def _combiner_timeout() -> HTTPException:
+    """503 for a stock change whose batch did not commit in time."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Stock change timed out, try again",
+        headers={"Retry-After": "1"}
+    )
+
+
+def _stock_change_response(kind: str, sweet_id: int, quantity: int, change: StockChange) -> dict:
+    """Turn a committed stock change into the endpoint response."""
+    if change.available is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Sweet not found"
         )
-    
-    quantity = quantity_data.get("quantity", 0)
-    
-    if sweet.stock < quantity:
+    if change.new_stock is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Insufficient stock. Available: {sweet.stock}, Requested: {quantity}"
+            detail=f"Insufficient stock. Available: {change.available}, Requested: {quantity}"
         )
     
-    sweet.stock -= quantity
-    db.commit()
-    db.refresh(sweet)
-    
+    catalog_cache.invalidate()
+    stock_events.publish(sweet_id, stock=change.new_stock)
+    verb = "purchased" if kind == PURCHASE else "restocked"
     return {
         "sweet_id": sweet_id,
-        "new_stock": sweet.stock,
-        "message": f"Successfully purchased {quantity} units"
+        "new_stock": change.new_stock,
+        "message": f"Successfully {verb} {quantity} units"
     }
+
+
+@router.get("/hot", response_model=List[HotItemResponse])
+def get_hot_items():
+    """
+    List sweets in flash-sale mode.
+    
+    Returns:
+        Live stock and the change not yet written back for each hot sweet
+    """
+    return flash_sale.items()
+
+
+@router.post("/{sweet_id}/hot", response_model=HotItemResponse)
+def enable_hot_item(sweet_id: int, current_user: User = Depends(get_current_user)):
+    """
+    Sell a sweet from an in-memory flash-sale counter (admin only).
+    
+    Args:
+        sweet_id: Sweet ID
+        current_user: Current authenticated user
+        
+    Returns:
+        The hot sweet with its live stock
+        
+    Raises:
+        403: If user is not an admin
+        404: If sweet not found
+        409: If the app runs in several worker processes
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can manage flash sales"
+        )
+    
+    if settings.server_workers > 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Flash-sale mode needs a single worker process"
+        )
+    
+    if flash_sale.enable(sweet_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweet not found"
+        )
+    return _hot_item(sweet_id)
+
+
+@router.delete("/{sweet_id}/hot", response_model=HotItemResponse)
+def disable_hot_item(sweet_id: int, current_user: User = Depends(get_current_user)):
+    """
+    Write a hot sweet's counter back and return it to normal stock (admin only).
+    
+    Args:
+        sweet_id: Sweet ID
+        current_user: Current authenticated user
+        
+    Returns:
+        The sweet's final stock, fully written back
+        
+    Raises:
+        403: If user is not an admin
+        404: If the sweet is not in flash-sale mode
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can manage flash sales"
+        )
+    
+    stock = flash_sale.disable(sweet_id)
+    if stock is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sweet is not in flash-sale mode"
+        )
+    catalog_cache.invalidate()
+    return {"sweet_id": sweet_id, "stock": stock, "unflushed": 0}
+
+
+def _hot_item(sweet_id: int) -> dict:
+    """Current state of one hot sweet."""
+    return next(item for item in flash_sale.items() if item["sweet_id"] == sweet_id)
+
+
+@router.get("/combiner", response_model=WriteCombinerStats)
+def get_write_combiner_stats():
+    """
+    Get group-commit statistics for purchases and restocks.
+    
+    Returns:
+        Commit rate, batch size distribution and counters
+    """
+    return write_combiner.stats()
+
+
+# Async data path: the same endpoints, run on an AsyncSession.
+# Each handler reuses the sync implementation through AsyncSession.run_sync;
+# writes go through run_write so only one is in flight at a time.
+async_router = APIRouter(prefix="/inventory", tags=["inventory"])
+
+
+@async_router.get("", response_model=List[SweetResponse])
+async def get_inventory_async(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    catalog: CatalogFilter = Depends(catalog_filter),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Async variant of get_inventory."""
+    return await db.run_sync(
+        lambda session: get_inventory(
+            limit=limit, cursor=cursor, fields=fields, catalog=catalog, db=session
+        )
+    )
+
+
+@async_router.get("/stats", response_model=InventoryStatsResponse)
+async def get_inventory_stats_async(db: AsyncSession = Depends(get_async_db)):
+    """Async variant of get_inventory_stats."""
+    return await db.run_sync(lambda session: get_inventory_stats(db=session))
+
+
+@async_router.get("/changes", response_model=ChangesResponse)
+async def get_inventory_changes_async(
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Async variant of get_inventory_changes."""
+    return await db.run_sync(
+        lambda session: get_inventory_changes(since=since, limit=limit, db=session)
+    )
+
+
+async_router.add_api_route("/events", stream_inventory_events, methods=["GET"])
+async_router.add_api_route(
+    "/combiner", get_write_combiner_stats, methods=["GET"], response_model=WriteCombinerStats
+)
+async_router.add_api_route(
+    "/hot", get_hot_items, methods=["GET"], response_model=List[HotItemResponse]
+)
+
+
+@async_router.post("/{sweet_id}/hot", response_model=HotItemResponse)
+async def enable_hot_item_async(sweet_id: int, current_user: User = Depends(get_current_user_async)):
+    """Async variant of enable_hot_item."""
+    return await asyncio.to_thread(enable_hot_item, sweet_id=sweet_id, current_user=current_user)
+
+
+@async_router.delete("/{sweet_id}/hot", response_model=HotItemResponse)
+async def disable_hot_item_async(sweet_id: int, current_user: User = Depends(get_current_user_async)):
+    """Async variant of disable_hot_item."""
+    return await asyncio.to_thread(disable_hot_item, sweet_id=sweet_id, current_user=current_user)
+
+
+@async_router.post("/stats/reconcile", response_model=StatsReconcileResponse)
+async def reconcile_inventory_stats_async(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Async variant of reconcile_inventory_stats."""
+    return await run_write(
+        db,
+        lambda session: reconcile_inventory_stats(db=session, current_user=current_user)
+    )
+
+
+@async_router.post("/checkout", response_model=CheckoutResponse)
+async def checkout_async(
+    cart: CheckoutRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_principal_async)
+):
+    """Async variant of checkout."""
+    return await run_write(
+        db,
+        lambda session: checkout(cart=cart, db=session, current_user=current_user)
+    )
+
+
+@async_router.post("/{sweet_id}/restock")
+async def restock_sweet_async(
+    sweet_id: int,
+    quantity_data: RestockRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Async variant of restock_sweet."""
+    if current_user.role == UserRole.ADMIN:
+        response = await _submit_stock_change(RESTOCK, sweet_id, quantity_data)
+        if response is not None:
+            return response
+    return await run_write(
+        db,
+        lambda session: restock_sweet(
+            sweet_id=sweet_id, quantity_data=quantity_data, db=session, current_user=current_user
+        )
+    )
+
+
+@async_router.post("/{sweet_id}/purchase")
+async def purchase_sweet_async(
+    sweet_id: int,
+    quantity_data: PurchaseRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_principal_async)
+):
+    """Async variant of purchase_sweet."""
+    response = await _submit_stock_change(PURCHASE, sweet_id, quantity_data)
+    if response is not None:
+        return response
+    return await run_write(
+        db,
+        lambda session: purchase_sweet(
+            sweet_id=sweet_id, quantity_data=quantity_data, db=session, current_user=current_user
+        )
+    )
+
+
+async def _submit_stock_change(
+    kind: str,
+    sweet_id: int,
+    quantity_data: Union[PurchaseRequest, RestockRequest]
+) -> Optional[dict]:
+    """
+    Apply a stock change to a hot counter or the write combiner without
+    blocking the loop; None means neither is in use for this sweet.
+    """
+    quantity = quantity_data.quantity
+    change = None
+    if flash_sale.is_hot(sweet_id):
+        # apply waits on the counter lock and writes the journal
+        change = await asyncio.to_thread(flash_sale.apply, kind, sweet_id, quantity)
+    if change is None:
+        future = write_combiner.submit(kind, sweet_id, quantity)
+        if future is None:
+            return None
+        outcome = asyncio.wrap_future(future)
+        done, _ = await asyncio.wait({outcome}, timeout=settings.write_combiner_timeout)
+        # Give up only if the batch has not started; else its outcome is near
+        if not done and future.cancel():
+            raise _combiner_timeout()
+        change = await outcome
+    return _stock_change_response(kind, sweet_id, quantity, change)
@@ -1,39 +1,83 @@
 """
 Sweets endpoints for managing sweet shop items.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_async_db, get_db, run_write
 from app.models import Sweet, User, UserRole
-from app.schemas import SweetCreate, SweetResponse
-from app.auth import get_current_user
+from app.schemas import ImportReport, SweetCreate, SweetResponse, sweet_rows
+from app.auth import get_current_user, get_current_user_async
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.search import apply_search
+from app.catalog_filter import CatalogFilter, apply_filter, catalog_filter, sort_order
+from app.catalog_import import DEFAULT_BATCH_SIZE, FORMATS, ImportAborted, import_catalog
+from app.cache import CachedBody, catalog_cache
+from app.replicas import get_read_db, read_source
+from app.events import stock_events
+from app.flash_sale import flash_sale
 
 router = APIRouter(prefix="/sweets", tags=["sweets"])
 
+# Uploads larger than this are spooled to a temporary file on disk
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
 
 @router.get("/search", response_model=List[SweetResponse])
-def search_sweets(q: str = "", db: Session = Depends(get_db)):
+def search_sweets(
+    q: str = "",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    catalog: CatalogFilter = Depends(catalog_filter),
+    db: Session = Depends(get_read_db)
+):
     """
     Search for sweets by name or description.
     
+    Results are ranked by relevance (bm25) when the full-text index is
+    available, and words match as prefixes. A sort field replaces the
+    relevance order.
+    
     Args:
         q: Search query string
-        db: Database session
+        limit: Maximum number of results to return
+        offset: Number of ranked results to skip
+        catalog: Price/stock filters and sort order
+        db: Database session, on a read replica if configured
         
     Returns:
         List of sweets matching the query
     """
-    query = db.query(Sweet)
+    return catalog_cache.respond(
+        ("search", read_source(db), q, limit, offset, catalog),
+        lambda: _search_page(db, q, limit, offset, catalog)
+    )
+
+
+def _search_page(
+    db: Session,
+    q: str,
+    limit: int,
+    offset: int,
+    catalog: CatalogFilter
+) -> CachedBody:
+    """Run a search and serialize the page of results."""
+    columns = list(SweetResponse.model_fields)
+    query = apply_filter(select(*(getattr(Sweet, name) for name in columns)), catalog)
     
     if q:
-        query = query.filter(
-            (Sweet.name.ilike(f"%{q}%")) | (Sweet.description.ilike(f"%{q}%"))
-        )
+        query = apply_search(query, q, db.connection(), ranked=catalog.sort is None)
+    if not q or catalog.sort is not None:
+        query = query.order_by(*sort_order(catalog))
     
-    sweets = query.all()
-    return sweets
+    rows = db.connection().execute(query.offset(offset).limit(limit)).all()
+    return to_json(sweet_rows(rows, columns)), {}
 
 
 @router.post("", response_model=SweetResponse, status_code=status.HTTP_201_CREATED)
@@ -68,18 +112,87 @@ def create_sweet(
     db.add(db_sweet)
     db.commit()
     db.refresh(db_sweet)
+    catalog_cache.invalidate()
+    stock_events.publish(db_sweet.id, stock=db_sweet.stock, price=db_sweet.price)
     
     return db_sweet
 
 
+@router.post("/import", response_model=ImportReport)
+async def import_sweets(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format"),
+    upsert: bool = True,
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Bulk import sweets from a CSV or NDJSON request body (admin only).
+    
+    The body is streamed to a spooled temporary file and then imported in
+    batches, so memory use does not grow with the size of the catalog.
+    
+    Args:
+        request: Incoming request whose body is the catalog file
+        fmt: "csv" or "ndjson"; defaults from the Content-Type header
+        upsert: Update sweets with an existing name instead of inserting
+            (a name shared by several sweets is reported as a failed row)
+        batch_size: Rows written per transaction
+        db: Database session
+        current_user: Current authenticated user
+        
+    Returns:
+        Counts of inserted, updated and failed rows plus per-row errors
+        
+    Raises:
+        400: If the format is not supported, or the body stops being
+            readable partway (detail carries the report of the rows
+            imported before that point)
+        403: If user is not an admin
+    """
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can import sweets"
+        )
+    
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "ndjson" in content_type else "csv"
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format. Use one of: {', '.join(FORMATS)}"
+        )
+    
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as upload:
+        async for chunk in request.stream():
+            await run_in_threadpool(upload.write, chunk)
+        upload.seek(0)
+        try:
+            return await run_in_threadpool(
+                import_catalog, db, upload, fmt, upsert, batch_size
+            )
+        except ImportAborted as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"message": str(exc), "report": exc.report.model_dump()}
+            )
+        finally:
+            # Batches commit as they go, so invalidate even after a failure
+            catalog_cache.invalidate()
+            stock_events.publish_resync()
+
+
 @router.get("/{sweet_id}", response_model=SweetResponse)
-def get_sweet(sweet_id: int, db: Session = Depends(get_db)):
+def get_sweet(sweet_id: int, db: Session = Depends(get_read_db)):
     """
     Get a sweet by ID.
     
     Args:
         sweet_id: Sweet ID
-        db: Database session
+        db: Database session, on a read replica if configured
         
     Returns:
         Sweet details
@@ -87,6 +200,11 @@ def get_sweet(sweet_id: int, db: Session = Depends(get_db)):
     Raises:
         404: If sweet not found
     """
+    return catalog_cache.respond(("sweet", read_source(db), sweet_id), lambda: _sweet_detail(db, sweet_id))
+
+
+def _sweet_detail(db: Session, sweet_id: int) -> CachedBody:
+    """Load and serialize one sweet."""
     sweet = db.query(Sweet).filter(Sweet.id == sweet_id).first()
     
     if not sweet:
@@ -95,7 +213,10 @@ def get_sweet(sweet_id: int, db: Session = Depends(get_db)):
             detail="Sweet not found"
         )
     
-    return sweet
+    response = SweetResponse.model_validate(sweet)
+    if flash_sale.is_hot(sweet_id):
+        response.stock = flash_sale.stock(sweet_id)
+    return response.model_dump_json().encode(), {}
 
 
 @router.put("/{sweet_id}", response_model=SweetResponse)
@@ -120,6 +241,7 @@ def update_sweet(
     Raises:
         403: If user is not an admin
         404: If sweet not found
+        409: If the sweet is in flash-sale mode and the stock would change
     """
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
@@ -135,12 +257,28 @@ def update_sweet(
             detail="Sweet not found"
         )
     
-    for field, value in sweet.model_dump(exclude_unset=True).items():
+    updates = sweet.model_dump(exclude_unset=True)
+    live_stock = flash_sale.stock(sweet_id)
+    if live_stock is not None and "stock" in updates:
+        # The counter owns the stock of a hot sweet; the row only lags behind it
+        if updates.pop("stock") != live_stock:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Sweet is in flash-sale mode; restock it instead of setting its stock"
+            )
+    
+    for field, value in updates.items():
         setattr(db_sweet, field, value)
     
     db.commit()
     db.refresh(db_sweet)
+    catalog_cache.invalidate()
+    stock_events.publish(
+        sweet_id, stock=db_sweet.stock if live_stock is None else live_stock, price=db_sweet.price
+    )
     
+    if live_stock is not None:
+        return SweetResponse.model_validate(db_sweet).model_copy(update={"stock": live_stock})
     return db_sweet
 
 
@@ -178,3 +316,83 @@ def delete_sweet(
     
     db.delete(db_sweet)
     db.commit()
+    flash_sale.discard(sweet_id)
+    catalog_cache.invalidate()
+    stock_events.publish_delete(sweet_id)
+
+
+# Async data path: the same endpoints, run on an AsyncSession.
+# Each handler reuses the sync implementation through AsyncSession.run_sync;
+# writes go through run_write so only one is in flight at a time.
+async_router = APIRouter(prefix="/sweets", tags=["sweets"])
+
+
+@async_router.get("/search", response_model=List[SweetResponse])
+async def search_sweets_async(
+    q: str = "",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    catalog: CatalogFilter = Depends(catalog_filter),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Async variant of search_sweets."""
+    return await db.run_sync(
+        lambda session: search_sweets(
+            q=q, limit=limit, offset=offset, catalog=catalog, db=session
+        )
+    )
+
+
+@async_router.post("", response_model=SweetResponse, status_code=status.HTTP_201_CREATED)
+async def create_sweet_async(
+    sweet: SweetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Async variant of create_sweet."""
+    return await run_write(
+        db,
+        lambda session: create_sweet(sweet=sweet, db=session, current_user=current_user)
+    )
+
+
+# Bulk import is a long-running batch job; it keeps the sync engine and
+# runs in the thread pool so it never blocks the event loop
+async_router.add_api_route(
+    "/import", import_sweets, methods=["POST"], response_model=ImportReport
+)
+
+
+@async_router.get("/{sweet_id}", response_model=SweetResponse)
+async def get_sweet_async(sweet_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Async variant of get_sweet."""
+    return await db.run_sync(lambda session: get_sweet(sweet_id=sweet_id, db=session))
+
+
+@async_router.put("/{sweet_id}", response_model=SweetResponse)
+async def update_sweet_async(
+    sweet_id: int,
+    sweet: SweetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Async variant of update_sweet."""
+    return await run_write(
+        db,
+        lambda session: update_sweet(
+            sweet_id=sweet_id, sweet=sweet, db=session, current_user=current_user
+        )
+    )
+
+
+@async_router.delete("/{sweet_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_sweet_async(
+    sweet_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Async variant of delete_sweet."""
+    await run_write(
+        db,
+        lambda session: delete_sweet(sweet_id=sweet_id, db=session, current_user=current_user)
+    )
@@ -1,8 +1,9 @@
 """
 Pydantic schemas for request/response validation.
 """
+from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Any, Dict, List, Optional, Sequence
 from app.models import UserRole
 
 
@@ -42,6 +43,7 @@ class TokenData(BaseModel):
     username: Optional[str] = None
     user_id: Optional[int] = None
     role: Optional[UserRole] = None
+    token_version: Optional[int] = None
 
 
 # Sweet Schemas
@@ -73,6 +75,24 @@ class SweetResponse(SweetBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+def sweet_rows(rows: Sequence[Sequence[Any]], fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """
+    Turn selected sweet columns into response dictionaries.
+
+    List endpoints select plain column tuples and serialize these
+    dictionaries directly, skipping SweetResponse validation: the values
+    come from the sweets table, whose column types already match it.
+
+    Args:
+        rows: Result rows, one value per field
+        fields: Field names, in the order the columns were selected
+
+    Returns:
+        One dictionary per row
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
+
 # Inventory Schemas
 class PurchaseRequest(BaseModel):
     """Schema for purchase request."""
@@ -84,8 +104,158 @@ class RestockRequest(BaseModel):
     quantity: int = Field(..., ge=1)
 
 
+class InventoryStatsResponse(BaseModel):
+    """Schema for inventory summary statistics."""
+    total_products: int
+    total_stock: int
+    inventory_value: float
+
+
+class StatsReconcileResponse(BaseModel):
+    """Schema for the result of a stats reconciliation."""
+    stored: Optional[InventoryStatsResponse]
+    actual: InventoryStatsResponse
+    in_sync: bool
+
+
+class SweetChange(SweetResponse):
+    """Schema for a created or changed sweet in a delta sync."""
+    row_version: int
+
+
+class SweetTombstoneResponse(BaseModel):
+    """Schema for a deleted sweet in a delta sync."""
+    sweet_id: int
+    row_version: int
+
+
+class ChangesResponse(BaseModel):
+    """Schema for the catalog changes after a version."""
+    changes: List[SweetChange]
+    deleted: List[SweetTombstoneResponse]
+    version: int
+    more: bool
+
+
+class WriteCombinerStats(BaseModel):
+    """Schema for group-commit statistics."""
+    running: bool
+    window_ms: float
+    max_batch: int
+    commits: int
+    intents: int
+    failed_batches: int
+    commits_per_sec: float
+    mean_batch_size: float
+    batch_size_histogram: Dict[int, int]
+
+
+class HotItemResponse(BaseModel):
+    """Schema for a sweet selling from an in-memory flash-sale counter."""
+    sweet_id: int
+    stock: int
+    unflushed: int  # Change not yet written back to the database
+
+
 class InventoryResponse(BaseModel):
     """Schema for inventory response."""
     sweet_id: int
     new_quantity: int
     message: str
+
+
+# Checkout Schemas
+class CheckoutItem(BaseModel):
+    """Schema for one line of a checkout cart."""
+    sweet_id: int
+    quantity: int = Field(default=1, ge=1)
+
+
+class CheckoutRequest(BaseModel):
+    """Schema for a multi-item checkout."""
+    items: List[CheckoutItem] = Field(..., min_length=1, max_length=100)
+
+
+class CheckoutLineResult(BaseModel):
+    """Schema for the outcome of one checkout line."""
+    sweet_id: int
+    quantity: int
+    new_stock: int
+
+
+class CheckoutResponse(BaseModel):
+    """Schema for checkout response."""
+    items: List[CheckoutLineResult]
+    message: str
+
+
+# Bulk Import Schemas
+class ImportRowError(BaseModel):
+    """Schema for validation errors on one imported row."""
+    row: int
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    """Schema for bulk import results."""
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
+
+
+# Profiling Schemas
+class SqlTrace(BaseModel):
+    """Schema for one SQL statement run by a profiled request."""
+    statement: str
+    duration_ms: float
+
+
+class ProfileFunction(BaseModel):
+    """Schema for one function in a request profile."""
+    function: str
+    calls: int
+    own_ms: float
+    cumulative_ms: float
+
+
+class ProfileSummary(BaseModel):
+    """Schema for a stored request profile in listings."""
+    id: int
+    method: str
+    path: str
+    status: Optional[int] = None
+    created_at: datetime
+    wall_ms: float
+    sql_count: int
+
+
+class ProfileDetail(ProfileSummary):
+    """Schema for a full request profile."""
+    threadpool_wait_ms: float
+    phases_ms: Dict[str, float]
+    sql: List[SqlTrace]
+    functions: List[ProfileFunction]
+    call_tree: str
+
+
+class PoolStats(BaseModel):
+    """Schema for the configuration and saturation counters of a connection pool."""
+    name: str
+    pool_class: str
+    pool_size: Optional[int]
+    max_overflow: Optional[int]
+    timeout: Optional[float]
+    pre_ping: bool
+    recycle: int
+    in_use: int
+    idle: Optional[int]
+    peak_in_use: int
+    checkouts: int
+    overflow_checkouts: int
+    timeouts: int
+    connects: int
+    invalidations: int
+    mean_wait_ms: float
+    max_wait_ms: float
@@ -0,0 +1,186 @@
+"""
+SQLite FTS5 full-text index over sweet names and descriptions.
+
+The index is an external-content FTS5 table that mirrors the ``sweets``
+table and is kept in sync by triggers, so every write path (ORM, bulk
+statements, raw SQL) updates it without application code. When FTS5 is
+not compiled into the SQLite library, search falls back to ILIKE.
+"""
+import re
+from typing import List, Optional
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event, func, literal_column, or_, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import column, table
+
+from app.models import Sweet
+
+FTS_TABLE = "sweets_fts"
+
+# Lightweight handle used to join the index into ORM queries
+sweets_fts = table(FTS_TABLE, column("rowid"))
+
+_CREATE_INDEX_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='sweets', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON sweets BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON sweets BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON sweets BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+# Whether each engine has a usable FTS index
+_fts_enabled: "WeakKeyDictionary[Engine, bool]" = WeakKeyDictionary()
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_search_index(connection: Connection) -> bool:
+    """
+    Create the FTS5 index and its sync triggers if they do not exist.
+
+    A freshly created index is rebuilt from the current ``sweets`` rows.
+
+    Args:
+        connection: Connection to the database holding the sweets table
+
+    Returns:
+        True if the FTS index is available, False otherwise
+    """
+    if connection.dialect.name != "sqlite":
+        _fts_enabled[connection.engine] = False
+        return False
+
+    existed = _index_exists(connection)
+    if not existed:
+        try:
+            for statement in _CREATE_INDEX_SQL:
+                connection.exec_driver_sql(statement)
+        except OperationalError:
+            # FTS5 module is not compiled into this SQLite build
+            _fts_enabled[connection.engine] = False
+            return False
+        connection.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+    _fts_enabled[connection.engine] = True
+    return True
+
+
+def drop_search_index(connection: Connection) -> None:
+    """
+    Drop the FTS5 index. Its triggers are dropped along with ``sweets``.
+
+    Args:
+        connection: Connection to the database holding the sweets table
+    """
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    _fts_enabled.pop(connection.engine, None)
+
+
+def fts_enabled(connection: Connection) -> bool:
+    """
+    Check whether full-text search can be used on this connection.
+
+    Args:
+        connection: Database connection
+
+    Returns:
+        True if the FTS index exists
+    """
+    engine = connection.engine
+    if engine not in _fts_enabled:
+        _fts_enabled[engine] = (
+            connection.dialect.name == "sqlite" and _index_exists(connection)
+        )
+    return _fts_enabled[engine]
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 MATCH expression with prefix matching.
+
+    Every word must match (implicit AND) and each word also matches as a
+    prefix, so "choc cak" finds "Chocolate Cake".
+
+    Args:
+        q: User search string
+
+    Returns:
+        FTS5 query string, or None if q contains no searchable words
+    """
+    tokens: List[str] = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def apply_search(query, q: str, connection: Connection, ranked: bool = True):
+    """
+    Restrict a Sweet query to rows matching q, ranked by relevance.
+
+    Uses the FTS5 index ordered by bm25 when available; otherwise falls
+    back to a case-insensitive substring match ordered by ID.
+
+    Args:
+        query: ORM query or select() of Sweet columns
+        q: User search string
+        connection: Database connection the query will run on
+        ranked: Order the results; False leaves ordering to the caller
+
+    Returns:
+        Filtered (and ordered) query
+    """
+    match = build_match_query(q)
+    if match is not None and fts_enabled(connection):
+        query = (
+            query.join(sweets_fts, sweets_fts.c.rowid == Sweet.id)
+            .filter(literal_column(FTS_TABLE).op("MATCH")(match))
+        )
+        return query.order_by(func.bm25(literal_column(FTS_TABLE)), Sweet.id) if ranked else query
+
+    query = query.filter(
+        or_(Sweet.name.ilike(f"%{q}%"), Sweet.description.ilike(f"%{q}%"))
+    )
+    return query.order_by(Sweet.id) if ranked else query
+
+
+def _index_exists(connection: Connection) -> bool:
+    """Check sqlite_master for the FTS table."""
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first() is not None
+
+
+@event.listens_for(Sweet.__table__, "after_create")
+def _create_index_with_table(target, connection, **kw):
+    ensure_search_index(connection)
+
+
+@event.listens_for(Sweet.__table__, "before_drop")
+def _drop_index_with_table(target, connection, **kw):
+    drop_search_index(connection)
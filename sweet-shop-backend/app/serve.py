@@ -0,0 +1,107 @@
+"""
+Production server: several uvicorn worker processes sharing one port.
+
+    python -m app.serve --workers 4
+
+Every worker runs the whole app. Settings come from SWEET_SHOP_SERVER_*
+(see app.config) and can be overridden on the command line. uvicorn
+uses uvloop and httptools when they are installed (``uvicorn[standard]``)
+and falls back to asyncio and h11 otherwise. On SIGINT/SIGTERM each
+worker stops accepting connections and finishes its in-flight requests
+for up to ``server_graceful_timeout`` seconds, then runs its shutdown
+(write combiner drain, flash-sale write-back).
+
+Before the workers start, the database is initialized and a flash-sale
+journal left by a previous run is written back, once. Flash-sale mode
+keeps stock in one process's memory, so it is refused with more than one
+worker.
+"""
+import argparse
+import logging
+import os
+from typing import List, Optional
+
+import uvicorn
+
+from app.config import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count(requested: int) -> int:
+    """
+    Resolve the number of worker processes.
+
+    Args:
+        requested: Workers asked for; 0 means one per CPU
+
+    Returns:
+        Number of workers to start
+    """
+    return requested if requested > 0 else os.cpu_count() or 1
+
+
+def check_config(workers: int, config: Settings = settings) -> None:
+    """
+    Reject settings that only work in a single process.
+
+    Args:
+        workers: Number of worker processes
+        config: Application settings
+
+    Raises:
+        SystemExit: If flash-sale sweets are configured with several workers
+    """
+    if workers > 1 and config.flash_sale_sweet_ids:
+        raise SystemExit(
+            "Flash-sale mode keeps stock in one process: "
+            "unset SWEET_SHOP_FLASH_SALE_SWEET_IDS or run a single worker"
+        )
+
+
+def prepare_database() -> None:
+    """Create missing tables and write back a leftover flash-sale journal."""
+    # Imported here so the workers, not the supervisor, open the app's engines
+    from app.database import engine, init_db
+    from app.flash_sale import flash_sale
+
+    init_db()
+    flash_sale.recover()
+    engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments and run the server until it is stopped."""
+    parser = argparse.ArgumentParser(description="Run the Sweet Shop API with several workers")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument(
+        "--workers", type=int, default=settings.server_workers,
+        help="worker processes, 0 for one per CPU (default: %(default)s)"
+    )
+    args = parser.parse_args(argv)
+
+    workers = worker_count(args.workers)
+    check_config(workers)
+    # Workers read their settings from the environment
+    os.environ["SWEET_SHOP_SERVER_WORKERS"] = str(workers)
+    prepare_database()
+
+    logger.info("Starting %d workers on %s:%d", workers, args.host, args.port)
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive,
+        timeout_graceful_shutdown=settings.server_graceful_timeout,
+        access_log=settings.server_access_log,
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Incrementally maintained inventory statistics.
+
+A single ``inventory_stats`` row holds the product count, total stock
+and inventory value. Triggers on ``sweets`` apply each insert, delete
+and price/stock update to it as a delta in the same transaction, so
+reading the statistics is one primary-key lookup. reconcile_stats
+checks the row against a full scan and repairs any drift.
+
+Usage:
+    python -m app.stats    # reconcile the configured database
+"""
+from typing import Dict
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.database import Base, SessionLocal, init_db
+from app.models import InventoryStats, Sweet
+
+STATS_ROW_ID = 1
+
+# Floating-point drift in inventory_value tolerated before repairing
+VALUE_TOLERANCE = 0.005
+
+_CREATE_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_stats_ai AFTER INSERT ON sweets BEGIN
+        UPDATE inventory_stats SET
+            total_products = total_products + 1,
+            total_stock = total_stock + new.stock,
+            inventory_value = inventory_value + new.price * new.stock
+        WHERE id = {STATS_ROW_ID};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_stats_ad AFTER DELETE ON sweets BEGIN
+        UPDATE inventory_stats SET
+            total_products = total_products - 1,
+            total_stock = total_stock - old.stock,
+            inventory_value = inventory_value - old.price * old.stock
+        WHERE id = {STATS_ROW_ID};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_stats_au AFTER UPDATE OF price, stock ON sweets BEGIN
+        UPDATE inventory_stats SET
+            total_stock = total_stock + new.stock - old.stock,
+            inventory_value = inventory_value + new.price * new.stock - old.price * old.stock
+        WHERE id = {STATS_ROW_ID};
+    END
+    """,
+]
+
+
+def ensure_stats(connection: Connection) -> bool:
+    """
+    Create the summary row and its maintenance triggers if missing.
+
+    Args:
+        connection: Connection to the database holding the sweets table
+
+    Returns:
+        True if the statistics are maintained incrementally
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+
+    InventoryStats.__table__.create(connection, checkfirst=True)
+    for statement in _CREATE_TRIGGERS_SQL:
+        connection.exec_driver_sql(statement)
+    if _stored_row(connection) is None:
+        _write_row(connection, _scan(connection))
+    return True
+
+
+def get_stats(db: Session) -> Dict[str, float]:
+    """
+    Read the inventory statistics in O(1).
+
+    Falls back to a full scan if the summary row does not exist.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Dictionary with total_products, total_stock and inventory_value
+    """
+    stored = _stored_row(db.connection())
+    return stored if stored is not None else _scan(db.connection())
+
+
+def reconcile_stats(db: Session) -> Dict[str, object]:
+    """
+    Verify the summary row against a full scan, repairing it on drift.
+
+    The repair is not committed; the caller owns the transaction.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Dictionary with the stored and actual statistics and whether
+        they agreed
+    """
+    connection = db.connection()
+    stored = _stored_row(connection)
+    actual = _scan(connection)
+
+    in_sync = stored is not None and (
+        stored["total_products"] == actual["total_products"]
+        and stored["total_stock"] == actual["total_stock"]
+        and abs(stored["inventory_value"] - actual["inventory_value"]) <= VALUE_TOLERANCE
+    )
+    if not in_sync:
+        _write_row(connection, actual)
+
+    return {"stored": stored, "actual": actual, "in_sync": in_sync}
+
+
+def _scan(connection: Connection) -> Dict[str, float]:
+    """Aggregate the statistics over the whole sweets table."""
+    row = connection.execute(
+        select(
+            func.count(Sweet.id),
+            func.coalesce(func.sum(Sweet.stock), 0),
+            func.coalesce(func.sum(Sweet.price * Sweet.stock), 0.0),
+        )
+    ).one()
+    return {
+        "total_products": row[0],
+        "total_stock": row[1],
+        "inventory_value": float(row[2]),
+    }
+
+
+def _stored_row(connection: Connection):
+    """Read the summary row, or None if it does not exist."""
+    row = connection.execute(
+        select(
+            InventoryStats.total_products,
+            InventoryStats.total_stock,
+            InventoryStats.inventory_value,
+        ).where(InventoryStats.id == STATS_ROW_ID)
+    ).first()
+    return dict(row._mapping) if row is not None else None
+
+
+def _write_row(connection: Connection, values: Dict[str, float]) -> None:
+    """Replace the summary row with the given values."""
+    table = InventoryStats.__table__
+    connection.execute(table.delete().where(table.c.id == STATS_ROW_ID))
+    connection.execute(table.insert().values(id=STATS_ROW_ID, **values))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_stats_with_tables(target, connection, **kw):
+    ensure_stats(connection)
+
+
+def main():
+    init_db()
+    with SessionLocal() as db:
+        result = reconcile_stats(db)
+        db.commit()
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Atomic stock adjustments for purchases and restocks.
+
+Each adjustment is a single conditional UPDATE, so concurrent purchases
+can never drive stock below zero and the new level comes back in the
+same round trip via RETURNING where the database supports it.
+"""
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Sweet
+
+# Kinds of single-sweet stock change
+PURCHASE = "purchase"
+RESTOCK = "restock"
+
+
+class StockChange(NamedTuple):
+    """Outcome of one purchase or restock."""
+    new_stock: Optional[int]  # None if the change was not applied
+    available: Optional[int]  # Stock after the attempt; None if the sweet is missing
+
+
+def supports_returning(db: Session) -> bool:
+    """
+    Check whether UPDATE ... RETURNING is available (SQLite >= 3.35).
+
+    Args:
+        db: Database session
+
+    Returns:
+        True if the bound dialect supports UPDATE ... RETURNING
+    """
+    return db.get_bind().dialect.update_returning
+
+
+def get_stock(db: Session, sweet_id: int) -> Optional[int]:
+    """
+    Read the current stock of a sweet.
+
+    Args:
+        db: Database session
+        sweet_id: Sweet ID
+
+    Returns:
+        Stock level, or None if the sweet does not exist
+    """
+    return db.execute(
+        select(Sweet.stock).where(Sweet.id == sweet_id)
+    ).scalar_one_or_none()
+
+
+def adjust_stock(
+    db: Session,
+    sweet_id: int,
+    delta: int,
+    minimum: Optional[int] = None
+) -> Optional[int]:
+    """
+    Add delta to a sweet's stock in one statement.
+
+    The change is not committed; the caller owns the transaction.
+
+    Args:
+        db: Database session
+        sweet_id: Sweet ID
+        delta: Amount to add (negative to remove)
+        minimum: If given, only apply when the current stock is at least this
+
+    Returns:
+        New stock level, or None if the sweet does not exist or has less
+        than ``minimum`` in stock
+    """
+    statement = update(Sweet).where(Sweet.id == sweet_id)
+    if minimum is not None:
+        statement = statement.where(Sweet.stock >= minimum)
+    statement = statement.values(stock=Sweet.stock + delta)
+
+    if supports_returning(db):
+        return db.execute(statement.returning(Sweet.stock)).scalar_one_or_none()
+
+    # Older SQLite: the UPDATE is still atomic, the new level needs a read
+    if db.execute(statement).rowcount == 0:
+        return None
+    return get_stock(db, sweet_id)
+
+
+def purchase(db: Session, sweet_id: int, quantity: int) -> Optional[int]:
+    """
+    Remove quantity from stock if enough is available.
+
+    Args:
+        db: Database session
+        sweet_id: Sweet ID
+        quantity: Units to purchase
+
+    Returns:
+        New stock level, or None if the sweet is missing or short on stock
+    """
+    return adjust_stock(db, sweet_id, -quantity, minimum=quantity)
+
+
+def restock(db: Session, sweet_id: int, quantity: int) -> Optional[int]:
+    """
+    Add quantity to stock.
+
+    Args:
+        db: Database session
+        sweet_id: Sweet ID
+        quantity: Units to add
+
+    Returns:
+        New stock level, or None if the sweet does not exist
+    """
+    return adjust_stock(db, sweet_id, quantity)
+
+
+def get_stocks(db: Session, sweet_ids) -> Dict[int, int]:
+    """
+    Read the current stock of several sweets.
+
+    Args:
+        db: Database session
+        sweet_ids: Sweet IDs
+
+    Returns:
+        Mapping of sweet ID to stock for the sweets that exist
+    """
+    rows = db.execute(
+        select(Sweet.id, Sweet.stock).where(Sweet.id.in_(list(sweet_ids)))
+    )
+    return {sweet_id: stock for sweet_id, stock in rows}
+
+
+def purchase_many(db: Session, quantities: Dict[int, int]) -> Optional[Dict[int, int]]:
+    """
+    Remove stock for several sweets in one UPDATE statement.
+
+    Every line is decremented only if its sweet has enough stock. If any
+    line could not be applied the statement has still changed the other
+    rows, so the caller must roll back when this returns None.
+
+    Args:
+        db: Database session
+        quantities: Mapping of sweet ID to units to purchase
+
+    Returns:
+        Mapping of sweet ID to new stock level, or None if any sweet is
+        missing or short on stock
+    """
+    demand = case(quantities, value=Sweet.id)
+    statement = (
+        update(Sweet)
+        .where(Sweet.id.in_(list(quantities)), Sweet.stock >= demand)
+        .values(stock=Sweet.stock - demand)
+        .execution_options(synchronize_session=False)
+    )
+
+    if supports_returning(db):
+        rows = db.execute(statement.returning(Sweet.id, Sweet.stock)).all()
+        if len(rows) != len(quantities):
+            return None
+        return {sweet_id: stock for sweet_id, stock in rows}
+
+    if db.execute(statement).rowcount != len(quantities):
+        return None
+    return get_stocks(db, quantities)
+
+
+def apply_change(db: Session, kind: str, sweet_id: int, quantity: int) -> StockChange:
+    """
+    Apply one purchase or restock inside the caller's transaction.
+
+    A purchase that cannot be applied changes nothing, so other changes
+    in the same transaction are unaffected.
+
+    Args:
+        db: Database session
+        kind: PURCHASE or RESTOCK
+        sweet_id: Sweet ID
+        quantity: Units to purchase or add
+
+    Returns:
+        The new stock, or why the change was not applied
+    """
+    if kind == PURCHASE:
+        new_stock = purchase(db, sweet_id, quantity)
+    else:
+        new_stock = restock(db, sweet_id, quantity)
+
+    if new_stock is None:
+        return StockChange(new_stock=None, available=get_stock(db, sweet_id))
+    return StockChange(new_stock=new_stock, available=new_stock)
@@ -0,0 +1,243 @@
+"""
+Group commit for purchases and restocks.
+
+Under a burst of concurrent purchases each request would otherwise
+commit (and fsync) its own transaction, and SQLite runs those commits
+one at a time. The combiner queues purchase and restock intents for a
+short window, applies a whole batch in one transaction on a single
+writer thread, and hands every caller its own outcome. Once stopping
+begins the combiner takes no more intents; callers apply theirs directly.
+"""
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.stock import StockChange, apply_change
+
+_STOP = object()
+
+
+class StockIntent(NamedTuple):
+    """A queued purchase or restock awaiting its batch."""
+    kind: str
+    sweet_id: int
+    quantity: int
+    future: Future
+
+
+class WriteCombiner:
+    """
+    Batches stock changes from many callers into shared transactions.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        window_ms: float = 2.0,
+        max_batch: int = 64
+    ):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        # Guards _closed, so no intent is queued behind the stop marker
+        self._lock = threading.Lock()
+        self._closed = True
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    @property
+    def running(self) -> bool:
+        """Whether the writer thread is accepting intents."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        with self._lock:
+            if self.running:
+                return
+            self._reset_stats()
+            self._thread = threading.Thread(target=self._run, name="write-combiner", daemon=True)
+            self._thread.start()
+            self._closed = False
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Apply everything already queued, then stop the writer thread.
+
+        Intents still queued if the thread is gone (it died) get an
+        exception rather than hanging their callers.
+
+        Args:
+            timeout: Seconds to wait for the queue to drain
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        thread.join(timeout)
+        if not thread.is_alive():
+            self._fail_queued(RuntimeError("Write combiner stopped"))
+        with self._lock:
+            if self._thread is thread:
+                self._thread = None
+
+    def submit(self, kind: str, sweet_id: int, quantity: int) -> "Optional[Future[StockChange]]":
+        """
+        Queue a purchase or restock for the next batch.
+
+        Args:
+            kind: PURCHASE or RESTOCK
+            sweet_id: Sweet ID
+            quantity: Units to purchase or add
+
+        Returns:
+            Future resolved with the StockChange once the batch commits,
+            or with the exception if this intent could not be applied;
+            None if the combiner is stopped or stopping, in which case
+            the caller applies the change itself. An intent whose future
+            is cancelled before its batch starts is skipped.
+        """
+        future: "Future[StockChange]" = Future()
+        with self._lock:
+            if self._closed or not self.running:
+                return None
+            self._queue.put(StockIntent(kind, sweet_id, quantity, future))
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get commit and batching statistics since the writer started.
+
+        Returns:
+            Dictionary with commit count and rate, intent count, mean
+            batch size and a histogram of batch sizes keyed by the
+            power-of-two upper bound of each bucket
+        """
+        with self._stats_lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            return {
+                "running": self.running,
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "commits": self._commits,
+                "intents": self._intents,
+                "failed_batches": self._failed_batches,
+                "commits_per_sec": self._commits / elapsed,
+                "mean_batch_size": self._intents / self._commits if self._commits else 0.0,
+                "batch_size_histogram": dict(sorted(self._histogram.items())),
+            }
+
+    def _reset_stats(self) -> None:
+        with self._stats_lock:
+            self._started = time.monotonic()
+            self._commits = 0
+            self._intents = 0
+            self._failed_batches = 0
+            self._histogram: Counter = Counter()
+
+    def _run(self) -> None:
+        """Writer loop: collect a batch for up to one window, then apply it."""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = self._claim([first])
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.extend(self._claim([item]))
+
+            if batch:
+                self._apply(batch)
+
+        # Anything queued behind the stop marker still gets applied
+        leftovers: List[StockIntent] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.extend(self._claim([item]))
+        for start in range(0, len(leftovers), self.max_batch):
+            self._apply(leftovers[start:start + self.max_batch])
+
+    @staticmethod
+    def _claim(intents: List[StockIntent]) -> List[StockIntent]:
+        """Mark intents as running; drop those their callers gave up on."""
+        return [intent for intent in intents if intent.future.set_running_or_notify_cancel()]
+
+    def _fail_queued(self, exc: Exception) -> None:
+        """Resolve every intent left in the queue with an exception."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(exc)
+
+    def _apply(self, batch: List[StockIntent]) -> None:
+        """
+        Apply a batch in one transaction and resolve its futures.
+
+        If the batch fails, its intents are retried one per transaction,
+        so only the intent at fault gets the exception.
+        """
+        try:
+            with self.session_factory() as db:
+                changes = [
+                    apply_change(db, intent.kind, intent.sweet_id, intent.quantity)
+                    for intent in batch
+                ]
+                db.commit()
+        except Exception as exc:
+            with self._stats_lock:
+                self._failed_batches += 1
+            if len(batch) > 1:
+                for intent in batch:
+                    self._apply([intent])
+                return
+            batch[0].future.set_exception(exc)
+            return
+        except BaseException as exc:
+            # The writer thread is going down; don't leave this batch waiting
+            for intent in batch:
+                intent.future.set_exception(exc)
+            raise
+
+        with self._stats_lock:
+            self._commits += 1
+            self._intents += len(batch)
+            self._histogram[1 << (len(batch) - 1).bit_length()] += 1
+
+        for intent, change in zip(batch, changes):
+            intent.future.set_result(change)
+
+
+write_combiner = WriteCombiner(
+    SessionLocal,
+    window_ms=settings.write_combiner_window_ms,
+    max_batch=settings.write_combiner_max_batch
+)
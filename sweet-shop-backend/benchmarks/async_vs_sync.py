@@ -0,0 +1,105 @@
+"""
+Sync vs async data path under high concurrency.
+
+Starts the app twice under uvicorn against identical seeded databases,
+once with the sync routers (thread pool) and once with
+SWEET_SHOP_DATABASE_ASYNC=true (aiosqlite), and drives each with many
+concurrent HTTP clients. The response cache is disabled so every read
+reaches the database. Reports requests per second and p50/p99 latency.
+
+Usage:
+    python -m benchmarks.async_vs_sync [--concurrency 256] [--requests 5000] [--sweets 1000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+from app.auth import create_access_token
+from benchmarks.server import percentile, run_server, seed_database
+
+
+async def drive(base_url: str, workload: str, concurrency: int, requests: int, sweets: int) -> dict:
+    """
+    Send requests from many concurrent workers.
+
+    Args:
+        base_url: Server URL
+        workload: "read" (GET /sweets/{id}) or "purchase"
+        concurrency: Concurrent in-flight requests
+        requests: Total requests
+        sweets: Number of sweets in the catalog
+
+    Returns:
+        Dictionary with throughput, latency percentiles and error count
+    """
+    token = create_access_token({"sub": "bench_user", "uid": 2, "role": "user", "ver": 0})
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            for _ in remaining:
+                sweet_id = rng.randint(1, sweets)
+                started = time.perf_counter()
+                if workload == "read":
+                    response = await client.get(f"/sweets/{sweet_id}")
+                else:
+                    response = await client.post(
+                        f"/inventory/{sweet_id}/purchase", json={"quantity": 1}, headers=headers
+                    )
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sweets", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{args.concurrency} concurrent clients, {args.requests} requests per run")
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            seed_database(tmp, args.sweets)
+            env = {
+                "SWEET_SHOP_DATABASE_ASYNC": str(mode == "async").lower(),
+                "SWEET_SHOP_RESPONSE_CACHE_ENABLED": "false",
+            }
+            with run_server(tmp, env) as base_url:
+                for workload in ("read", "purchase"):
+                    result = asyncio.run(
+                        drive(base_url, workload, args.concurrency, args.requests, args.sweets)
+                    )
+                    print(
+                        f"{mode:<6} {workload:<9} {result['rps']:>8.0f} req/s  "
+                        f"p50={result['p50_ms']:.1f}ms  p99={result['p99_ms']:.1f}ms  "
+                        f"errors={result['errors']}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
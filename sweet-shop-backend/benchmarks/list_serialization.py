@@ -0,0 +1,101 @@
+"""
+Cost of loading and serializing sweet lists, per serialization path.
+
+Times one list response at each catalog size, query included, three ways:
+
+    orm        ORM Sweet entities, validated into SweetResponse and encoded
+               through jsonable_encoder and json.dumps, as FastAPI does
+               for a response_model
+    validated  selected column rows, validated with a TypeAdapter and
+               dumped with pydantic
+    fast       Core column tuples turned straight into dictionaries and
+               encoded with pydantic_core.to_json (what the list
+               endpoints do)
+
+Usage:
+    python -m benchmarks.list_serialization [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Sweet
+from app.schemas import SweetResponse, sweet_rows
+
+FIELDS = list(SweetResponse.model_fields)
+COLUMNS = [getattr(Sweet, name) for name in FIELDS]
+SweetList = TypeAdapter(List[SweetResponse])
+
+
+def orm_path(db: Session) -> bytes:
+    sweets = db.query(Sweet).order_by(Sweet.id).all()
+    validated = SweetList.validate_python(sweets, from_attributes=True)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def validated_path(db: Session) -> bytes:
+    rows = db.query(*COLUMNS).order_by(Sweet.id).all()
+    return SweetList.dump_json(SweetList.validate_python(rows, from_attributes=True))
+
+
+def fast_path(db: Session) -> bytes:
+    rows = db.connection().execute(select(*COLUMNS).order_by(Sweet.id)).all()
+    return to_json(sweet_rows(rows, FIELDS))
+
+
+PATHS = {"orm": orm_path, "validated": validated_path, "fast": fast_path}
+
+
+def best_time(db: Session, path: Callable[[Session], bytes], repeat: int) -> float:
+    """Fastest of several runs, in seconds; a fresh session each time."""
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()
+        started = time.perf_counter()
+        path(db)
+        timings.append(time.perf_counter() - started)
+        db.rollback()
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} " + " ".join(f"{name:>11}" for name in PATHS) + f" {'speedup':>9}")
+    for size in args.sizes:
+        engine = create_engine("sqlite://", poolclass=StaticPool)
+        Base.metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(insert(Sweet), [
+                {"name": f"Sweet {i}", "description": f"Benchmark sweet number {i}",
+                 "price": 1.25 + i % 100 / 10, "stock": i % 500}
+                for i in range(size)
+            ])
+
+        with Session(engine) as db:
+            outputs = {json.dumps(json.loads(path(db))) for path in PATHS.values()}
+            assert len(outputs) == 1, "serialization paths disagree"
+            results = {name: best_time(db, path, args.repeat) for name, path in PATHS.items()}
+        engine.dispose()
+
+        print(
+            f"{size:>8} "
+            + " ".join(f"{seconds * 1000:>9.1f}ms" for seconds in results.values())
+            + f" {results['orm'] / results['fast']:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
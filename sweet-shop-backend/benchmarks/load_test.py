@@ -0,0 +1,338 @@
+"""
+End-to-end HTTP load test with per-route latency baselines.
+
+Starts the app under uvicorn against a freshly seeded database and
+drives it with an async httpx client for a fixed time. A steady mix of
+workers browses /inventory page by page, searches, purchases and
+restocks (as admin), and bursts of concurrent logins and purchases fire
+at a fixed interval on top. Reports throughput and p50/p95/p99 latency
+per route.
+
+Results can be saved as a JSON baseline. A later run compared against
+it fails (exit status 1) when any route's p95 latency grows, or its
+throughput drops, by more than the threshold.
+
+Usage:
+    python -m benchmarks.load_test [--seconds 20] [--concurrency 32]
+        [--save-baseline] [--baseline benchmarks/baselines/load_test.json]
+        [--threshold 0.25] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.server import (
+    ADMIN_CREDENTIALS,
+    USER_CREDENTIALS,
+    percentile,
+    run_server,
+    seed_database
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "load_test.json")
+
+# Relative share of steady workers per scenario
+STEADY_MIX = {"browse": 4, "search": 3, "purchase": 2, "restock": 1}
+SEARCH_TERMS = ["chocolate", "caramel", "choc", "sweet 12", "benchmark caramel", "toffee"]
+PAGE_SIZE = 50
+
+
+class Recorder:
+    """Collects latency samples and errors per route."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        """
+        Send one request and record its latency under a route label.
+
+        Args:
+            client: HTTP client
+            route: Route template used as the label, e.g. "GET /inventory"
+            method: HTTP method
+            url: Request URL
+            **kwargs: Passed to httpx
+
+        Returns:
+            The response, or None if the request failed to complete
+        """
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[route] += 1
+            return None
+        self.latencies[route].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def report(self, seconds: float) -> Dict[str, Dict[str, float]]:
+        """
+        Summarise every route.
+
+        Args:
+            seconds: Length of the run
+
+        Returns:
+            Mapping of route to request count, throughput, latency
+            percentiles in milliseconds and error count
+        """
+        routes = sorted(set(self.latencies) | set(self.errors))
+        return {
+            route: {
+                "requests": len(self.latencies[route]),
+                "rps": len(self.latencies[route]) / seconds,
+                "p50_ms": statistics.median(self.latencies[route]) * 1000 if self.latencies[route] else 0.0,
+                "p95_ms": percentile(self.latencies[route], 0.95) * 1000 if self.latencies[route] else 0.0,
+                "p99_ms": percentile(self.latencies[route], 0.99) * 1000 if self.latencies[route] else 0.0,
+                "errors": self.errors[route],
+            }
+            for route in routes
+        }
+
+
+async def login(client: httpx.AsyncClient, recorder: Recorder, credentials: dict) -> Optional[str]:
+    """Log in and return a bearer token, or None on failure."""
+    response = await recorder.request(client, "POST /auth/login", "POST", "/auth/login", json=credentials)
+    if response is None or response.status_code != 200:
+        return None
+    return response.json()["access_token"]
+
+
+async def browse(client, recorder, rng, context) -> None:
+    """Walk up to five pages of /inventory following X-Next-Cursor."""
+    params = {"limit": PAGE_SIZE}
+    for _ in range(rng.randint(1, 5)):
+        response = await recorder.request(client, "GET /inventory", "GET", "/inventory", params=params)
+        cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+        if not cursor:
+            return
+        params = {"limit": PAGE_SIZE, "cursor": cursor}
+
+
+async def search(client, recorder, rng, context) -> None:
+    """Run one catalog search."""
+    await recorder.request(
+        client, "GET /sweets/search", "GET", "/sweets/search",
+        params={"q": rng.choice(SEARCH_TERMS), "limit": 20}
+    )
+
+
+async def purchase(client, recorder, rng, context) -> None:
+    """Buy one unit of a random sweet."""
+    sweet_id = rng.randint(1, context["sweets"])
+    await recorder.request(
+        client, "POST /inventory/{id}/purchase", "POST", f"/inventory/{sweet_id}/purchase",
+        json={"quantity": 1}, headers=context["user_headers"]
+    )
+
+
+async def restock(client, recorder, rng, context) -> None:
+    """Restock a random sweet as admin."""
+    sweet_id = rng.randint(1, context["sweets"])
+    await recorder.request(
+        client, "POST /inventory/{id}/restock", "POST", f"/inventory/{sweet_id}/restock",
+        json={"quantity": 5}, headers=context["admin_headers"]
+    )
+
+
+SCENARIOS = {"browse": browse, "search": search, "purchase": purchase, "restock": restock}
+
+
+async def run_load(
+    base_url: str,
+    seconds: float,
+    concurrency: int,
+    burst_size: int,
+    burst_interval: float,
+    sweets: int,
+    seed: int = 0
+) -> Dict[str, Dict[str, float]]:
+    """
+    Drive the steady mix and periodic bursts against a running server.
+
+    Args:
+        base_url: Server URL
+        seconds: How long to run
+        concurrency: Number of steady workers, split by STEADY_MIX
+        burst_size: Concurrent logins and purchases per burst
+        burst_interval: Seconds between bursts (0 disables bursts)
+        sweets: Number of sweets in the seeded catalog
+        seed: Random seed for the workers
+
+    Returns:
+        Per-route report from Recorder.report
+    """
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency + 2 * burst_size)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        setup = Recorder()
+        user_token = await login(client, setup, USER_CREDENTIALS)
+        admin_token = await login(client, setup, ADMIN_CREDENTIALS)
+        if user_token is None or admin_token is None:
+            raise RuntimeError("could not log in the benchmark users")
+        context = {
+            "sweets": sweets,
+            "user_headers": {"Authorization": f"Bearer {user_token}"},
+            "admin_headers": {"Authorization": f"Bearer {admin_token}"},
+        }
+
+        deadline = time.monotonic() + seconds
+        total_weight = sum(STEADY_MIX.values())
+        workers = [
+            name
+            for name, weight in STEADY_MIX.items()
+            for _ in range(max(1, round(concurrency * weight / total_weight)))
+        ]
+
+        async def steady(name: str, worker_seed: int):
+            rng = random.Random(worker_seed)
+            while time.monotonic() < deadline:
+                await SCENARIOS[name](client, recorder, rng, context)
+
+        async def bursts():
+            rng = random.Random(seed)
+            while burst_interval > 0:
+                await asyncio.sleep(burst_interval)
+                if time.monotonic() >= deadline:
+                    return
+                await asyncio.gather(
+                    *(login(client, recorder, USER_CREDENTIALS) for _ in range(burst_size)),
+                    *(purchase(client, recorder, rng, context) for _ in range(burst_size))
+                )
+
+        await asyncio.gather(
+            *(steady(name, seed * 1000 + i) for i, name in enumerate(workers)),
+            bursts()
+        )
+
+    return recorder.report(seconds)
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Find routes that regressed against a baseline.
+
+    Args:
+        current: Per-route report of this run
+        baseline: Per-route report of the baseline run
+        threshold: Allowed relative change, e.g. 0.25 for 25%
+
+    Returns:
+        One message per regression; empty if the run is within threshold
+    """
+    regressions = []
+    for route, base in baseline.items():
+        result = current.get(route)
+        if result is None:
+            regressions.append(f"{route}: no requests completed")
+            continue
+        if base["p95_ms"] and result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{route}: p95 {result['p95_ms']:.1f}ms vs baseline {base['p95_ms']:.1f}ms"
+            )
+        if base["rps"] and result["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(
+                f"{route}: {result['rps']:.1f} req/s vs baseline {base['rps']:.1f} req/s"
+            )
+    return regressions
+
+
+def print_report(report: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None) -> None:
+    """Print one line per route, with the baseline p95 when there is one."""
+    print(f"{'route':<32} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for route, result in report.items():
+        line = (
+            f"{route:<32} {result['rps']:>8.1f} {result['p50_ms']:>6.1f}ms "
+            f"{result['p95_ms']:>6.1f}ms {result['p99_ms']:>6.1f}ms {result['errors']:>7}"
+        )
+        if baseline and route in baseline:
+            line += f"   (baseline p95 {baseline[route]['p95_ms']:.1f}ms)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=32, help="steady workers")
+    parser.add_argument("--burst-size", type=int, default=16, help="logins and purchases per burst")
+    parser.add_argument("--burst-interval", type=float, default=5.0, help="seconds between bursts, 0 for none")
+    parser.add_argument("--sweets", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression, e.g. 0.25 = 25%%")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="NAME=VALUE",
+        help="extra server setting, e.g. SWEET_SHOP_DATABASE_ASYNC=true"
+    )
+    args = parser.parse_args()
+
+    env = dict(item.split("=", 1) for item in args.env)
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_database(tmp, args.sweets)
+        with run_server(tmp, env) as base_url:
+            report = asyncio.run(run_load(
+                base_url, args.seconds, args.concurrency,
+                args.burst_size, args.burst_interval, args.sweets, args.seed
+            ))
+
+    results = {
+        "config": {
+            "seconds": args.seconds,
+            "concurrency": args.concurrency,
+            "burst_size": args.burst_size,
+            "burst_interval": args.burst_interval,
+            "sweets": args.sweets,
+            "env": env,
+        },
+        "routes": report,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print_report(report)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["config"] != results["config"]:
+            print("Warning: baseline was recorded with a different configuration")
+    print_report(report, baseline and baseline["routes"])
+
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    regressions = compare(report, baseline["routes"], args.threshold)
+    if regressions:
+        print(f"\nRegressed by more than {args.threshold:.0%}:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    print(f"\nWithin {args.threshold:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
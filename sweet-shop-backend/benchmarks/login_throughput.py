@@ -0,0 +1,120 @@
+"""
+Login throughput per core, and catalog latency during a login storm.
+
+Starts the app under uvicorn and measures catalog reads (GET
+/sweets/{id}, response cache disabled) on their own, then again while
+many clients log in as fast as they can. Reports logins per second per
+password hashing process, how many logins were refused with 503, and
+the catalog p50/p99 latency with and without the storm.
+
+Usage:
+    python -m benchmarks.login_throughput [--seconds 10] [--logins 64] [--readers 16]
+        [--processes N] [--rounds 12]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+import httpx
+
+from benchmarks.server import USER_CREDENTIALS, percentile, run_server, seed_database
+
+SWEETS = 1000
+
+
+async def drive(base_url: str, seconds: float, readers: int, logins: int) -> dict:
+    """
+    Run catalog readers, and optionally login clients, for a fixed time.
+
+    Args:
+        base_url: Server URL
+        seconds: How long to run
+        readers: Concurrent catalog readers
+        logins: Concurrent login clients (0 for none)
+
+    Returns:
+        Dictionary with catalog latency percentiles and login counts
+    """
+    read_latencies: List[float] = []
+    counts = {"logins": 0, "refused": 0, "failed": 0}
+    deadline = time.monotonic() + seconds
+
+    limits = httpx.Limits(max_connections=readers + logins)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def reader(seed: int):
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                await client.get(f"/sweets/{rng.randint(1, SWEETS)}")
+                read_latencies.append(time.perf_counter() - started)
+
+        async def login_client():
+            while time.monotonic() < deadline:
+                response = await client.post("/auth/login", json=USER_CREDENTIALS)
+                if response.status_code == 200:
+                    counts["logins"] += 1
+                elif response.status_code == 503:
+                    counts["refused"] += 1
+                else:
+                    counts["failed"] += 1
+
+        await asyncio.gather(
+            *(reader(i) for i in range(readers)),
+            *(login_client() for _ in range(logins))
+        )
+
+    return {
+        "p50_ms": statistics.median(read_latencies) * 1000,
+        "p99_ms": percentile(read_latencies, 0.99) * 1000,
+        "reads_per_sec": len(read_latencies) / seconds,
+        **counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--logins", type=int, default=64, help="concurrent login clients")
+    parser.add_argument("--readers", type=int, default=16, help="concurrent catalog readers")
+    parser.add_argument("--processes", type=int, help="password hashing processes (default: one per CPU)")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    args = parser.parse_args()
+
+    processes = args.processes or os.cpu_count() or 1
+    env = {
+        "SWEET_SHOP_RESPONSE_CACHE_ENABLED": "false",
+        "SWEET_SHOP_PASSWORD_BCRYPT_ROUNDS": str(args.rounds),
+        "SWEET_SHOP_PASSWORD_HASH_PROCESSES": str(processes),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_database(tmp, SWEETS)
+        with run_server(tmp, env) as base_url:
+            # Start the hashing pool (and rehash the seeded password to the
+            # benchmark cost) before measuring
+            httpx.post(f"{base_url}/auth/login", json=USER_CREDENTIALS, timeout=60)
+
+            quiet = asyncio.run(drive(base_url, args.seconds, args.readers, 0))
+            storm = asyncio.run(drive(base_url, args.seconds, args.readers, args.logins))
+
+    logins_per_sec = storm["logins"] / args.seconds
+    print(f"bcrypt cost {args.rounds}, {processes} hashing process(es), {args.logins} login clients")
+    print(
+        f"logins      {logins_per_sec:>8.1f} /s  "
+        f"{logins_per_sec / processes:.1f} /s per core  "
+        f"refused(503)={storm['refused']}  failed={storm['failed']}"
+    )
+    for label, result in (("catalog", quiet), ("+ storm", storm)):
+        print(
+            f"{label:<10} {result['reads_per_sec']:>8.0f} reads/s  "
+            f"p50={result['p50_ms']:.1f}ms  p99={result['p99_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Per-request cost of the metrics middleware.
+
+Calls a trivial ASGI app directly, with and without MetricsMiddleware
+wrapped around it, and reports the difference in microseconds per
+request. No server or network is involved, so the number is the
+middleware's own overhead.
+
+Usage:
+    python -m benchmarks.metrics_overhead [--requests 100000]
+"""
+import argparse
+import asyncio
+import time
+
+from app.metrics import MetricsMiddleware
+
+
+class _Route:
+    path = "/bench"
+
+
+async def trivial_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def time_requests(app, requests: int) -> float:
+    """Seconds per request for calling app directly."""
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app({"type": "http", "method": "GET", "path": "/bench"}, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100000)
+    args = parser.parse_args()
+
+    bare = asyncio.run(time_requests(trivial_app, args.requests))
+    measured = asyncio.run(time_requests(MetricsMiddleware(trivial_app), args.requests))
+    print(f"bare app       {bare * 1e6:6.2f} us/request")
+    print(f"with metrics   {measured * 1e6:6.2f} us/request")
+    print(f"overhead       {(measured - bare) * 1e6:6.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Overload test: catalog browsing far beyond capacity, with and without
+admission control.
+
+Runs the app twice against a freshly seeded database, once with
+SWEET_SHOP_ADMISSION_ENABLED=false and once with it on, with the
+response cache off. Each time a crowd of clients browses large inventory
+pages and searches without pause, while a few clients purchase and one
+polls /health. Reports, per route, how many requests succeeded or were
+shed (503) and the latency of the successful ones. With admission
+control, purchases and health checks should stay fast while surplus
+browsing is refused quickly.
+
+Run the load on other CPUs than the server (or another machine): on a
+single CPU the client's own event loop dominates the latencies.
+
+Usage:
+    python -m benchmarks.overload [--seconds 10] [--browsers 64] [--buyers 4] [--page-size 1000]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.server import USER_CREDENTIALS, percentile, run_server, seed_database
+
+
+async def drive(base_url: str, seconds: float, browsers: int, buyers: int, page_size: int):
+    """Run the overload mix; return latencies of successes and status counts per route."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter] = defaultdict(Counter)
+    limits = httpx.Limits(max_connections=browsers + buyers + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        token = (await client.post("/auth/login", json=USER_CREDENTIALS)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        deadline = time.monotonic() + seconds
+
+        async def request(route: str, method: str, url: str, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                statuses[route]["error"] += 1
+                return
+            statuses[route][response.status_code] += 1
+            if response.status_code < 400:
+                latencies[route].append(time.perf_counter() - started)
+
+        async def browse(number: int):
+            while time.monotonic() < deadline:
+                if number % 2:
+                    await request("GET /inventory", "GET", "/inventory", params={"limit": page_size})
+                else:
+                    await request("GET /sweets/search", "GET", "/sweets/search", params={"q": "caramel", "limit": page_size})
+
+        async def buy():
+            while time.monotonic() < deadline:
+                await request(
+                    "POST /inventory/{id}/purchase", "POST", "/inventory/1/purchase",
+                    json={"quantity": 1}, headers=headers
+                )
+
+        async def check_health():
+            while time.monotonic() < deadline:
+                await request("GET /health", "GET", "/health")
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(
+            *(browse(number) for number in range(browsers)),
+            *(buy() for _ in range(buyers)),
+            check_health(),
+        )
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--browsers", type=int, default=64)
+    parser.add_argument("--buyers", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--sweets", type=int, default=5000)
+    args = parser.parse_args()
+
+    for enabled in ("false", "true"):
+        with tempfile.TemporaryDirectory() as directory:
+            seed_database(directory, args.sweets)
+            # Uncached pages, so every read costs the server real work
+            env = {"SWEET_SHOP_ADMISSION_ENABLED": enabled, "SWEET_SHOP_RESPONSE_CACHE_ENABLED": "false"}
+            with run_server(directory, env=env) as base_url:
+                latencies, statuses = asyncio.run(
+                    drive(base_url, args.seconds, args.browsers, args.buyers, args.page_size)
+                )
+
+        print(f"\nadmission control {'on' if enabled == 'true' else 'off'}")
+        print(f"{'route':32} {'ok':>7} {'503':>7} {'p50 ms':>8} {'p99 ms':>8}")
+        for route in sorted(statuses):
+            ok = latencies[route]
+            shed = statuses[route][503]
+            p50 = f"{percentile(ok, 0.5) * 1000:8.1f}" if ok else f"{'-':>8}"
+            p99 = f"{percentile(ok, 0.99) * 1000:8.1f}" if ok else f"{'-':>8}"
+            print(f"{route:32} {len(ok):7d} {shed:7d} {p50} {p99}")
+
+
+if __name__ == "__main__":
+    main()
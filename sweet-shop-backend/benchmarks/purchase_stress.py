@@ -0,0 +1,132 @@
+"""
+Multi-threaded purchase stress test.
+
+Runs the same burst of concurrent purchases against a file-backed SQLite
+database twice: once with the legacy read-modify-write flow (SELECT,
+check in Python, assign, commit, refresh) and once with the atomic
+conditional UPDATE used by the inventory router. Reports purchases per
+second and whether any stock was oversold.
+
+Usage:
+    python -m benchmarks.purchase_stress [--threads 16] [--attempts 200] [--stock 1000]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Sweet
+from app.stock import get_stock, purchase
+
+
+def legacy_purchase(session, sweet_id: int, quantity: int) -> bool:
+    """The pre-atomic purchase flow, kept here for comparison."""
+    sweet = session.query(Sweet).filter(Sweet.id == sweet_id).first()
+    if sweet is None or sweet.stock < quantity:
+        return False
+    sweet.stock -= quantity
+    session.commit()
+    session.refresh(sweet)
+    return True
+
+
+def atomic_purchase(session, sweet_id: int, quantity: int) -> bool:
+    """The conditional UPDATE ... RETURNING purchase flow."""
+    if purchase(session, sweet_id, quantity) is None:
+        session.rollback()
+        return False
+    session.commit()
+    return True
+
+
+def run(strategy, threads: int, attempts: int, stock: int) -> dict:
+    """
+    Hammer one sweet with concurrent purchases.
+
+    Args:
+        strategy: Purchase function taking (session, sweet_id, quantity)
+        threads: Number of buyer threads
+        attempts: Purchases attempted per thread
+        stock: Initial stock of the sweet
+
+    Returns:
+        Dictionary with sold units, final stock, oversell and throughput
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'stress.db')}",
+            connect_args={"check_same_thread": False, "timeout": 60}
+        )
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as session:
+            sweet = Sweet(name="Stress", description="Stress test", price=1.0, stock=stock)
+            session.add(sweet)
+            session.commit()
+            sweet_id = sweet.id
+
+        sold = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads + 1)
+
+        def buyer():
+            count = 0
+            barrier.wait()
+            for _ in range(attempts):
+                with Session() as session:
+                    if strategy(session, sweet_id, 1):
+                        count += 1
+            with lock:
+                sold.append(count)
+
+        workers = [threading.Thread(target=buyer) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        with Session() as session:
+            final_stock = get_stock(session, sweet_id)
+        engine.dispose()
+
+    total_sold = sum(sold)
+    return {
+        "sold": total_sold,
+        "final_stock": final_stock,
+        "oversold": total_sold - (stock - final_stock),
+        "purchases_per_sec": threads * attempts / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(
+        f"{args.threads} threads x {args.attempts} attempts, "
+        f"initial stock {args.stock}"
+    )
+    for label, strategy in (("before (read-modify-write)", legacy_purchase),
+                            ("after (atomic UPDATE)", atomic_purchase)):
+        result = run(strategy, args.threads, args.attempts, args.stock)
+        print(
+            f"{label:<28} {result['purchases_per_sec']:>9.0f} purchases/s  "
+            f"sold={result['sold']} final_stock={result['final_stock']} "
+            f"oversold={result['oversold']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Helpers for benchmarks that drive a real uvicorn server over HTTP.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.auth import hash_password
+from app.database import Base
+from app.models import Sweet, User, UserRole
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Credentials of the users created by seed_database
+ADMIN_CREDENTIALS = {"username": "bench_admin", "password": "bench-admin-pw"}
+USER_CREDENTIALS = {"username": "bench_user", "password": "bench-user-pw"}
+
+
+def seed_database(directory: str, sweets: int) -> None:
+    """
+    Create sweet_shop.db in a directory with users and a sweets catalog.
+
+    Args:
+        directory: Directory the server will run in
+        sweets: Number of sweets to create
+    """
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'sweet_shop.db')}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            User(
+                username=ADMIN_CREDENTIALS["username"],
+                hashed_password=hash_password(ADMIN_CREDENTIALS["password"]),
+                role=UserRole.ADMIN
+            ),
+            User(
+                username=USER_CREDENTIALS["username"],
+                hashed_password=hash_password(USER_CREDENTIALS["password"]),
+                role=UserRole.USER
+            ),
+        ])
+        session.execute(insert(Sweet), [
+            {
+                "name": f"Sweet {i}",
+                "description": f"Benchmark sweet number {i} with chocolate" if i % 3 == 0
+                else f"Benchmark sweet number {i} with caramel",
+                "price": 1.0 + (i % 50) / 10,
+                "stock": 10**6,
+            }
+            for i in range(sweets)
+        ])
+        session.commit()
+    engine.dispose()
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(
+    directory: str,
+    env: Optional[Dict[str, str]] = None,
+    port: Optional[int] = None,
+    args: tuple = ()
+) -> Iterator[str]:
+    """
+    Run uvicorn with the app in a directory until the block exits.
+
+    Args:
+        directory: Working directory holding sweet_shop.db
+        env: Extra environment variables (e.g. SWEET_SHOP_* settings)
+        port: Port to listen on (default: a free port)
+        args: Extra uvicorn command-line arguments
+
+    Yields:
+        Base URL of the running server
+    """
+    port = port or free_port()
+    process_env = dict(os.environ, PYTHONPATH=BACKEND_DIR, **(env or {}))
+    process_env.pop("TESTING", None)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", *args],
+        cwd=directory,
+        env=process_env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{base_url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
@@ -0,0 +1,128 @@
+"""
+SQLite connection profile benchmark.
+
+Measures write throughput (single-row purchase transactions, each with
+its own commit) and read throughput (point lookups by primary key) on a
+file database, first with SQLite's defaults and then with the
+"performance" profile from app.config (WAL, synchronous=NORMAL, mmap,
+larger page cache, in-memory temp store, busy timeout).
+
+Usage:
+    python -m benchmarks.sqlite_profile [--rows 10000] [--writes 2000] [--reads 50000] [--threads 4]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.config import Settings
+from app.database import Base, configure_sqlite
+from app.models import Sweet
+from app.stock import purchase
+
+
+def _timed_threads(threads: int, work) -> float:
+    """Run work(thread_index) on several threads; return elapsed seconds."""
+    barrier = threading.Barrier(threads + 1)
+
+    def runner(index):
+        barrier.wait()
+        work(index)
+
+    workers = [threading.Thread(target=runner, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def run(profile: str, rows: int, writes: int, reads: int, threads: int) -> dict:
+    """
+    Benchmark one profile on a fresh database.
+
+    Args:
+        profile: "default" or "performance"
+        rows: Sweets in the catalog
+        writes: Purchase transactions in total
+        reads: Point lookups in total
+        threads: Concurrent worker threads
+
+    Returns:
+        Dictionary with writes/s, reads/s and the number of failed writes
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'profile.db')}",
+            connect_args={"check_same_thread": False}
+        )
+        configure_sqlite(engine, Settings(sqlite_profile=profile))
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as session:
+            session.execute(insert(Sweet), [
+                {"name": f"Sweet {i}", "description": "Benchmark", "price": 1.0, "stock": 10**6}
+                for i in range(rows)
+            ])
+            session.commit()
+
+        errors = []
+
+        def write(index):
+            rng = random.Random(index)
+            for _ in range(writes // threads):
+                with Session() as session:
+                    try:
+                        purchase(session, rng.randint(1, rows), 1)
+                        session.commit()
+                    except Exception:
+                        errors.append(1)
+
+        def read(index):
+            rng = random.Random(index)
+            with engine.connect() as connection:
+                for _ in range(reads // threads):
+                    connection.exec_driver_sql(
+                        "SELECT id, name, description, price, stock FROM sweets WHERE id = ?",
+                        (rng.randint(1, rows),)
+                    ).first()
+
+        write_seconds = _timed_threads(threads, write)
+        read_seconds = _timed_threads(threads, read)
+        engine.dispose()
+
+    return {
+        "writes_per_sec": writes / write_seconds,
+        "reads_per_sec": reads / read_seconds,
+        "failed_writes": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=50000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows, {args.threads} threads")
+    for profile in ("default", "performance"):
+        result = run(profile, args.rows, args.writes, args.reads, args.threads)
+        print(
+            f"{profile:<12} {result['writes_per_sec']:>9.0f} writes/s  "
+            f"{result['reads_per_sec']:>9.0f} reads/s  "
+            f"failed writes={result['failed_writes']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
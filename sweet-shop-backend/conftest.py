@@ -4,6 +4,8 @@ Pytest configuration and fixtures.
 # SET ENVIRONMENT VARIABLE FIRST, before any imports
 import os
 os.environ["TESTING"] = "true"
+# Cheapest bcrypt cost, so fixtures creating users stay fast
+os.environ["SWEET_SHOP_PASSWORD_BCRYPT_ROUNDS"] = "4"
 
 import pytest
 from sqlalchemy import create_engine, inspect
@@ -13,6 +15,8 @@ from fastapi.testclient import TestClient
 # NOW import app modules
 from app.database import Base, get_db, SessionLocal
 from app.main import app
+from app.cache import catalog_cache
+from app.idempotency import idempotency_store
 
 # Create in-memory test database engine with StaticPool
 from sqlalchemy.pool import StaticPool
@@ -35,6 +39,9 @@ def db() -> Session:
     """
     # Create all tables in TEST_ENGINE
     Base.metadata.create_all(bind=TEST_ENGINE)
+    # Cached responses from earlier tests describe a dropped database
+    catalog_cache.invalidate()
+    idempotency_store.clear()
     
     # Create session using the reconfigured SessionLocal
     db_session = SessionLocal()
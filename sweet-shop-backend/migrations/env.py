@@ -0,0 +1,48 @@
+"""
+Alembic environment for the sweet shop database.
+
+Tables are created by init_db() (Base.metadata.create_all), which also
+creates every index declared on the models. Migrations bring databases
+created before a schema change up to date, so each one is idempotent.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.database import Base, DATABASE_URL, engine
+
+if context.config.config_file_name is not None:
+    fileConfig(context.config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL without connecting."""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run the migrations on the application's engine."""
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,30 @@
+"""Add indexes for catalog price/stock filters and sort orders
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_sweets_price_id", "sweets", ["price", "id"], if_not_exists=True)
+    op.create_index("ix_sweets_stock_id", "sweets", ["stock", "id"], if_not_exists=True)
+    op.create_index(
+        "ix_sweets_in_stock_price_id", "sweets", ["price", "id"],
+        sqlite_where=sa.text("stock > 0"), if_not_exists=True
+    )
+    # Let the planner see the new indexes' selectivity
+    op.execute("ANALYZE sweets")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_sweets_in_stock_price_id", "sweets", if_exists=True)
+    op.drop_index("ix_sweets_stock_id", "sweets", if_exists=True)
+    op.drop_index("ix_sweets_price_id", "sweets", if_exists=True)
@@ -0,0 +1,90 @@
+"""Add row versions and tombstones for delta sync of the catalog
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# A copy of the triggers in app.changes as of this revision
+NEXT_VERSION = "UPDATE catalog_version SET version = version + 1 WHERE id = 1;"
+CURRENT_VERSION = "(SELECT version FROM catalog_version WHERE id = 1)"
+
+TRIGGERS = {
+    "sweets_version_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS sweets_version_ai AFTER INSERT ON sweets BEGIN
+            {NEXT_VERSION}
+            UPDATE sweets SET row_version = {CURRENT_VERSION} WHERE id = new.id;
+            DELETE FROM sweet_tombstones WHERE sweet_id = new.id;
+        END
+    """,
+    "sweets_version_au": f"""
+        CREATE TRIGGER IF NOT EXISTS sweets_version_au
+        AFTER UPDATE OF name, description, price, stock ON sweets
+        WHEN old.name IS NOT new.name OR old.description IS NOT new.description
+            OR old.price IS NOT new.price OR old.stock IS NOT new.stock
+        BEGIN
+            {NEXT_VERSION}
+            UPDATE sweets SET row_version = {CURRENT_VERSION} WHERE id = new.id;
+        END
+    """,
+    "sweets_version_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS sweets_version_ad AFTER DELETE ON sweets BEGIN
+            {NEXT_VERSION}
+            INSERT OR REPLACE INTO sweet_tombstones (sweet_id, row_version)
+            VALUES (old.id, {CURRENT_VERSION});
+        END
+    """,
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "row_version" not in {column["name"] for column in inspector.get_columns("sweets")}:
+        # Plain ADD COLUMN: a batch copy of the table would drop its triggers
+        op.add_column(
+            "sweets",
+            sa.Column("row_version", sa.Integer(), server_default="0", nullable=False)
+        )
+    op.create_index("ix_sweets_row_version", "sweets", ["row_version"], if_not_exists=True)
+
+    tables = set(inspector.get_table_names())
+    if "sweet_tombstones" not in tables:
+        op.create_table(
+            "sweet_tombstones",
+            sa.Column("sweet_id", sa.Integer(), primary_key=True),
+            sa.Column("row_version", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_sweet_tombstones_row_version", "sweet_tombstones", ["row_version"])
+    if "catalog_version" not in tables:
+        op.create_table(
+            "catalog_version",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("version", sa.Integer(), nullable=False),
+        )
+
+    for statement in TRIGGERS.values():
+        op.execute(statement)
+    # Number existing rows by ID and continue the counter from there
+    op.execute("UPDATE sweets SET row_version = id WHERE row_version = 0")
+    op.execute(
+        "INSERT OR IGNORE INTO catalog_version (id, version) "
+        "SELECT 1, COALESCE(MAX(row_version), 0) FROM sweets"
+    )
+
+
+def downgrade() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_table("catalog_version")
+    op.drop_index("ix_sweet_tombstones_row_version", "sweet_tombstones")
+    op.drop_table("sweet_tombstones")
+    op.drop_index("ix_sweets_row_version", "sweets")
+    # Native DROP COLUMN (SQLite 3.35+) keeps the other triggers on sweets
+    op.execute("ALTER TABLE sweets DROP COLUMN row_version")
@@ -0,0 +1,28 @@
+"""Add users.token_version for revoking tokens on role changes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "token_version" not in {column["name"] for column in inspector.get_columns("users")}:
+        # Existing users start at version 0, which tokens without the claim count as
+        op.add_column(
+            "users",
+            sa.Column("token_version", sa.Integer(), server_default="0", nullable=False)
+        )
+
+
+def downgrade() -> None:
+    # Native DROP COLUMN (SQLite >= 3.35), like 0002
+    op.execute("ALTER TABLE users DROP COLUMN token_version")
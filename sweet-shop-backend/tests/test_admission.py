@@ -0,0 +1,182 @@
+"""
+Tests for admission control and load shedding.
+"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+from app.admission import (
+    AUTH,
+    PURCHASES,
+    READS,
+    WRITES,
+    AdmissionControl,
+    AdmissionMiddleware,
+    AdmissionQueue,
+    route_class,
+)
+from app.config import Settings
+from app.main import app as shop_app
+
+
+def test_route_classes():
+    """Test which requests are limited, and in which class."""
+    assert route_class("GET", "/inventory") == READS
+    assert route_class("GET", "/sweets/search") == READS
+    assert route_class("POST", "/inventory/1/purchase") == PURCHASES
+    assert route_class("POST", "/inventory/checkout") == PURCHASES
+    assert route_class("POST", "/inventory/1/restock") == WRITES
+    assert route_class("POST", "/sweets/import") == WRITES
+    assert route_class("PUT", "/sweets/1") == WRITES
+    assert route_class("POST", "/auth/login") == AUTH
+    assert route_class("GET", "/health") is None
+    assert route_class("GET", "/inventory/events") is None
+    assert route_class("GET", "/admin/pool") is None
+    assert route_class("OPTIONS", "/inventory/1/purchase") is None
+
+
+def test_slot_is_handed_to_the_oldest_waiter():
+    """Test FIFO handover and the in-flight count."""
+    async def scenario():
+        queue = AdmissionQueue("test", limit=1, target=0.01, interval=1.0, max_queue=10)
+        assert await queue.acquire()
+        waiter = asyncio.create_task(queue.acquire())
+        await asyncio.sleep(0.01)
+        assert queue.waiting == 1
+
+        queue.release()
+        assert await waiter
+        assert (queue.in_flight, queue.waiting) == (1, 0)
+        queue.release()
+        return queue.in_flight
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_standing_queue_sheds_after_target():
+    """Test interval-long waits while the queue drains, target-long once it stands."""
+    async def scenario():
+        queue = AdmissionQueue("test", limit=1, target=0.005, interval=0.05, max_queue=1)
+        assert await queue.acquire()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert not await queue.acquire()  # waited the whole interval
+        first_wait = loop.time() - started
+
+        await asyncio.sleep(0.06)  # the queue has not been empty for an interval
+        started = loop.time()
+        assert not await queue.acquire()
+        second_wait = loop.time() - started
+
+        blocker = asyncio.create_task(queue.acquire())
+        await asyncio.sleep(0)
+        full = await queue.acquire()  # max_queue reached: refused at once
+        await blocker
+        return first_wait, second_wait, full, queue.rejected
+
+    first_wait, second_wait, full, shed = asyncio.run(scenario())
+
+    assert first_wait >= 0.045
+    assert second_wait < 0.03
+    assert not full
+    assert shed == 4
+
+
+def test_overloaded_reads_get_503_while_health_and_writes_pass():
+    """Test load shedding through the middleware on a small app."""
+    app = FastAPI()
+
+    @app.get("/sweets/search")
+    async def slow_read():
+        await asyncio.sleep(0.05)
+        return []
+
+    @app.post("/inventory/1/purchase")
+    async def purchase():
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    config = Settings(
+        admission_read_limit=1, admission_read_target_ms=1, admission_interval_ms=20,
+        admission_purchase_limit=2
+    )
+    shedding = AdmissionMiddleware(app, AdmissionControl(config))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=shedding)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            reads = [client.get("/sweets/search") for _ in range(8)]
+            others = [client.get("/health"), client.post("/inventory/1/purchase")]
+            return await asyncio.gather(*reads, *others)
+
+    *reads, health_check, purchased = asyncio.run(scenario())
+
+    statuses = [response.status_code for response in reads]
+    assert statuses.count(200) >= 1
+    assert statuses.count(503) >= 1
+    shed = next(response for response in reads if response.status_code == 503)
+    assert shed.headers["Retry-After"] == "1"
+    assert health_check.status_code == 200
+    assert purchased.status_code == 200
+
+
+def test_browsing_is_shed_before_purchases():
+    """Test that under equal sustained load with equal limits only browsing gets 503."""
+    app = FastAPI()
+
+    @app.get("/inventory")
+    async def browse():
+        await asyncio.sleep(0.02)
+        return []
+
+    @app.post("/inventory/{sweet_id}/purchase")
+    async def purchase(sweet_id: int):
+        await asyncio.sleep(0.02)
+        return {"ok": True}
+
+    config = Settings(
+        admission_read_limit=2, admission_purchase_limit=2, admission_interval_ms=50
+    )
+    shedding = AdmissionMiddleware(app, AdmissionControl(config))
+    statuses = {"GET": [], "POST": []}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=shedding)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            deadline = asyncio.get_running_loop().time() + 0.3
+
+            async def keep_sending(method: str, url: str):
+                while asyncio.get_running_loop().time() < deadline:
+                    response = await client.request(method, url)
+                    statuses[method].append(response.status_code)
+
+            await asyncio.gather(
+                *(keep_sending("GET", "/inventory") for _ in range(4)),
+                *(keep_sending("POST", "/inventory/1/purchase") for _ in range(4)),
+            )
+
+    asyncio.run(scenario())
+
+    assert 503 in statuses["GET"]
+    assert set(statuses["POST"]) == {200}
+
+
+def test_cors_wraps_admission_and_preflights_bypass_it(client: TestClient):
+    """Test that shed responses get CORS headers and preflights are not queued."""
+    stack = [middleware.cls for middleware in shop_app.user_middleware]
+    assert stack[0] is CORSMiddleware
+    assert stack.index(AdmissionMiddleware) > 0
+
+    preflight = client.options("/inventory", headers={
+        "Origin": "http://shop.example", "Access-Control-Request-Method": "GET"
+    })
+    assert preflight.status_code == 200
+    assert preflight.headers["Access-Control-Allow-Origin"] == "http://shop.example"
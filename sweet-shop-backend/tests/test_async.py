@@ -0,0 +1,100 @@
+"""
+Tests for the async (aiosqlite) data path.
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.auth import hash_password
+from app.cache import catalog_cache
+from app.database import Base, get_async_db, get_db
+from app.models import Sweet, User, UserRole
+from app.routers import auth, inventory, sweets
+
+
+@pytest.fixture
+def async_app(tmp_path):
+    """App serving the async routers from a file database."""
+    path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=sync_engine)
+    SyncSession = sessionmaker(bind=sync_engine)
+    # NullPool: TestClient may run requests on different event loops
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+    
+    async def override_get_async_db():
+        async with AsyncSession() as session:
+            yield session
+    
+    def override_get_db():
+        with SyncSession() as session:
+            yield session
+    
+    app = FastAPI()
+    app.include_router(auth.async_router)
+    app.include_router(sweets.async_router)
+    app.include_router(inventory.async_router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_db] = override_get_db
+    catalog_cache.invalidate()
+    
+    with SyncSession() as session:
+        session.add_all([
+            User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN),
+            User(username="user", hashed_password=hash_password("user123"), role=UserRole.USER),
+            Sweet(name="Chocolate Cake", description="Rich cake", price=25.0, stock=3),
+        ])
+        session.commit()
+    
+    with TestClient(app) as client:
+        yield client
+    sync_engine.dispose()
+
+
+def _login(client: TestClient, username: str, password: str) -> dict:
+    token = client.post(
+        "/auth/login", json={"username": username, "password": password}
+    ).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_async_catalog_and_purchase(async_app: TestClient):
+    """Test reads and purchases through the async routers."""
+    headers = _login(async_app, "user", "user123")
+    
+    assert async_app.get("/auth/me", headers=headers).json()["username"] == "user"
+    assert [s["name"] for s in async_app.get("/sweets/search?q=choc").json()] == ["Chocolate Cake"]
+    
+    response = async_app.post("/inventory/1/purchase", json={"quantity": 2}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["new_stock"] == 1
+    
+    response = async_app.post("/inventory/1/purchase", json={"quantity": 2}, headers=headers)
+    assert response.status_code == 400
+    
+    assert async_app.get("/inventory").json()[0]["stock"] == 1
+    assert async_app.get("/inventory/stats").json()["total_stock"] == 1
+
+
+def test_async_admin_writes(async_app: TestClient):
+    """Test admin-only writes and permission checks through the async routers."""
+    admin = _login(async_app, "admin", "admin123")
+    user = _login(async_app, "user", "user123")
+    sweet = {"name": "Macaron", "description": "French cookie", "price": 2.5, "stock": 8}
+    
+    assert async_app.post("/sweets", json=sweet, headers=user).status_code == 403
+    
+    created = async_app.post("/sweets", json=sweet, headers=admin)
+    assert created.status_code == 201
+    sweet_id = created.json()["id"]
+    
+    response = async_app.post(f"/inventory/{sweet_id}/restock", json={"quantity": 2}, headers=admin)
+    assert response.json()["new_stock"] == 10
+    
+    assert async_app.delete(f"/sweets/{sweet_id}", headers=admin).status_code == 204
+    assert async_app.get(f"/sweets/{sweet_id}").status_code == 404
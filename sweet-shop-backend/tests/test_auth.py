@@ -2,12 +2,16 @@
 Test suite for authentication endpoints.
 These tests are initially failing and will be fixed in Step 3b.
 """
+import hashlib
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
-from app.models import User, UserRole
-from app.auth import hash_password
+from app import auth
+from app.models import User, Sweet, UserRole
+from app.auth import hash_password, create_access_token, decode_access_token
+from app.passwords import needs_rehash, password_hasher, verify_password
 
 
 def test_register_user_success(client: TestClient, db: Session):
@@ -104,6 +108,18 @@ def test_login_user_not_found(client: TestClient):
     assert "Invalid credentials" in response.json()["detail"]
 
 
+def test_unknown_user_hash_is_made_on_first_use(client: TestClient, monkeypatch):
+    """Test that the decoy hash for unknown usernames is not built at import."""
+    monkeypatch.setattr(auth, "_unknown_user_hash", None)
+    
+    for _ in range(2):
+        response = client.post("/auth/login", json={"username": "ghost", "password": "password123"})
+        assert response.status_code == 401
+    
+    assert auth._unknown_user_hash is not None
+    assert not needs_rehash(auth._unknown_user_hash)
+
+
 def test_get_current_user_with_valid_token(client: TestClient, db: Session):
     """Test getting current user with valid token."""
     # Create user
@@ -146,3 +162,127 @@ def test_get_current_user_with_invalid_token(client: TestClient):
         headers={"Authorization": "Bearer invalid_token"}
     )
     assert response.status_code == 401
+
+
+def test_login_token_carries_identity_claims(client: TestClient, db: Session):
+    """Test that login tokens include user id, role and token version."""
+    user = User(
+        username="testuser",
+        hashed_password=hash_password("password123"),
+        role=UserRole.USER
+    )
+    db.add(user)
+    db.commit()
+    
+    response = client.post(
+        "/auth/login",
+        json={"username": "testuser", "password": "password123"}
+    )
+    token_data = decode_access_token(response.json()["access_token"])
+    
+    assert token_data.user_id == user.id
+    assert token_data.role == UserRole.USER
+    assert token_data.token_version == 0
+
+
+def test_principal_from_claims_skips_user_lookup(client: TestClient, db: Session):
+    """Test that purchases authorize from token claims without loading the user."""
+    sweet = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=5)
+    db.add(sweet)
+    db.commit()
+    
+    # No such user row exists; the claims alone identify the caller
+    token = create_access_token({"sub": "ghost", "uid": 42, "role": "user", "ver": 0})
+    response = client.post(
+        f"/inventory/{sweet.id}/purchase",
+        json={"quantity": 1},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    
+    assert response.status_code == 200
+
+
+def test_role_change_invalidates_old_tokens(client: TestClient, db: Session):
+    """Test that a role change rejects earlier tokens on DB-checked routes."""
+    user = User(
+        username="testuser",
+        hashed_password=hash_password("password123"),
+        role=UserRole.USER
+    )
+    db.add(user)
+    db.commit()
+    
+    old_token = client.post(
+        "/auth/login",
+        json={"username": "testuser", "password": "password123"}
+    ).json()["access_token"]
+    
+    user.role = UserRole.ADMIN
+    db.commit()
+    
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {old_token}"})
+    assert response.status_code == 401
+    
+    new_token = client.post(
+        "/auth/login",
+        json={"username": "testuser", "password": "password123"}
+    ).json()["access_token"]
+    response = client.get("/auth/me", headers={"Authorization": f"Bearer {new_token}"})
+    assert response.status_code == 200
+    assert response.json()["role"] == "admin"
+
+
+def test_login_rehashes_legacy_sha256_password(client: TestClient, db: Session):
+    """Test that a legacy SHA256 hash is replaced with bcrypt on login."""
+    user = User(
+        username="legacy",
+        hashed_password=hashlib.sha256(b"password123").hexdigest(),
+        role=UserRole.USER
+    )
+    db.add(user)
+    db.commit()
+    
+    response = client.post(
+        "/auth/login",
+        json={"username": "legacy", "password": "password123"}
+    )
+    assert response.status_code == 200
+    
+    db.refresh(user)
+    assert user.hashed_password.startswith("$2b$04$")
+    assert verify_password("password123", user.hashed_password)
+    
+    response = client.post(
+        "/auth/login",
+        json={"username": "legacy", "password": "password123"}
+    )
+    assert response.status_code == 200
+
+
+def test_needs_rehash_on_cost_change():
+    """Test that hashes at another bcrypt cost are flagged for rehashing."""
+    hashed = hash_password("password123", rounds=5)
+    assert verify_password("password123", hashed)
+    assert needs_rehash(hashed, rounds=4)
+    assert not needs_rehash(hashed, rounds=5)
+    assert not verify_password("password123", "not-a-hash")
+
+
+def test_login_rejected_when_hashing_pool_is_full(client: TestClient, db: Session, monkeypatch):
+    """Test that logins beyond the pending limit get 503 instead of queueing."""
+    user = User(
+        username="testuser",
+        hashed_password=hash_password("password123"),
+        role=UserRole.USER
+    )
+    db.add(user)
+    db.commit()
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    
+    response = client.post(
+        "/auth/login",
+        json={"username": "testuser", "password": "password123"}
+    )
+    
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
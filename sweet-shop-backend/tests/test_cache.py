@@ -0,0 +1,69 @@
+"""
+Tests for the catalog response cache.
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.auth import create_access_token
+from app.cache import CatalogCache, catalog_cache
+from app.models import Sweet
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the cache stays within its entry limit."""
+    cache = CatalogCache(max_entries=2)
+    cache.put("a", (b"a", {}), cache.version)
+    cache.put("b", (b"b", {}), cache.version)
+    cache.get("a")
+    cache.put("c", (b"c", {}), cache.version)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"a", {})
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_discards_entries_built_before_a_write():
+    """Test that a body computed across an invalidation is not stored."""
+    cache = CatalogCache()
+    version = cache.version
+    cache.invalidate()
+    cache.put("key", (b"stale", {}), version)
+    
+    assert cache.get("key") is None
+
+
+def test_catalog_reads_are_served_from_cache(client: TestClient, db: Session):
+    """Test cache hits on repeated reads and invalidation on purchase."""
+    sweet = Sweet(name="Candy", description="Sweet candy", price=1.99, stock=10)
+    db.add(sweet)
+    db.commit()
+    sweet_id = sweet.id
+    
+    client.get(f"/sweets/{sweet_id}")
+    response = client.get(f"/sweets/{sweet_id}")
+    assert response.json()["stock"] == 10
+    assert catalog_cache.stats()["hits"] >= 1
+    
+    token = create_access_token({"sub": "user", "uid": 1, "role": "user"})
+    client.post(
+        f"/inventory/{sweet_id}/purchase",
+        json={"quantity": 4},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    
+    assert client.get(f"/sweets/{sweet_id}").json()["stock"] == 6
+    assert client.get("/inventory").json()[0]["stock"] == 6
+
+
+def test_cache_can_be_disabled(client: TestClient, db: Session, monkeypatch):
+    """Test that a disabled cache always reads through to the database."""
+    monkeypatch.setattr(catalog_cache, "enabled", False)
+    sweet = Sweet(name="Candy", description="Sweet candy", price=1.99, stock=10)
+    db.add(sweet)
+    db.commit()
+    
+    assert client.get("/inventory").json()[0]["stock"] == 10
+    sweet.stock = 3
+    db.commit()
+    assert client.get("/inventory").json()[0]["stock"] == 3
+    assert catalog_cache.stats()["entries"] == 0
@@ -0,0 +1,122 @@
+"""
+Tests for the price/stock filters and sort orders of the catalog lists.
+"""
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import Sweet
+
+
+@pytest.fixture
+def catalog(db: Session):
+    """Sweets with mixed prices and stock, some sold out."""
+    sweets = [
+        Sweet(name=f"Sweet {i:02d}", description="Boiled sweet", price=(i * 7 % 10) + 0.5, stock=i % 4)
+        for i in range(40)
+    ]
+    db.add_all(sweets)
+    db.commit()
+    return sweets
+
+
+@contextmanager
+def _statements(db: Session):
+    """Collect the SELECTs on sweets run while the block executes."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM sweets" in statement:
+            seen.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _plan(db: Session, statement: str, parameters) -> str:
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_in_stock_under_price_cheapest_first(client: TestClient, catalog):
+    """Test filters and sort, following cursors across pages."""
+    expected = sorted(
+        (s for s in catalog if s.stock > 0 and s.price <= 5),
+        key=lambda s: (s.price, s.id)
+    )
+    params = {"in_stock": "true", "max_price": 5, "sort": "price", "limit": 7}
+
+    seen = []
+    while True:
+        response = client.get("/inventory", params=params)
+        assert response.status_code == 200
+        seen.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+
+    assert [item["id"] for item in seen] == [s.id for s in expected]
+
+
+def test_sold_out_by_name_with_projection(client: TestClient, catalog):
+    """Test in_stock=false, and a sort field left out of the projection."""
+    expected = sorted((s for s in catalog if s.stock == 0), key=lambda s: s.name)
+
+    first = client.get("/inventory", params={"in_stock": "false", "sort": "name", "fields": "stock", "limit": 5})
+    rest = client.get(
+        "/inventory",
+        params={"in_stock": "false", "sort": "name", "fields": "stock", "cursor": first.headers["X-Next-Cursor"]}
+    )
+
+    items = first.json() + rest.json()
+    assert [item["id"] for item in items] == [s.id for s in expected]
+    assert set(items[0]) == {"id", "stock"}
+
+
+def test_search_filters_and_sort(client: TestClient, catalog):
+    """Test the search endpoint with a price range, sorted by stock."""
+    response = client.get(
+        "/sweets/search",
+        params={"q": "boiled", "min_price": 2, "max_price": 6, "sort": "stock", "limit": 1000}
+    )
+
+    expected = sorted((s for s in catalog if 2 <= s.price <= 6), key=lambda s: (s.stock, s.id))
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [s.id for s in expected]
+
+
+def test_invalid_parameters(client: TestClient, catalog):
+    """Test unknown sort fields, negative prices and cursors of another sort."""
+    assert client.get("/inventory", params={"sort": "description"}).status_code == 422
+    assert client.get("/sweets/search", params={"min_price": -1}).status_code == 422
+
+    by_id = client.get("/inventory", params={"limit": 2}).headers["X-Next-Cursor"]
+    response = client.get("/inventory", params={"sort": "price", "cursor": by_id})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("params, index", [
+    ({"in_stock": "true", "max_price": 5, "sort": "price"}, "ix_sweets_in_stock_price_id"),
+    ({"min_price": 1, "max_price": 5, "sort": "price"}, "ix_sweets_price_id"),
+    ({"in_stock": "true", "sort": "stock"}, "ix_sweets_stock_id"),
+    ({"sort": "name"}, "ix_sweets_name"),
+])
+def test_sorted_pages_are_read_from_an_index(client: TestClient, db: Session, catalog, params, index):
+    """Test EXPLAIN QUERY PLAN: the matching index, no sort step, also after a cursor."""
+    with _statements(db) as seen:
+        response = client.get("/inventory", params={**params, "limit": 3})
+        client.get("/inventory", params={**params, "limit": 3, "cursor": response.headers["X-Next-Cursor"]})
+
+    assert len(seen) == 2
+    for statement, parameters in seen:
+        plan = _plan(db, statement, parameters)
+        assert f"USING INDEX {index}" in plan
+        assert "TEMP B-TREE" not in plan
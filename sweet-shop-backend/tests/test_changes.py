@@ -0,0 +1,116 @@
+"""
+Tests for row versions, tombstones and GET /inventory/changes.
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.auth import create_access_token, hash_password
+from app.changes import changes_since
+from app.models import Sweet, SweetTombstone, User, UserRole
+
+
+def _admin_headers(db: Session) -> dict:
+    db.add(User(username="admin", hashed_password=hash_password("x"), role=UserRole.ADMIN))
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+
+def _sweets(db: Session, count: int) -> list:
+    sweets = [Sweet(name=f"Sweet {i}", description="Fudge", price=1.0 + i, stock=10) for i in range(count)]
+    db.add_all(sweets)
+    db.commit()
+    return sweets
+
+
+def test_every_write_gets_a_new_version(client: TestClient, db: Session):
+    """Test create, purchase, update and delete each show up after the last version."""
+    headers = _admin_headers(db)
+    toffee, fudge = _sweets(db, 2)
+
+    first = client.get("/inventory/changes").json()
+    assert [change["id"] for change in first["changes"]] == [toffee.id, fudge.id]
+    assert first["deleted"] == [] and not first["more"]
+
+    client.post(f"/inventory/{fudge.id}/purchase", json={"quantity": 4}, headers=headers)
+    client.put(
+        f"/sweets/{toffee.id}",
+        json={"name": "Sweet 0", "description": "Fudge", "price": 3.5, "stock": 10},
+        headers=headers
+    )
+    after_writes = client.get("/inventory/changes", params={"since": first["version"]}).json()
+    assert [(c["id"], c["stock"], c["price"]) for c in after_writes["changes"]] == [
+        (fudge.id, 6, 2.0), (toffee.id, 10, 3.5)
+    ]
+    assert after_writes["version"] == first["version"] + 2
+
+    client.delete(f"/sweets/{fudge.id}", headers=headers)
+    after_delete = client.get("/inventory/changes", params={"since": after_writes["version"]}).json()
+    assert after_delete["changes"] == []
+    assert after_delete["deleted"] == [{"sweet_id": fudge.id, "row_version": after_writes["version"] + 1}]
+
+    assert client.get("/inventory/changes", params={"since": after_delete["version"]}).json() == {
+        "changes": [], "deleted": [], "version": after_delete["version"], "more": False
+    }
+
+
+def test_unchanged_update_keeps_the_version(db: Session):
+    """Test that writing the same values does not report a change."""
+    (sweet,) = _sweets(db, 1)
+    version = changes_since(db, 0, 10)["version"]
+
+    sweet.price = 1.0
+    db.commit()
+    db.execute(Sweet.__table__.update().where(Sweet.id == sweet.id).values(stock=10))
+    db.commit()
+
+    assert changes_since(db, version, 10)["changes"] == []
+
+
+def test_changes_are_paged_in_version_order(client: TestClient, db: Session):
+    """Test limit and more, with changes and deletions interleaved."""
+    sweets = _sweets(db, 5)
+    db.delete(sweets[1])
+    db.commit()
+    db.delete(sweets[3])
+    db.commit()
+
+    seen, params = [], {"since": 0, "limit": 2}
+    while True:
+        body = client.get("/inventory/changes", params=params).json()
+        seen.extend(("changed", change["id"]) for change in body["changes"])
+        seen.extend(("deleted", tombstone["sweet_id"]) for tombstone in body["deleted"])
+        params["since"] = body["version"]
+        if not body["more"]:
+            break
+
+    assert sorted(seen) == sorted(
+        [("changed", sweets[i].id) for i in (0, 2, 4)] + [("deleted", sweets[i].id) for i in (1, 3)]
+    )
+    assert client.get("/inventory/changes", params={"limit": 0}).status_code == 422
+
+
+def test_recreated_sweet_clears_its_tombstone(db: Session):
+    """Test that re-inserting a deleted ID reports it as changed, not deleted."""
+    (sweet,) = _sweets(db, 1)
+    sweet_id = sweet.id
+    db.delete(sweet)
+    db.commit()
+    db.add(Sweet(id=sweet_id, name="Back", description="Again", price=1.0, stock=1))
+    db.commit()
+
+    assert db.scalar(select(SweetTombstone).where(SweetTombstone.sweet_id == sweet_id)) is None
+    assert [change["id"] for change in changes_since(db, 0, 10)["changes"]] == [sweet_id]
+
+
+def test_changes_are_read_from_the_version_indexes(db: Session):
+    """Test EXPLAIN QUERY PLAN for both range scans."""
+    connection = db.connection()
+    indexes = {"sweets": "ix_sweets_row_version", "sweet_tombstones": "ix_sweet_tombstones_row_version"}
+    for table, index in indexes.items():
+        plan = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN SELECT * FROM {table} WHERE row_version > 5 ORDER BY row_version LIMIT 10"
+        ).all()
+        detail = "\n".join(row[-1] for row in plan)
+        assert index in detail and "SCAN" not in detail
+        assert "TEMP B-TREE" not in detail
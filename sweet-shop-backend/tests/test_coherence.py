@@ -0,0 +1,133 @@
+"""
+Tests for cross-process cache invalidation, the change relay and the
+multi-worker launcher checks.
+"""
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.auth import create_access_token, hash_password
+from app.cache import CatalogCache
+from app.coherence import CatalogVersionWatcher, relay_changes
+from app.config import Settings, settings
+from app.database import Base
+from app.events import stock_events
+from app.models import Sweet, User, UserRole
+from app.serve import check_config, worker_count
+
+
+@pytest.fixture
+def shared_file(tmp_path):
+    """A versioned file database, and an engine standing in for another worker."""
+    path = str(tmp_path / "shared.db")
+    other_worker = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=other_worker)
+    watcher = CatalogVersionWatcher(path)
+    yield watcher, other_worker
+    watcher.close()
+    other_worker.dispose()
+
+
+def _insert_sweet(engine, name: str) -> None:
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO sweets (name, description, price, stock) VALUES (:name, 'x', 1, 5)"),
+            {"name": name}
+        )
+
+
+def test_watcher_follows_commits_of_other_connections(shared_file):
+    """Test that the version moves with catalog writes, and only with them."""
+    watcher, other_worker = shared_file
+    start = watcher.version()
+
+    _insert_sweet(other_worker, "Toffee")
+    assert watcher.version() == start + 1
+    assert watcher.version() == start + 1
+
+    with other_worker.begin() as connection:
+        connection.execute(text("UPDATE sweets SET stock = stock"))
+    assert watcher.version() == start + 1
+
+
+def test_cache_drops_entries_written_by_another_process(shared_file):
+    """Test that a cached body is rebuilt after another worker's write."""
+    watcher, other_worker = shared_file
+    cache = CatalogCache(shared_version=watcher.version)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"[]", {}
+
+    cache.respond("inventory", build)
+    cache.respond("inventory", build)
+    assert len(builds) == 1
+
+    _insert_sweet(other_worker, "Fudge")
+    cache.respond("inventory", build)
+    assert len(builds) == 2
+
+
+class _Versions:
+    """Watcher stand-in returning a fixed version."""
+
+    def __init__(self, version):
+        self.current = version
+
+    def version(self):
+        return self.current
+
+
+def test_relay_publishes_other_workers_changes(db: Session):
+    """Test that changes after the relayed version reach subscribers."""
+    sweet = Sweet(name="Toffee", description="Butter toffee", price=1.5, stock=10)
+    gone = Sweet(name="Fudge", description="Vanilla fudge", price=2.0, stock=3)
+    db.add_all([sweet, gone])
+    db.commit()
+    since = db.execute(text("SELECT version FROM catalog_version")).scalar()
+    db.execute(text("UPDATE sweets SET stock = 7 WHERE id = :id"), {"id": sweet.id})
+    db.delete(gone)
+    db.commit()
+    versions = _Versions(since + 2)
+
+    async def scenario():
+        subscription = stock_events.subscribe()
+        try:
+            relayed = await asyncio.to_thread(relay_changes, versions, since)
+            return relayed, await subscription.next_batch(1)
+        finally:
+            subscription.close()
+
+    relayed, (changes, resync) = asyncio.run(scenario())
+
+    assert relayed == since + 2
+    assert not resync
+    assert changes == [
+        {"sweet_id": sweet.id, "stock": 7, "price": 1.5},
+        {"sweet_id": gone.id, "deleted": True},
+    ]
+    assert relay_changes(versions, relayed) == relayed
+
+
+def test_flash_sale_needs_a_single_worker(client: TestClient, db: Session, monkeypatch):
+    """Test the launcher check and the 409 from the hot-item endpoint."""
+    assert worker_count(0) == (os.cpu_count() or 1)
+    with pytest.raises(SystemExit):
+        check_config(2, Settings(flash_sale_sweet_ids=[1]))
+    check_config(1, Settings(flash_sale_sweet_ids=[1]))
+
+    sweet = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=10)
+    db.add_all([sweet, User(username="admin", hashed_password=hash_password("x"), role=UserRole.ADMIN)])
+    db.commit()
+    monkeypatch.setattr(settings, "server_workers", 2)
+
+    response = client.post(
+        f"/inventory/{sweet.id}/hot",
+        headers={"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+    )
+    assert response.status_code == 409
@@ -0,0 +1,34 @@
+"""
+Tests for database engine configuration.
+"""
+from sqlalchemy import create_engine
+
+from app.config import Settings
+from app.database import checkpoint_wal, configure_sqlite
+
+
+def test_performance_profile_applies_pragmas(tmp_path):
+    """Test that the performance profile configures new connections."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    configure_sqlite(engine, Settings(sqlite_busy_timeout_ms=1234))
+    
+    with engine.connect() as connection:
+        pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 1234
+        assert pragma("temp_store") == 2  # MEMORY
+    
+    busy, _, _ = checkpoint_wal(engine)
+    assert busy == 0
+    engine.dispose()
+
+
+def test_default_profile_leaves_sqlite_defaults(tmp_path):
+    """Test that the default profile does not change the journal mode."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'default.db'}")
+    configure_sqlite(engine, Settings(sqlite_profile="default"))
+    
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+    engine.dispose()
@@ -0,0 +1,117 @@
+"""
+Tests for the catalog change stream behind GET /inventory/events.
+"""
+import asyncio
+import json
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.auth import create_access_token, hash_password
+from app.events import StockEvents, stock_events
+from app.models import Sweet, User, UserRole
+from app.routers.inventory import _event_stream
+
+
+def _parse(chunk: str) -> list:
+    """(event, data) pairs of an SSE chunk."""
+    events = []
+    for block in chunk.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_changes_are_coalesced_per_sweet():
+    """Test that a slow subscriber gets the latest values once per sweet."""
+    async def scenario():
+        events = StockEvents()
+        subscription = events.subscribe()
+        events.publish(1, stock=9, price=2.5)
+        events.publish(2, stock=4)
+        events.publish(1, stock=8)
+        events.publish(2, stock=3)
+        events.publish_delete(2)
+        return await subscription.next_batch(1)
+
+    changes, resync = asyncio.run(scenario())
+
+    assert not resync
+    assert changes == [
+        {"sweet_id": 1, "stock": 8, "price": 2.5},
+        {"sweet_id": 2, "deleted": True},
+    ]
+
+
+def test_lagging_subscriber_is_told_to_resync():
+    """Test the backlog bound: a lagging client resyncs, a keeping-up one does not."""
+    async def scenario():
+        events = StockEvents(max_pending=3)
+        slow, other = events.subscribe(), events.subscribe()
+        other_batches = []
+        for sweet_id in range(5):
+            events.publish(sweet_id, stock=1, price=1.0)
+            if sweet_id == 2:
+                other_batches.append(await other.next_batch(1))
+        events.publish(7, stock=2, price=1.0)
+        other_batches.append(await other.next_batch(1))
+        return await slow.next_batch(1), slow.dropped, other_batches, other.dropped
+
+    (changes, resync), dropped, other_batches, other_dropped = asyncio.run(scenario())
+
+    assert resync
+    assert dropped == 4
+    assert changes == [
+        {"sweet_id": 4, "stock": 1, "price": 1.0},
+        {"sweet_id": 7, "stock": 2, "price": 1.0},
+    ]
+    assert other_dropped == 0
+    assert [[change["sweet_id"] for change in batch] for batch, _ in other_batches] == [[0, 1, 2], [3, 4, 7]]
+    assert not any(other_resync for _, other_resync in other_batches)
+
+
+def test_publish_from_worker_thread_wakes_subscriber():
+    """Test that a publish from another thread ends the subscriber's wait."""
+    async def scenario():
+        events = StockEvents()
+        subscription = events.subscribe()
+        threading.Timer(0.05, events.publish, args=(3,), kwargs={"stock": 1, "price": 1.0}).start()
+        return await subscription.next_batch(5)
+
+    changes, _ = asyncio.run(scenario())
+
+    assert changes == [{"sweet_id": 3, "stock": 1, "price": 1.0}]
+
+
+def test_writes_are_streamed(client: TestClient, db: Session):
+    """Test purchases, edits and deletes reach the stream with stock and price."""
+    sweet = Sweet(name="Toffee", description="Butter toffee", price=1.5, stock=10)
+    db.add_all([sweet, User(username="admin", hashed_password=hash_password("x"), role=UserRole.ADMIN)])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+    async def scenario():
+        stream = _event_stream()
+        assert await stream.__anext__() == "retry: 3000\n\n"
+        # The generator subscribes on its first step; write from a worker thread
+        await asyncio.to_thread(
+            client.post, f"/inventory/{sweet.id}/purchase", json={"quantity": 3}, headers=headers
+        )
+        purchase = await stream.__anext__()
+        await asyncio.to_thread(
+            client.put, f"/sweets/{sweet.id}",
+            json={"name": "Toffee", "description": "Butter toffee", "price": 2.0, "stock": 7},
+            headers=headers
+        )
+        await asyncio.to_thread(client.delete, f"/sweets/{sweet.id}", headers=headers)
+        later = await stream.__anext__()
+        await stream.aclose()
+        return purchase, later
+
+    purchase, later = asyncio.run(scenario())
+
+    assert _parse(purchase) == [("stock", {"sweet_id": sweet.id, "stock": 7, "price": 1.5})]
+    assert _parse(later) == [("delete", {"sweet_id": sweet.id})]
+    assert stock_events.subscribers == 0
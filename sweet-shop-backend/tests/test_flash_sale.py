@@ -0,0 +1,278 @@
+"""
+Tests for flash-sale mode: in-memory counters, journal and write-back.
+"""
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.auth import create_access_token, hash_password
+from app import catalog_import
+from app.cache import catalog_cache
+from app.database import Base, SessionLocal
+from app.flash_sale import FlashSale
+from app.models import Sweet, User, UserRole
+from app.routers import inventory, sweets
+from app.stock import PURCHASE, RESTOCK, get_stock
+
+
+@pytest.fixture
+def file_sessions(tmp_path):
+    """Session factory for a file database with one sweet in stock."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'flash.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(Sweet(name="Lollipop", description="Cherry lollipop", price=0.5, stock=50))
+        session.commit()
+    yield factory
+    engine.dispose()
+
+
+def _db_stock(sessions, sweet_id=1):
+    with sessions() as session:
+        return get_stock(session, sweet_id)
+
+
+def test_hot_purchases_never_oversell_and_flush_back(file_sessions, tmp_path):
+    """Test concurrent purchases against a counter and the periodic write-back."""
+    sale = FlashSale(file_sessions, str(tmp_path / "sale.journal"))
+    assert sale.enable(1) == 50
+    outcomes = []
+    lock = threading.Lock()
+
+    def buyer():
+        for _ in range(10):
+            change = sale.apply(PURCHASE, 1, 1)
+            with lock:
+                outcomes.append(change)
+
+    threads = [threading.Thread(target=buyer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len([change for change in outcomes if change.new_stock is not None]) == 50
+    assert sale.stock(1) == 0
+    assert _db_stock(file_sessions) == 50
+
+    assert sale.flush() == 1
+    assert _db_stock(file_sessions) == 0
+    assert not os.path.exists(sale.journal_path)
+    assert not os.path.exists(sale.flushing_path)
+
+
+def test_purchases_go_on_while_a_flush_writes_back(file_sessions, tmp_path):
+    """Test that the counter lock is not held during the database write-back."""
+    sale = FlashSale(file_sessions, str(tmp_path / "sale.journal"))
+    sale.enable(1)
+    sale.apply(PURCHASE, 1, 5)
+    writing, release = threading.Event(), threading.Event()
+
+    def slow_sessions():
+        writing.set()
+        release.wait(5)
+        return file_sessions()
+
+    sale.session_factory = slow_sessions
+    flusher = threading.Thread(target=sale.flush)
+    flusher.start()
+    assert writing.wait(5)
+    changes = []
+    buyer = threading.Thread(target=lambda: changes.append(sale.apply(PURCHASE, 1, 2)))
+    buyer.start()
+    buyer.join(1)
+    done_during_flush = bool(changes)
+    release.set()
+    flusher.join()
+    buyer.join()
+
+    assert done_during_flush
+    assert changes[0].new_stock == 43
+    assert _db_stock(file_sessions) == 45
+    assert sale.items() == [{"sweet_id": 1, "stock": 43, "unflushed": -2}]
+    sale.session_factory = file_sessions
+    assert sale.flush() == 1
+    assert _db_stock(file_sessions) == 43
+
+
+def test_recover_replays_unflushed_journal_once(file_sessions, tmp_path):
+    """Test that acknowledged but unflushed changes survive a crash."""
+    journal = str(tmp_path / "sale.journal")
+    crashed = FlashSale(file_sessions, journal)
+    crashed.enable(1)
+    crashed.apply(PURCHASE, 1, 5)
+    crashed.flush()
+    crashed.apply(PURCHASE, 1, 7)
+    crashed.apply(RESTOCK, 1, 2)
+    # Process dies here: the last two changes exist only in the journal
+
+    restarted = FlashSale(file_sessions, journal)
+    assert restarted.recover() == 2
+    assert _db_stock(file_sessions) == 40
+    assert restarted.enable(1) == 40
+    assert restarted.recover() == 0
+
+
+def test_recover_skips_entries_already_written_back(file_sessions, tmp_path):
+    """Test a crash between the write-back commit and removing the journal."""
+    journal = str(tmp_path / "sale.journal")
+    crashed = FlashSale(file_sessions, journal)
+    crashed.enable(1)
+    crashed.apply(PURCHASE, 1, 5)
+    with open(journal) as f:
+        entries = f.read()
+    crashed.flush()
+    with open(crashed.flushing_path, "w") as f:
+        f.write(entries + '{"seq": 2, "sweet_id"')  # plus a torn final line
+
+    restarted = FlashSale(file_sessions, journal)
+    assert restarted.recover() == 0
+    assert _db_stock(file_sessions) == 45
+
+
+@pytest.fixture
+def hot_sale(tmp_path, monkeypatch):
+    """Fresh flash-sale state for the routers, journaling under tmp_path."""
+    sale = FlashSale(SessionLocal, str(tmp_path / "sale.journal"))
+    monkeypatch.setattr(inventory, "flash_sale", sale)
+    monkeypatch.setattr(sweets, "flash_sale", sale)
+    monkeypatch.setattr(catalog_import, "flash_sale", sale)
+    return sale
+
+
+def test_hot_item_endpoints(client: TestClient, db: Session, hot_sale: FlashSale):
+    """Test enabling a hot sweet, selling from it and writing it back."""
+    sweet = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=10)
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add_all([sweet, admin])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+    response = client.post(f"/inventory/{sweet.id}/hot", headers=headers)
+    assert response.json() == {"sweet_id": sweet.id, "stock": 10, "unflushed": 0}
+
+    response = client.post(f"/inventory/{sweet.id}/purchase", json={"quantity": 4}, headers=headers)
+    assert response.json()["new_stock"] == 6
+    response = client.post(f"/inventory/{sweet.id}/purchase", json={"quantity": 7}, headers=headers)
+    assert response.status_code == 400
+
+    assert client.get("/inventory").json()[0]["stock"] == 6
+    assert client.get("/inventory?fields=stock").json()[0]["stock"] == 6
+    assert client.get("/inventory/hot").json() == [{"sweet_id": sweet.id, "stock": 6, "unflushed": -4}]
+
+    response = client.post(
+        "/inventory/checkout", json={"items": [{"sweet_id": sweet.id, "quantity": 2}]}, headers=headers
+    )
+    assert response.json()["items"][0]["new_stock"] == 4
+
+    response = client.put(
+        f"/sweets/{sweet.id}",
+        json={"name": "Cookie", "description": "Chocolate chip", "price": 1.99, "stock": 99},
+        headers=headers
+    )
+    assert response.status_code == 409
+
+    response = client.delete(f"/inventory/{sweet.id}/hot", headers=headers)
+    assert response.json() == {"sweet_id": sweet.id, "stock": 4, "unflushed": 0}
+    db.refresh(sweet)
+    assert sweet.stock == 4
+    assert client.get("/inventory/hot").json() == []
+
+
+def test_hot_item_requires_admin(client: TestClient, db: Session, hot_sale: FlashSale):
+    """Test that regular users cannot manage flash sales."""
+    sweet = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=10)
+    user = User(username="user", hashed_password=hash_password("user123"), role=UserRole.USER)
+    db.add_all([sweet, user])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'user'})}"}
+
+    response = client.post(f"/inventory/{sweet.id}/hot", headers=headers)
+    assert response.status_code == 403
+    assert not hot_sale.is_hot(sweet.id)
+
+
+def test_checkout_giving_back_hot_units_invalidates_the_cache(
+    client: TestClient, db: Session, hot_sale: FlashSale
+):
+    """Test that hot units returned after a short cold line drop cached stock."""
+    cookie = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=10)
+    candy = Sweet(name="Candy", description="Sweet candy", price=0.5, stock=1)
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add_all([cookie, candy, admin])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+    client.post(f"/inventory/{cookie.id}/hot", headers=headers)
+    before = catalog_cache.version
+
+    response = client.post(
+        "/inventory/checkout",
+        json={"items": [{"sweet_id": cookie.id, "quantity": 3}, {"sweet_id": candy.id, "quantity": 5}]},
+        headers=headers
+    )
+
+    assert response.status_code == 400
+    assert hot_sale.stock(cookie.id) == 10
+    assert catalog_cache.version > before
+    assert {s["id"]: s["stock"] for s in client.get("/inventory").json()}[cookie.id] == 10
+
+
+def test_checkout_gives_back_hot_units_when_the_commit_fails(
+    client: TestClient, db: Session, hot_sale: FlashSale, monkeypatch
+):
+    """Test that hot units are returned if the cold lines cannot be committed."""
+    cookie = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=10)
+    candy = Sweet(name="Candy", description="Sweet candy", price=0.5, stock=10)
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add_all([cookie, candy, admin])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+    client.post(f"/inventory/{cookie.id}/hot", headers=headers)
+
+    def locked():
+        raise OperationalError("COMMIT", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(db, "commit", locked)
+    with pytest.raises(OperationalError):
+        client.post(
+            "/inventory/checkout",
+            json={"items": [{"sweet_id": cookie.id, "quantity": 3}, {"sweet_id": candy.id, "quantity": 2}]},
+            headers=headers
+        )
+
+    assert hot_sale.stock(cookie.id) == 10
+    assert hot_sale.items()[0]["unflushed"] == 0
+
+
+def test_import_cannot_change_hot_stock(client: TestClient, db: Session, hot_sale: FlashSale):
+    """Test that an import row may keep but not change a hot sweet's stock."""
+    cookie = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=10)
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add_all([cookie, admin])
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+    client.post(f"/inventory/{cookie.id}/hot", headers=headers)
+    client.post(f"/inventory/{cookie.id}/purchase", json={"quantity": 4}, headers=headers)
+    headers["Content-Type"] = "text/csv"
+
+    body = "name,description,price,stock\nCookie,Chocolate chip,2.50,99\n"
+    report = client.post("/sweets/import", content=body, headers=headers).json()
+    assert (report["updated"], report["failed"]) == (0, 1)
+    assert "flash-sale" in report["errors"][0]["errors"][0]
+
+    body = "name,description,price,stock\nCookie,Double chocolate,2.50,6\n"
+    report = client.post("/sweets/import", content=body, headers=headers).json()
+    assert (report["updated"], report["failed"]) == (1, 0)
+
+    db.refresh(cookie)
+    assert (cookie.description, cookie.price, cookie.stock) == ("Double chocolate", 2.5, 10)
+    assert hot_sale.stock(cookie.id) == 6
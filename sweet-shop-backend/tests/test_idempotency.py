@@ -0,0 +1,223 @@
+"""
+Tests for Idempotency-Key handling of purchases and checkouts.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from app.auth import create_user_access_token, hash_password
+from app.idempotency import (
+    PENDING_TIMEOUT,
+    IdempotencyMiddleware,
+    IdempotencyReservationMiddleware,
+    idempotency_store,
+    request_fingerprint,
+)
+from app.models import IdempotencyRecord, Sweet, User
+
+
+@pytest.fixture
+def shopper(db: Session):
+    """A sweet in stock and the headers of a user buying it."""
+    sweet = Sweet(name="Toffee", description="Butter toffee", price=1.5, stock=10)
+    user = User(username="shopper", hashed_password=hash_password("x"))
+    db.add_all([sweet, user])
+    db.commit()
+    return sweet, {"Authorization": f"Bearer {create_user_access_token(user)}"}
+
+
+@pytest.fixture
+def statements(db: Session):
+    """SQL statements run on the test engine while the test runs."""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_retried_purchase_is_applied_once(client: TestClient, db: Session, shopper, statements):
+    """Test that a retry gets the stored response without touching sweets."""
+    sweet, headers = shopper
+    headers = {**headers, "Idempotency-Key": "order-1"}
+    url = f"/inventory/{sweet.id}/purchase"
+
+    first = client.post(url, json={"quantity": 3}, headers=headers)
+    statements.clear()
+    retry = client.post(url, json={"quantity": 3}, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json() == {
+        "sweet_id": sweet.id, "new_stock": 7, "message": "Successfully purchased 3 units"
+    }
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert statements == []
+
+    db.refresh(sweet)
+    assert sweet.stock == 7
+
+
+def test_replay_from_the_database_after_a_restart(client: TestClient, db: Session, shopper, statements):
+    """Test that stored responses outlive the in-memory cache."""
+    sweet, headers = shopper
+    headers = {**headers, "Idempotency-Key": "cart-1"}
+    cart = {"items": [{"sweet_id": sweet.id, "quantity": 2}]}
+
+    first = client.post("/inventory/checkout", json=cart, headers=headers)
+    idempotency_store.clear()
+    statements.clear()
+    retry = client.post("/inventory/checkout", json=cart, headers=headers)
+
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert statements and not any("sweets" in statement for statement in statements)
+    db.refresh(sweet)
+    assert sweet.stock == 8
+
+
+def test_key_reuse_conflicts_and_scoping(client: TestClient, db: Session, shopper):
+    """Test another body (422), an attempt in flight (409), another user and bad keys."""
+    sweet, headers = shopper
+    url = f"/inventory/{sweet.id}/purchase"
+    keyed = {**headers, "Idempotency-Key": "k"}
+    assert client.post(url, json={"quantity": 1}, headers=keyed).status_code == 200
+
+    assert client.post(url, json={"quantity": 2}, headers=keyed).status_code == 422
+    assert client.post(url, json={"quantity": 1}, headers={**headers, "Idempotency-Key": ""}).status_code == 400
+
+    other = User(username="other", hashed_password=hash_password("x"))
+    db.add(other)
+    db.commit()
+    other_headers = {"Authorization": f"Bearer {create_user_access_token(other)}", "Idempotency-Key": "k"}
+    response = client.post(url, json={"quantity": 1}, headers=other_headers)
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+
+    body = b'{"quantity": 1}'
+    in_flight = f"shopper:POST {url}:busy"
+    assert asyncio.run(idempotency_store.begin(in_flight, request_fingerprint(body))) is None
+    busy = client.post(
+        url, content=body,
+        headers={**headers, "Idempotency-Key": "busy", "Content-Type": "application/json"}
+    )
+    assert busy.status_code == 409
+    asyncio.run(idempotency_store.finish(in_flight, 503, b""))
+
+    db.refresh(sweet)
+    assert sweet.stock == 8
+
+
+def test_client_errors_are_replayed_and_anonymous_requests_skipped(client: TestClient, db: Session, shopper):
+    """Test that client errors are stored and replayed, and anonymous requests are not kept."""
+    sweet, headers = shopper
+    url = f"/inventory/{sweet.id}/purchase"
+    keyed = {**headers, "Idempotency-Key": "big"}
+
+    short = client.post(url, json={"quantity": 50}, headers=keyed)
+    assert short.status_code == 400
+    assert client.post(url, json={"quantity": 50}, headers=keyed).headers["Idempotent-Replayed"] == "true"
+
+    db.query(Sweet).filter(Sweet.id == sweet.id).delete()
+    db.commit()
+    missing = client.post("/inventory/checkout", json={"items": [{"sweet_id": sweet.id, "quantity": 1}]},
+                          headers={**headers, "Idempotency-Key": "gone"})
+    assert missing.status_code == 404
+
+    unauthorized = client.post(url, json={"quantity": 1}, headers={"Idempotency-Key": "anon"})
+    assert unauthorized.status_code == 401
+    keys = {record.key.rsplit(":", 1)[1] for record in db.query(IdempotencyRecord)}
+    assert keys == {"big", "gone"}
+
+
+def test_shed_requests_reserve_nothing(db: Session, shopper, statements):
+    """Test that keys are written only for requests that pass admission."""
+    sweet, headers = shopper
+    headers = {**headers, "Idempotency-Key": "crowded"}
+    seen = []
+
+    async def purchase(scope, receive, send):
+        await Response(b"{}", media_type="application/json")(scope, receive, send)
+
+    async def admission(scope, receive, send):
+        # Sheds the first request, admits the retry
+        seen.append(scope["path"])
+        if len(seen) == 1:
+            await Response(status_code=503, headers={"Retry-After": "1"})(scope, receive, send)
+            return
+        await IdempotencyReservationMiddleware(purchase)(scope, receive, send)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=IdempotencyMiddleware(admission))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            url = f"/inventory/{sweet.id}/purchase"
+            shed = await client.post(url, json={"quantity": 1}, headers=headers)
+            writes = list(statements)
+            retry = await client.post(url, json={"quantity": 1}, headers=headers)
+            return shed, writes, retry
+
+    shed, writes, retry = asyncio.run(scenario())
+
+    assert shed.status_code == 503
+    assert writes == []
+    assert retry.status_code == 200
+    assert db.query(IdempotencyRecord).count() == 1
+
+
+def test_keyed_purchases_are_counted_under_their_route(client: TestClient, shopper):
+    """Test that metrics label a keyed purchase with its route template."""
+    sweet, headers = shopper
+    label = 'http_requests_total{method="POST",route="/inventory/{sweet_id}/purchase",status="200"} '
+
+    def count() -> float:
+        line = next((line for line in client.get("/metrics").text.splitlines() if line.startswith(label)), None)
+        return float(line.rsplit(" ", 1)[1]) if line else 0.0
+
+    before = count()
+    response = client.post(
+        f"/inventory/{sweet.id}/purchase", json={"quantity": 1},
+        headers={**headers, "Idempotency-Key": "counted"}
+    )
+    assert response.status_code == 200
+    assert count() == before + 1
+
+
+def test_abandoned_attempt_is_not_run_again(client: TestClient, db: Session, shopper, statements):
+    """Test that a reservation left by a crash gets 409, and only the purge writes."""
+    sweet, headers = shopper
+    url = f"/inventory/{sweet.id}/purchase"
+    body = b'{"quantity": 1}'
+    now = time.time()
+    db.add_all([
+        IdempotencyRecord(
+            key=f"shopper:POST {url}:crashed", fingerprint=request_fingerprint(body),
+            created_at=now - PENDING_TIMEOUT - 1
+        ),
+        IdempotencyRecord(key="old", fingerprint="x", status_code=200, body=b"{}", created_at=now - 2 * 86400),
+    ])
+    db.commit()
+    statements.clear()
+
+    retry = client.post(
+        url, content=body,
+        headers={**headers, "Idempotency-Key": "crashed", "Content-Type": "application/json"}
+    )
+    assert retry.status_code == 409
+    assert "unknown" in retry.json()["detail"]
+    assert not any(statement.startswith("DELETE") for statement in statements)
+    db.refresh(sweet)
+    assert sweet.stock == 10
+
+    assert idempotency_store.purge_expired() == 1
+    assert {record.key for record in db.query(IdempotencyRecord)} == {f"shopper:POST {url}:crashed"}
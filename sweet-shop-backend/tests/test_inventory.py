@@ -6,7 +6,9 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.auth import hash_password, create_access_token
-from app.models import User, Sweet, UserRole
+from app.models import InventoryStats, User, Sweet, UserRole
+from app.pagination import encode_cursor
+from app.schemas import SweetResponse
 
 
 def test_get_inventory_empty(client: TestClient):
@@ -33,6 +35,23 @@ def test_get_inventory_with_sweets(client: TestClient, db: Session):
     assert result[0]["stock"] == 100
 
 
+def test_list_endpoints_match_response_model(client: TestClient, db: Session):
+    """Test that the unvalidated fast path produces SweetResponse JSON exactly."""
+    sweets = [
+        Sweet(name="Candy", description="Sweet candy", price=1.99, stock=100),
+        Sweet(name="Caramel", description="Salted caramel", price=0.1, stock=0),
+    ]
+    db.add_all(sweets)
+    db.commit()
+    expected = [SweetResponse.model_validate(sweet).model_dump() for sweet in sweets]
+    
+    for url in ("/inventory", "/sweets/search?q=ca", "/sweets/search?q="):
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json() == expected
+        assert list(response.json()[0]) == list(SweetResponse.model_fields)
+
+
 def test_restock_sweet_as_admin(client: TestClient, db: Session):
     """Test restocking a sweet as admin."""
     # Create sweet
@@ -176,3 +195,208 @@ def test_purchase_sweet_not_found(client: TestClient, db: Session):
     )
     
     assert response.status_code == 404
+
+
+def test_get_inventory_paginates_with_cursor(client: TestClient, db: Session):
+    """Test keyset pagination over the inventory."""
+    db.add_all([
+        Sweet(name=f"Sweet {i}", description="Paged sweet", price=1.0, stock=i)
+        for i in range(5)
+    ])
+    db.commit()
+    
+    first = client.get("/inventory?limit=2")
+    assert first.status_code == 200
+    assert [s["name"] for s in first.json()] == ["Sweet 0", "Sweet 1"]
+    cursor = first.headers["X-Next-Cursor"]
+    
+    second = client.get(f"/inventory?limit=2&cursor={cursor}")
+    assert [s["name"] for s in second.json()] == ["Sweet 2", "Sweet 3"]
+    
+    last = client.get(f"/inventory?limit=2&cursor={second.headers['X-Next-Cursor']}")
+    assert [s["name"] for s in last.json()] == ["Sweet 4"]
+    assert "X-Next-Cursor" not in last.headers
+
+
+def test_get_inventory_invalid_cursor(client: TestClient):
+    """Test that a malformed cursor is rejected."""
+    response = client.get("/inventory?cursor=not-a-cursor")
+    assert response.status_code == 400
+    
+    # {"id": true}: a JSON boolean is not an ID even though bool subclasses int
+    response = client.get("/inventory", params={"cursor": encode_cursor({"id": True})})
+    assert response.status_code == 400
+
+
+def test_get_inventory_field_projection(client: TestClient, db: Session):
+    """Test loading only the requested fields."""
+    db.add(Sweet(name="Candy", description="Sweet candy", price=1.99, stock=100))
+    db.commit()
+    
+    response = client.get("/inventory?fields=name,stock")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "name": "Candy", "stock": 100}]
+    
+    response = client.get("/inventory?fields=name,secret")
+    assert response.status_code == 400
+
+
+def test_purchase_and_restock_validate_quantity(client: TestClient, db: Session):
+    """Test that malformed or non-positive quantities are rejected with 422."""
+    db.add(Sweet(name="Candy", description="Sweet candy", price=1.99, stock=10))
+    db.add(User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN))
+    db.commit()
+    
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+    for body in ({"quantity": [1]}, {"quantity": 0}, {"quantity": -5}):
+        assert client.post("/inventory/1/purchase", json=body, headers=headers).status_code == 422
+        assert client.post("/inventory/1/restock", json=body, headers=headers).status_code == 422
+    assert client.post("/inventory/1/restock", json={}, headers=headers).status_code == 422
+    assert client.get("/inventory").json()[0]["stock"] == 10
+
+
+def test_checkout_cart(client: TestClient, db: Session):
+    """Test purchasing several sweets in one checkout."""
+    candy = Sweet(name="Candy", description="Sweet candy", price=1.99, stock=10)
+    fudge = Sweet(name="Fudge", description="Chocolate fudge", price=3.49, stock=5)
+    user = User(username="user", hashed_password=hash_password("user123"), role=UserRole.USER)
+    db.add_all([candy, fudge, user])
+    db.commit()
+    
+    token = create_access_token({"sub": "user"})
+    
+    response = client.post(
+        "/inventory/checkout",
+        json={"items": [
+            {"sweet_id": candy.id, "quantity": 3},
+            {"sweet_id": fudge.id, "quantity": 5},
+            {"sweet_id": candy.id, "quantity": 1},
+        ]},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    
+    assert response.status_code == 200
+    stocks = {line["sweet_id"]: line["new_stock"] for line in response.json()["items"]}
+    assert stocks == {candy.id: 6, fudge.id: 0}
+
+
+def test_checkout_is_all_or_nothing(client: TestClient, db: Session):
+    """Test that a short line aborts the whole checkout and is reported."""
+    candy = Sweet(name="Candy", description="Sweet candy", price=1.99, stock=10)
+    fudge = Sweet(name="Fudge", description="Chocolate fudge", price=3.49, stock=2)
+    user = User(username="user", hashed_password=hash_password("user123"), role=UserRole.USER)
+    db.add_all([candy, fudge, user])
+    db.commit()
+    candy_id, fudge_id = candy.id, fudge.id
+    
+    token = create_access_token({"sub": "user"})
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    response = client.post(
+        "/inventory/checkout",
+        json={"items": [
+            {"sweet_id": candy_id, "quantity": 4},
+            {"sweet_id": fudge_id, "quantity": 3},
+        ]},
+        headers=headers
+    )
+    
+    assert response.status_code == 400
+    assert response.json()["detail"]["shortages"] == [
+        {"sweet_id": fudge_id, "requested": 3, "available": 2}
+    ]
+    stocks = {s["id"]: s["stock"] for s in client.get("/inventory").json()}
+    assert stocks == {candy_id: 10, fudge_id: 2}
+    
+    response = client.post(
+        "/inventory/checkout",
+        json={"items": [{"sweet_id": 999, "quantity": 1}]},
+        headers=headers
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"]["missing"] == [999]
+
+
+def test_checkout_reports_only_short_lines(client: TestClient, db: Session):
+    """Test that lines with enough stock are not reported short after the rollback."""
+    candy = Sweet(name="Candy", description="Sweet candy", price=1.99, stock=5)
+    fudge = Sweet(name="Fudge", description="Chocolate fudge", price=3.49, stock=2)
+    user = User(username="user", hashed_password=hash_password("user123"), role=UserRole.USER)
+    db.add_all([candy, fudge, user])
+    db.commit()
+    candy_id, fudge_id = candy.id, fudge.id
+    
+    token = create_access_token({"sub": "user"})
+    response = client.post(
+        "/inventory/checkout",
+        json={"items": [
+            {"sweet_id": candy_id, "quantity": 4},
+            {"sweet_id": fudge_id, "quantity": 3},
+        ]},
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    
+    assert response.status_code == 400
+    assert response.json()["detail"]["shortages"] == [
+        {"sweet_id": fudge_id, "requested": 3, "available": 2}
+    ]
+    stocks = {s["id"]: s["stock"] for s in client.get("/inventory").json()}
+    assert stocks == {candy_id: 5, fudge_id: 2}
+
+
+def test_inventory_stats_follow_every_write(client: TestClient, db: Session):
+    """Test that stats track creates, purchases, restocks, edits and deletes."""
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add(admin)
+    db.add_all([
+        Sweet(name="Candy", description="Sweet candy", price=2.0, stock=10),
+        Sweet(name="Fudge", description="Chocolate fudge", price=5.0, stock=4),
+    ])
+    db.commit()
+    
+    token = create_access_token({"sub": "admin"})
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    assert client.get("/inventory/stats").json() == {
+        "total_products": 2, "total_stock": 14, "inventory_value": 40.0
+    }
+    
+    client.post("/inventory/1/purchase", json={"quantity": 3}, headers=headers)
+    client.post("/inventory/2/restock", json={"quantity": 6}, headers=headers)
+    client.put(
+        "/sweets/1",
+        json={"name": "Candy", "description": "Sweet candy", "price": 3.0, "stock": 7},
+        headers=headers
+    )
+    client.post(
+        "/sweets",
+        json={"name": "Toffee", "description": "Butter toffee", "price": 1.5, "stock": 2},
+        headers=headers
+    )
+    client.delete("/sweets/2", headers=headers)
+    
+    stats = client.get("/inventory/stats").json()
+    assert stats == {"total_products": 2, "total_stock": 9, "inventory_value": 24.0}
+    
+    response = client.post("/inventory/stats/reconcile", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["in_sync"] is True
+
+
+def test_reconcile_repairs_drifted_stats(client: TestClient, db: Session):
+    """Test that reconciliation rewrites a summary row that has drifted."""
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add(admin)
+    db.add(Sweet(name="Candy", description="Sweet candy", price=2.0, stock=10))
+    db.commit()
+    db.query(InventoryStats).update({"total_stock": 999})
+    db.commit()
+    
+    token = create_access_token({"sub": "admin"})
+    response = client.post(
+        "/inventory/stats/reconcile",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    
+    assert response.json()["in_sync"] is False
+    assert client.get("/inventory/stats").json()["total_stock"] == 10
@@ -0,0 +1,64 @@
+"""
+Tests for the Prometheus /metrics endpoint.
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.metrics import Histogram, Registry
+from app.models import Sweet
+
+
+def _sample(text: str, prefix: str) -> float:
+    """Value of the exposition line starting with prefix, 0 if absent."""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_record_requests_per_route(client: TestClient, db: Session):
+    """Test counts, durations, sizes and DB queries labelled by route template."""
+    sweet = Sweet(name="Candy", description="Sweet candy", price=1.99, stock=10)
+    db.add(sweet)
+    db.commit()
+    before = client.get("/metrics").text
+    
+    client.get("/inventory")
+    client.get("/sweets/999999")
+    client.get("/no/such/path")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    after = response.text
+    
+    def delta(prefix: str) -> float:
+        return _sample(after, prefix) - _sample(before, prefix)
+    
+    assert delta('http_requests_total{method="GET",route="/inventory",status="200"}') == 1
+    assert delta('http_requests_total{method="GET",route="/sweets/{sweet_id}",status="404"}') == 1
+    assert delta('http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert delta('http_request_duration_seconds_count{method="GET",route="/inventory"}') == 1
+    assert delta('http_response_size_bytes_sum{method="GET",route="/inventory"}') > 0
+    assert delta('db_queries_per_request_sum{method="GET",route="/inventory"}') >= 1
+    assert delta("threadpool_queue_wait_seconds_count") >= 1
+    assert _sample(after, "http_requests_in_flight") == 1  # the scrape itself
+    assert "# TYPE http_request_duration_seconds histogram" in after
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test bucket boundaries, cumulative counts, sum and count."""
+    registry = Registry()
+    histogram = registry.register(Histogram("demo_seconds", "Demo.", (0.1, 1.0), ("route",)))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, ("/x",))
+    
+    lines = registry.render().splitlines()
+    
+    assert lines[2:] == [
+        'demo_seconds_bucket{route="/x",le="0.1"} 2',
+        'demo_seconds_bucket{route="/x",le="1"} 3',
+        'demo_seconds_bucket{route="/x",le="+Inf"} 4',
+        'demo_seconds_sum{route="/x"} 2.65',
+        'demo_seconds_count{route="/x"} 4',
+    ]
@@ -0,0 +1,70 @@
+"""
+Tests for the connection pool settings and GET /admin/pool.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import exc
+from sqlalchemy.orm import Session
+
+from app.auth import create_user_access_token, hash_password
+from app.config import Settings
+from app.metrics import registry
+from app.models import User, UserRole
+from app.pool import create_pooled_engine, forget_pool, pool_stats
+
+
+@pytest.fixture
+def small_pool(tmp_path):
+    """An engine allowing one pooled and one overflow connection."""
+    config = Settings(database_pool_size=1, database_max_overflow=1, database_pool_timeout=0.05)
+    engine = create_pooled_engine(f"sqlite:///{tmp_path / 'pool.db'}", "test", config=config)
+    yield engine
+    engine.dispose()
+    forget_pool("test")
+
+
+def _stats(name: str) -> dict:
+    return next(stats for stats in pool_stats() if stats["name"] == name)
+
+
+def test_saturation_is_recorded(small_pool):
+    """Test in-use, overflow and timeout counters of a saturated pool."""
+    first, second = small_pool.connect(), small_pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        small_pool.connect()
+
+    stats = _stats("test")
+    assert stats["pool_class"] == "QueuePool"
+    assert (stats["pool_size"], stats["max_overflow"], stats["timeout"]) == (1, 1, 0.05)
+    assert stats["in_use"] == stats["peak_in_use"] == 2
+    assert stats["overflow_checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+
+    first.close()
+    second.close()
+    stats = _stats("test")
+    assert stats["in_use"] == 0
+    assert stats["idle"] == 1
+    assert stats["connects"] == 2
+
+    metrics = registry.render()
+    assert 'db_pool_checkout_timeouts_total{pool="test"} 1' in metrics
+    assert 'db_pool_checkout_wait_seconds_count{pool="test"} 3' in metrics
+
+
+def test_pool_endpoint_requires_admin(client: TestClient, db: Session):
+    """Test GET /admin/pool for an admin and a regular user."""
+    admin = User(username="admin", hashed_password=hash_password("x"), role=UserRole.ADMIN)
+    user = User(username="user", hashed_password=hash_password("x"), role=UserRole.USER)
+    db.add_all([admin, user])
+    db.commit()
+
+    response = client.get("/admin/pool", headers={"Authorization": f"Bearer {create_user_access_token(admin)}"})
+    assert response.status_code == 200
+    primary = next(pool for pool in response.json() if pool["name"] == "primary")
+    assert primary["pool_class"] == "StaticPool"
+    assert primary["pool_size"] is None
+
+    response = client.get("/admin/pool", headers={"Authorization": f"Bearer {create_user_access_token(user)}"})
+    assert response.status_code == 403
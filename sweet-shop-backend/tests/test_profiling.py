@@ -0,0 +1,104 @@
+"""
+Tests for on-demand request profiling and /admin/profiles.
+"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.auth import create_access_token, create_user_access_token, hash_password
+from app.models import Sweet, User, UserRole
+from app.profiling import PROFILE_ID_HEADER, ProfileStore, ProfilingMiddleware, RequestProfile
+
+
+def _headers(db: Session, role: UserRole) -> dict:
+    user = User(username=role.value, hashed_password=hash_password("pass123"), role=role)
+    db.add(user)
+    db.add(Sweet(name="Candy", description="Sweet candy", price=1.99, stock=10))
+    db.commit()
+    return {"Authorization": f"Bearer {create_user_access_token(user)}"}
+
+
+def test_admin_request_is_profiled_with_sql_and_phases(client: TestClient, db: Session):
+    """Test X-Profile-Id, Server-Timing and the stored profile."""
+    headers = _headers(db, UserRole.ADMIN)
+
+    response = client.get("/inventory", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert "total;dur=" in response.headers["Server-Timing"]
+    assert "sql;dur=" in response.headers["Server-Timing"]
+
+    response = client.get(f"/admin/profiles/{profile_id}", headers=headers)
+    assert response.status_code == 200
+    profile = response.json()
+    assert profile["path"] == "/inventory"
+    assert profile["status"] == 200
+    assert profile["sql_count"] >= 1
+    assert any("FROM sweets" in trace["statement"] for trace in profile["sql"])
+    assert set(profile["phases_ms"]) >= {"auth", "sql", "serialization", "framework", "app"}
+    assert profile["functions"]
+    assert "Ordered by: cumulative time" in profile["call_tree"]
+
+    listing = client.get("/admin/profiles", headers=headers).json()
+    assert listing[0]["id"] == int(profile_id)
+
+
+def test_profiling_requires_admin(client: TestClient, db: Session):
+    """Test that other callers are served normally, without a profile."""
+    headers = _headers(db, UserRole.USER)
+
+    response = client.get("/inventory", headers={**headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+    response = client.get("/inventory", headers={"X-Profile": "1"})
+    assert "X-Profile-Id" not in response.headers
+
+    response = client.get("/admin/profiles", headers=headers)
+    assert response.status_code == 403
+
+
+def test_legacy_admin_token_is_profiled(client: TestClient, db: Session):
+    """Test tokens without role claims are resolved through the database."""
+    _headers(db, UserRole.ADMIN)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+    response = client.get("/inventory", headers={**headers, "X-Profile": "1"})
+
+    assert "X-Profile-Id" in response.headers
+    assert client.get("/admin/profiles/999999", headers=headers).status_code == 404
+
+
+def test_overlapping_profiled_requests_run(client: TestClient, db: Session):
+    """Test that a profiled request overlapping another runs unprofiled instead of failing."""
+    headers = {**_headers(db, UserRole.ADMIN), "X-Profile": "1"}
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.02)
+        return {"ok": True}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=ProfilingMiddleware(app))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.get("/slow", headers=headers) for _ in range(3)))
+
+    responses = asyncio.run(scenario())
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert sum(PROFILE_ID_HEADER in response.headers for response in responses) == 1
+
+
+def test_profile_store_keeps_most_recent():
+    """Test the ring buffer drops the oldest profiles."""
+    store = ProfileStore(max_entries=2)
+    for path in ("/a", "/b", "/c"):
+        store.add(RequestProfile("GET", path))
+
+    assert [profile.path for profile in store.list()] == ["/c", "/b"]
+    assert store.get(1) is None
+    assert store.get(3).path == "/c"
@@ -0,0 +1,86 @@
+"""
+Tests for read replica routing and read-your-writes stickiness.
+"""
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.auth import create_access_token, hash_password
+from app.models import Sweet, User, UserRole
+from app.replicas import ReadReplicas, read_replicas
+
+
+@pytest.fixture
+def replica(db: Session, tmp_path):
+    """Route catalog reads to a SQLite file copied from the test database."""
+    read_replicas.configure([f"sqlite:///{tmp_path / 'replica.db'}"])
+    yield read_replicas
+    read_replicas.configure([])
+
+
+def _admin_headers(db: Session) -> dict:
+    db.add(User(username="admin", hashed_password=hash_password("x"), role=UserRole.ADMIN))
+    db.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'admin'})}"}
+
+
+def test_reads_use_the_replica_until_it_is_refreshed(client: TestClient, db: Session, replica):
+    """Test that catalog reads see the replica's copy, and refreshes catch up."""
+    sweet = Sweet(name="Toffee", description="Butter toffee", price=1.5, stock=10)
+    db.add(sweet)
+    db.commit()
+    assert replica.refresh(db.get_bind())
+
+    db.execute(text("UPDATE sweets SET price = 2.5"))
+    db.commit()
+
+    assert client.get(f"/sweets/{sweet.id}").json()["price"] == 1.5
+    assert client.get("/inventory").json()[0]["price"] == 1.5
+    assert client.get("/sweets/search", params={"q": "toffee"}).json()[0]["price"] == 1.5
+
+    assert replica.refresh(db.get_bind())
+    assert not replica.refresh(db.get_bind())  # nothing changed since
+    assert client.get(f"/sweets/{sweet.id}").json()["price"] == 2.5
+    assert client.get("/inventory").json()[0]["price"] == 2.5
+
+
+def test_writer_reads_own_writes(client: TestClient, db: Session, replica):
+    """Test that a user who wrote reads the primary; others keep the replica."""
+    headers = _admin_headers(db)
+    sweet = Sweet(name="Fudge", description="Vanilla fudge", price=2.0, stock=10)
+    db.add(sweet)
+    db.commit()
+    replica.refresh(db.get_bind())
+    assert client.get(f"/sweets/{sweet.id}", headers=headers).json()["stock"] == 10
+
+    response = client.post(f"/inventory/{sweet.id}/purchase", json={"quantity": 4}, headers=headers)
+    assert response.status_code == 200
+
+    assert client.get(f"/sweets/{sweet.id}", headers=headers).json()["stock"] == 6
+    assert client.get("/inventory", headers=headers).json()[0]["stock"] == 6
+    assert client.get(f"/sweets/{sweet.id}").json()["stock"] == 10
+
+
+def test_stickiness_expires_and_replicas_are_read_only(tmp_path):
+    """Test the read-your-writes window and that replica sessions refuse writes."""
+    replicas = ReadReplicas(
+        [f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"], sticky_seconds=0.05
+    )
+    headers = {"authorization": f"Bearer {create_access_token({'sub': 'alice'})}"}
+    factories = {replicas.session_factory(None), replicas.session_factory(None)}
+    assert len(factories) == 2
+
+    replicas.mark_write("alice")
+    assert replicas.session_factory(headers["authorization"]) is None
+    assert replicas.session_factory(None) is not None
+    time.sleep(0.06)
+    assert replicas.session_factory(headers["authorization"]) is not None
+
+    with factories.pop()() as session:
+        with pytest.raises(OperationalError):
+            session.execute(text("CREATE TABLE t (x INTEGER)"))
+    replicas.configure([])
@@ -0,0 +1,49 @@
+"""
+Concurrency tests for atomic stock adjustments.
+"""
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Sweet
+from app.stock import get_stock, purchase
+
+
+def test_concurrent_purchases_never_oversell(tmp_path):
+    """Test that racing buyers cannot sell more than the available stock."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'stress.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    
+    with Session() as session:
+        sweet = Sweet(name="Limited Edition", description="Flash sale", price=9.99, stock=50)
+        session.add(sweet)
+        session.commit()
+        sweet_id = sweet.id
+    
+    successes = []
+    barrier = threading.Barrier(8)
+    
+    def buyer():
+        barrier.wait()
+        for _ in range(10):
+            with Session() as session:
+                if purchase(session, sweet_id, 1) is not None:
+                    session.commit()
+                    successes.append(1)
+    
+    threads = [threading.Thread(target=buyer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with Session() as session:
+        assert get_stock(session, sweet_id) == 0
+    assert len(successes) == 50
+    engine.dispose()
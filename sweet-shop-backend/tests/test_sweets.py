@@ -213,3 +213,166 @@ def test_delete_sweet_as_user_forbidden(client: TestClient, db: Session):
     )
     
     assert response.status_code == 403
+
+
+def test_search_sweets_prefix_and_ranking(client: TestClient, db: Session):
+    """Test prefix matching and bm25 ranking of search results."""
+    db.add_all([
+        Sweet(name="Vanilla Fudge", description="Hint of chocolate", price=3.99),
+        Sweet(name="Chocolate Truffle", description="Rich chocolate truffle", price=6.99),
+        Sweet(name="Lemon Drop", description="Sour candy", price=0.99),
+    ])
+    db.commit()
+    
+    response = client.get("/sweets/search?q=choc")
+    assert response.status_code == 200
+    names = [sweet["name"] for sweet in response.json()]
+    assert names == ["Chocolate Truffle", "Vanilla Fudge"]
+    
+    response = client.get("/sweets/search?q=choc&limit=1&offset=1")
+    assert [sweet["name"] for sweet in response.json()] == ["Vanilla Fudge"]
+
+
+def test_search_index_follows_updates_and_deletes(client: TestClient, db: Session):
+    """Test that the search index stays in sync with the sweets table."""
+    sweet = Sweet(name="Toffee", description="Butter toffee", price=2.49)
+    other = Sweet(name="Nougat", description="Almond nougat", price=3.49)
+    db.add_all([sweet, other])
+    db.commit()
+    
+    sweet.name = "Caramel"
+    sweet.description = "Soft caramel"
+    db.delete(other)
+    db.commit()
+    
+    assert client.get("/sweets/search?q=toffee").json() == []
+    assert client.get("/sweets/search?q=nougat").json() == []
+    assert [s["name"] for s in client.get("/sweets/search?q=caram").json()] == ["Caramel"]
+
+
+def test_search_falls_back_without_fts(client: TestClient, db: Session, monkeypatch):
+    """Test the ILIKE fallback when the FTS index is unavailable."""
+    monkeypatch.setattr("app.search.fts_enabled", lambda connection: False)
+    db.add(Sweet(name="Hotchocolate", description="Warm drink", price=2.99))
+    db.commit()
+    
+    response = client.get("/sweets/search?q=chocolate")
+    assert [sweet["name"] for sweet in response.json()] == ["Hotchocolate"]
+
+
+def test_import_sweets_csv_with_upsert_and_errors(client: TestClient, db: Session):
+    """Test bulk importing a CSV catalog as admin."""
+    db.add(Sweet(name="Toffee", description="Old toffee", price=1.00, stock=1))
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add(admin)
+    db.commit()
+    
+    token = create_access_token({"sub": "admin"})
+    body = (
+        "name,description,price,stock\n"
+        "Toffee,Butter toffee,2.50,40\n"
+        "Nougat,Almond nougat,3.25,\n"
+        "Bad Price,Broken row,-1,5\n"
+        "Fudge,Chocolate fudge,4.00,12\n"
+    )
+    response = client.post(
+        "/sweets/import?batch_size=2",
+        content=body,
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+    )
+    
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["updated"], report["failed"]) == (2, 1, 1)
+    assert report["errors"][0]["row"] == 3
+    assert "price" in report["errors"][0]["errors"][0]
+    
+    sweets = {s["name"]: s for s in client.get("/inventory").json()}
+    assert set(sweets) == {"Toffee", "Nougat", "Fudge"}
+    assert sweets["Toffee"]["stock"] == 40
+    assert sweets["Nougat"]["stock"] == 0
+
+
+def test_import_reports_names_shared_by_several_sweets(client: TestClient, db: Session):
+    """Test that an upsert row matching several sweets by name updates none of them."""
+    db.add_all([
+        Sweet(name="Toffee", description="Butter toffee", price=1.00, stock=1),
+        Sweet(name="Toffee", description="Salted toffee", price=1.50, stock=2),
+    ])
+    db.add(User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN))
+    db.commit()
+    
+    token = create_access_token({"sub": "admin"})
+    response = client.post(
+        "/sweets/import",
+        content="name,description,price,stock\nToffee,Plain toffee,2.00,9\n",
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+    )
+    
+    report = response.json()
+    assert (report["inserted"], report["updated"], report["failed"]) == (0, 0, 1)
+    assert report["errors"][0]["errors"][0].startswith("name:")
+    toffees = sorted((s["description"], s["stock"]) for s in client.get("/inventory").json())
+    assert toffees == [("Butter toffee", 1), ("Salted toffee", 2)]
+
+
+def test_import_sweets_ndjson(client: TestClient, db: Session):
+    """Test bulk importing an NDJSON catalog with a malformed line."""
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add(admin)
+    db.commit()
+    
+    token = create_access_token({"sub": "admin"})
+    body = (
+        '{"name": "Gummy Bear", "description": "Fruit gummies", "price": 0.5, "stock": 300}\n'
+        '{"name": "Broken"\n'
+    )
+    response = client.post(
+        "/sweets/import",
+        content=body,
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/x-ndjson"}
+    )
+    
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["failed"]) == (1, 1)
+    assert client.get("/sweets/search?q=gummy").json()[0]["stock"] == 300
+
+
+def test_import_stops_with_400_on_unreadable_input(client: TestClient, db: Session):
+    """Test that bad UTF-8 partway through reports the rows already imported."""
+    admin = User(username="admin", hashed_password=hash_password("admin123"), role=UserRole.ADMIN)
+    db.add(admin)
+    db.commit()
+    
+    token = create_access_token({"sub": "admin"})
+    rows = "".join(f"Candy {number},Sweet candy,1.0,5\n" for number in range(2000))
+    body = ("name,description,price,stock\n" + rows).encode() + b"Bad \xff row,x,1.0,1\n"
+    response = client.post(
+        "/sweets/import?batch_size=500",
+        content=body,
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "text/csv"}
+    )
+    
+    assert response.status_code == 400
+    detail = response.json()["detail"]
+    assert "Unreadable input" in detail["message"]
+    imported = detail["report"]["inserted"]
+    assert 0 < imported <= 2000
+    assert db.query(Sweet).count() == imported
+
+
+def test_import_sweets_as_user_forbidden(client: TestClient, db: Session):
+    """Test that regular users cannot bulk import."""
+    user = User(username="user", hashed_password=hash_password("user123"), role=UserRole.USER)
+    db.add(user)
+    db.commit()
+    
+    token = create_access_token({"sub": "user"})
+    response = client.post(
+        "/sweets/import",
+        content="name,description,price\nCandy,Sweet,1.0\n",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    
+    assert response.status_code == 403
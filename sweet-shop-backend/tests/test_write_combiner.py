@@ -0,0 +1,158 @@
+"""
+Tests for group-committed purchases and restocks.
+"""
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.auth import create_access_token
+from app.models import Sweet
+from app.database import Base
+from app.stock import PURCHASE, RESTOCK, get_stock
+from app.write_combiner import WriteCombiner, write_combiner
+
+
+@pytest.fixture
+def file_sessions(tmp_path):
+    """Session factory for a file database with one sweet in stock."""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'combiner.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(Sweet(name="Lollipop", description="Cherry lollipop", price=0.5, stock=50))
+        session.commit()
+    yield factory
+    engine.dispose()
+
+
+def test_combiner_batches_concurrent_purchases(file_sessions):
+    """Test that concurrent purchases share commits and never oversell."""
+    combiner = WriteCombiner(file_sessions, window_ms=20, max_batch=32)
+    combiner.start()
+    outcomes = []
+    lock = threading.Lock()
+    
+    def buyer():
+        futures = [combiner.submit(PURCHASE, 1, 1) for _ in range(10)]
+        with lock:
+            outcomes.extend(future.result(timeout=10) for future in futures)
+    
+    threads = [threading.Thread(target=buyer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    combiner.stop()
+    
+    sold = [change for change in outcomes if change.new_stock is not None]
+    refused = [change for change in outcomes if change.new_stock is None]
+    assert len(sold) == 50
+    assert all(change.available == 0 for change in refused)
+    
+    stats = combiner.stats()
+    assert stats["intents"] == 80
+    assert stats["commits"] < 80
+    assert sum(stats["batch_size_histogram"].values()) == stats["commits"]
+    with file_sessions() as session:
+        assert get_stock(session, 1) == 0
+
+
+def test_combiner_reports_missing_sweets_and_drains_on_stop(file_sessions):
+    """Test per-intent outcomes and that queued intents survive a stop."""
+    combiner = WriteCombiner(file_sessions, window_ms=50)
+    combiner.start()
+    missing = combiner.submit(PURCHASE, 999, 1)
+    restocked = combiner.submit(RESTOCK, 1, 5)
+    combiner.stop()
+    
+    assert missing.result().available is None
+    assert restocked.result().new_stock == 55
+
+
+def test_bad_intent_fails_alone(file_sessions):
+    """Test that an intent the database rejects does not fail its batch-mates."""
+    combiner = WriteCombiner(file_sessions, window_ms=50)
+    combiner.start()
+    before = combiner.submit(PURCHASE, 1, 2)
+    bad = combiner.submit(PURCHASE, 1, [1])
+    after = combiner.submit(RESTOCK, 1, 3)
+    combiner.stop()
+    
+    assert before.result().new_stock == 48
+    assert after.result().new_stock == 51
+    with pytest.raises(Exception):
+        bad.result()
+    assert combiner.stats()["failed_batches"] == 2
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_stopped_combiner_refuses_intents_and_fails_stranded_ones(file_sessions):
+    """Test that nothing is queued once stopping, and nothing queued hangs."""
+    release = threading.Event()
+
+    def dying_sessions():
+        release.wait(5)
+        raise SystemExit  # the writer thread dies with intents still queued
+
+    combiner = WriteCombiner(dying_sessions, window_ms=0, max_batch=1)
+    combiner.start()
+    dying = combiner.submit(PURCHASE, 1, 1)
+    stranded = combiner.submit(PURCHASE, 1, 1)
+    release.set()
+    combiner._thread.join(5)
+    combiner.stop()
+
+    with pytest.raises(SystemExit):
+        dying.result(timeout=1)
+    with pytest.raises(RuntimeError):
+        stranded.result(timeout=1)
+    assert combiner.submit(PURCHASE, 1, 1) is None
+
+
+def test_cancelled_intent_is_skipped(file_sessions):
+    """Test that an intent given up on before its batch starts is not applied."""
+    started, release = threading.Event(), threading.Event()
+
+    def slow_sessions():
+        started.set()
+        release.wait(5)
+        return file_sessions()
+
+    combiner = WriteCombiner(slow_sessions, window_ms=0, max_batch=1)
+    combiner.start()
+    first = combiner.submit(PURCHASE, 1, 1)
+    assert started.wait(5)
+    abandoned = combiner.submit(PURCHASE, 1, 10)
+    assert abandoned.cancel()
+    release.set()
+    combiner.stop()
+
+    assert first.result().new_stock == 49
+    with file_sessions() as session:
+        assert get_stock(session, 1) == 49
+
+
+def test_purchase_route_uses_running_combiner(client: TestClient, db: Session):
+    """Test that the purchase endpoint goes through the combiner when enabled."""
+    sweet = Sweet(name="Cookie", description="Chocolate chip", price=1.99, stock=3)
+    db.add(sweet)
+    db.commit()
+    token = create_access_token({"sub": "user", "uid": 1, "role": "user"})
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    write_combiner.start()
+    try:
+        ok = client.post(f"/inventory/{sweet.id}/purchase", json={"quantity": 2}, headers=headers)
+        short = client.post(f"/inventory/{sweet.id}/purchase", json={"quantity": 2}, headers=headers)
+    finally:
+        write_combiner.stop()
+    
+    assert ok.json()["new_stock"] == 1
+    assert short.status_code == 400
+    assert client.get("/inventory/combiner").json()["intents"] == 2
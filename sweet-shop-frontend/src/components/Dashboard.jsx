@@ -3,6 +3,33 @@ import { useNavigate } from 'react-router-dom';
 import api from '../api';
 import '../styles/Dashboard.css';
 
+// Largest page the list endpoints serve (MAX_PAGE_SIZE on the server)
+const PAGE_SIZE = 1000;
+
+// GET /inventory is paginated; follow X-Next-Cursor to load every sweet
+async function fetchAllInventory() {
+  const sweets = [];
+  let cursor;
+  do {
+    const response = await api.get('/inventory', { params: { limit: PAGE_SIZE, cursor } });
+    sweets.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return sweets;
+}
+
+// GET /sweets/search is paginated by offset; a short page is the last one
+async function searchAllSweets(q) {
+  const sweets = [];
+  for (let offset = 0; ; offset += PAGE_SIZE) {
+    const response = await api.get('/sweets/search', { params: { q, limit: PAGE_SIZE, offset } });
+    sweets.push(...response.data);
+    if (response.data.length < PAGE_SIZE) {
+      return sweets;
+    }
+  }
+}
+
 export default function Dashboard() {
   const [user, setUser] = useState(null);
   const [sweets, setSweets] = useState([]);
@@ -21,9 +48,9 @@ export default function Dashboard() {
       const userResponse = await api.get('/auth/me');
       setUser(userResponse.data);
       
-      const inventoryResponse = await api.get('/inventory');
-      setInventory(inventoryResponse.data);
-      setSweets(inventoryResponse.data);
+      const allSweets = await fetchAllInventory();
+      setInventory(allSweets);
+      setSweets(allSweets);
     } catch (err) {
       setError('Failed to load data');
       navigate('/login');
@@ -134,10 +161,7 @@ function SweetsView({ user, onUpdate }) {
   const handleSearch = async () => {
     setLoading(true);
     try {
-      const response = await api.get('/sweets/search', {
-        params: { q: searchQuery },
-      });
-      setSweets(response.data);
+      setSweets(await searchAllSweets(searchQuery));
     } catch (err) {
       console.error('Search failed:', err);
     } finally {
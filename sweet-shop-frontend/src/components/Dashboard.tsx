@@ -1,7 +1,7 @@
 /* eslint-disable @typescript-eslint/no-unused-vars */
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { useNavigate } from 'react-router-dom'
-import api from '../api'
+import api, { API_BASE_URL } from '../api'
 import '../styles/Dashboard.css'
 
 interface User {
@@ -18,25 +18,103 @@ interface Sweet {
   stock: number
 }
 
+interface InventoryStats {
+  total_products: number
+  total_stock: number
+  inventory_value: number
+}
+
+// Payload of a `stock` event from GET /inventory/events
+interface StockChange {
+  sweet_id: number
+  stock: number
+  price: number
+}
+
+// Largest page the list endpoints serve (MAX_PAGE_SIZE on the server)
+const PAGE_SIZE = 1000
+
+// GET /inventory is paginated; follow X-Next-Cursor to load every sweet
+async function fetchAllInventory(): Promise<Sweet[]> {
+  const sweets: Sweet[] = []
+  let cursor: string | undefined
+  do {
+    const response = await api.get('/inventory', { params: { limit: PAGE_SIZE, cursor } })
+    sweets.push(...response.data)
+    cursor = response.headers['x-next-cursor']
+  } while (cursor)
+  return sweets
+}
+
+// GET /sweets/search is paginated by offset; a short page is the last one
+async function searchAllSweets(q: string): Promise<Sweet[]> {
+  const sweets: Sweet[] = []
+  for (let offset = 0; ; offset += PAGE_SIZE) {
+    const response = await api.get('/sweets/search', { params: { q, limit: PAGE_SIZE, offset } })
+    sweets.push(...response.data)
+    if (response.data.length < PAGE_SIZE) {
+      return sweets
+    }
+  }
+}
+
 export default function Dashboard() {
   const [user, setUser] = useState<User | null>(null)
   const [sweets, setSweets] = useState<Sweet[]>([])
+  const [stats, setStats] = useState<InventoryStats | null>(null)
   const [activeTab, setActiveTab] = useState('dashboard')
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
   const navigate = useNavigate()
 
+  const statsTimer = useRef<number | null>(null)
+
   useEffect(() => {
     fetchUserData()
   }, [])
 
+  // Apply stock/price deltas pushed by the server instead of re-fetching
+  useEffect(() => {
+    const events = new EventSource(`${API_BASE_URL}/inventory/events`)
+
+    events.addEventListener('stock', (event) => {
+      const change: StockChange = JSON.parse((event as MessageEvent).data)
+      setSweets((current) => {
+        if (!current.some((sweet) => sweet.id === change.sweet_id)) {
+          fetchSweet(change.sweet_id)
+          return current
+        }
+        return current.map((sweet) =>
+          sweet.id === change.sweet_id ? { ...sweet, stock: change.stock, price: change.price } : sweet
+        )
+      })
+      scheduleStatsRefresh()
+    })
+
+    events.addEventListener('delete', (event) => {
+      const { sweet_id } = JSON.parse((event as MessageEvent).data)
+      setSweets((current) => current.filter((sweet) => sweet.id !== sweet_id))
+      scheduleStatsRefresh()
+    })
+
+    // Changes were dropped; start over from a full list
+    events.addEventListener('resync', () => {
+      fetchInventory()
+    })
+
+    return () => {
+      events.close()
+      if (statsTimer.current !== null) {
+        window.clearTimeout(statsTimer.current)
+      }
+    }
+  }, [])
+
   const fetchUserData = async () => {
     try {
       const userResponse = await api.get('/auth/me')
       setUser(userResponse.data)
-      
-      const inventoryResponse = await api.get('/inventory')
-      setSweets(inventoryResponse.data)
+      await fetchInventory()
     } catch (err) {
       setError('Failed to load data')
       navigate('/login')
@@ -45,6 +123,40 @@ export default function Dashboard() {
     }
   }
 
+  const fetchInventory = async () => {
+    const [inventory, statsResponse] = await Promise.all([
+      fetchAllInventory(),
+      api.get('/inventory/stats'),
+    ])
+    setSweets(inventory)
+    setStats(statsResponse.data)
+  }
+
+  // Not in the full list, so created since it loaded: the event has no
+  // name or description
+  const fetchSweet = async (sweetId: number) => {
+    try {
+      const response = await api.get(`/sweets/${sweetId}`)
+      setSweets((current) =>
+        current.some((sweet) => sweet.id === sweetId) ? current : [...current, response.data]
+      )
+    } catch (err) {
+      console.error('Failed to load sweet:', err)
+    }
+  }
+
+  // Totals are one cheap request, but bursts of events only need one
+  const scheduleStatsRefresh = () => {
+    if (statsTimer.current !== null) {
+      return
+    }
+    statsTimer.current = window.setTimeout(async () => {
+      statsTimer.current = null
+      const response = await api.get('/inventory/stats')
+      setStats(response.data)
+    }, 1000)
+  }
+
   const handleLogout = () => {
     localStorage.removeItem('access_token')
     localStorage.removeItem('username')
@@ -104,15 +216,15 @@ export default function Dashboard() {
             <h2>Dashboard</h2>
             <div className="stats-grid">
               <div className="stat-card">
-                <h3>{sweets.length}</h3>
+                <h3>{stats?.total_products ?? 0}</h3>
                 <p>Total Products</p>
               </div>
               <div className="stat-card">
-                <h3>{sweets.reduce((sum, s) => sum + s.stock, 0)}</h3>
+                <h3>{stats?.total_stock ?? 0}</h3>
                 <p>Total Stock</p>
               </div>
               <div className="stat-card">
-                <h3>${sweets.reduce((sum, s) => sum + (s.price * s.stock), 0).toFixed(2)}</h3>
+                <h3>${(stats?.inventory_value ?? 0).toFixed(2)}</h3>
                 <p>Inventory Value</p>
               </div>
             </div>
@@ -120,22 +232,22 @@ export default function Dashboard() {
         )}
 
         {activeTab === 'sweets' && (
-          <SweetsView user={user} onUpdate={fetchUserData} />
+          <SweetsView user={user} />
         )}
 
         {activeTab === 'inventory' && (
-          <InventoryView sweets={sweets} user={user} onUpdate={fetchUserData} />
+          <InventoryView sweets={sweets} user={user} />
         )}
 
         {activeTab === 'admin' && user?.role === 'admin' && (
-          <AdminPanel user={user} onUpdate={fetchUserData} />
+          <AdminPanel user={user} />
         )}
       </div>
     </div>
   )
 }
 
-function SweetsView({ user, onUpdate }: { user: User | null; onUpdate: () => void }) {
+function SweetsView({ user }: { user: User | null }) {
   const [sweets, setSweets] = useState<Sweet[]>([])
   const [searchQuery, setSearchQuery] = useState('')
   const [loading, setLoading] = useState(false)
@@ -147,10 +259,7 @@ function SweetsView({ user, onUpdate }: { user: User | null; onUpdate: () => voi
   const handleSearch = async () => {
     setLoading(true)
     try {
-      const response = await api.get('/sweets/search', {
-        params: { q: searchQuery },
-      })
-      setSweets(response.data)
+      setSweets(await searchAllSweets(searchQuery))
     } catch (err) {
       console.error('Search failed:', err)
     } finally {
@@ -168,7 +277,7 @@ function SweetsView({ user, onUpdate }: { user: User | null; onUpdate: () => voi
           price: parseFloat(newPrice),
           stock: 0,
         })
-        onUpdate()
+        handleSearch()
       } catch (err) {
         alert('Failed to update sweet')
       }
@@ -179,7 +288,7 @@ function SweetsView({ user, onUpdate }: { user: User | null; onUpdate: () => voi
     if (window.confirm('Are you sure you want to delete this sweet?')) {
       try {
         await api.delete(`/sweets/${sweetId}`)
-        onUpdate()
+        handleSearch()
       } catch (err) {
         alert('Failed to delete sweet')
       }
@@ -221,7 +330,7 @@ function SweetsView({ user, onUpdate }: { user: User | null; onUpdate: () => voi
   )
 }
 
-function InventoryView({ sweets, user, onUpdate }: { sweets: Sweet[]; user: User | null; onUpdate: () => void }) {
+function InventoryView({ sweets, user }: { sweets: Sweet[]; user: User | null }) {
   const handlePurchase = async (sweetId: number) => {
     const quantity = prompt('Enter quantity to purchase:')
     if (quantity) {
@@ -230,7 +339,6 @@ function InventoryView({ sweets, user, onUpdate }: { sweets: Sweet[]; user: User
           quantity: parseInt(quantity),
         })
         alert('Purchase successful!')
-        onUpdate()
       } catch (err: unknown) {
         alert(err.response?.data?.detail || 'Purchase failed')
       }
@@ -250,7 +358,6 @@ function InventoryView({ sweets, user, onUpdate }: { sweets: Sweet[]; user: User
           quantity: parseInt(quantity),
         })
         alert('Restocked successfully!')
-        onUpdate()
       } catch (err) {
         alert('Restock failed')
       }
@@ -293,7 +400,7 @@ function InventoryView({ sweets, user, onUpdate }: { sweets: Sweet[]; user: User
   )
 }
 
-function AdminPanel({ user, onUpdate }: { user: User | null; onUpdate: () => void }) {
+function AdminPanel({ user }: { user: User | null }) {
   const [name, setName] = useState('')
   const [description, setDescription] = useState('')
   const [price, setPrice] = useState('')
@@ -314,7 +421,6 @@ function AdminPanel({ user, onUpdate }: { user: User | null; onUpdate: () => voi
       setName('')
       setDescription('')
       setPrice('')
-      onUpdate()
     } catch (err) {
       alert('Failed to create sweet')
     } finally {